@@ -0,0 +1,55 @@
+import argparse
+import logging
+import time
+
+from rich.console import Console
+from rich.table import Table
+
+from metric_anomaly_investigator.mock_warehouse.generator import (
+    generate_user_profiles,
+    iter_events,
+)
+
+logger = logging.getLogger(__name__)
+console = Console()
+
+
+def run_benchmark(n_users: int, seed: int, workers: int):
+    start = time.perf_counter()
+    users_df = generate_user_profiles(n_users, seed=seed)
+    users_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    n_events = 0
+    for events_df in iter_events(users_df, seed=seed, workers=workers):
+        n_events += len(events_df)
+    events_s = time.perf_counter() - start
+
+    table = Table(
+        title=f"Generator ({n_users:,} users, seed {seed}, {workers} workers)"
+    )
+    table.add_column("Stage", style="cyan")
+    table.add_column("Rows", justify="right")
+    table.add_column("Time", justify="right")
+    table.add_column("Rows/s", justify="right")
+    table.add_row("user profiles", f"{n_users:,}", f"{users_s:.2f} s", "")
+    table.add_row(
+        "events", f"{n_events:,}", f"{events_s:.2f} s", f"{n_events / events_s:,.0f}"
+    )
+    console.print(table)
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Benchmark the event generator")
+    # ~29 events per user over the default 8 days: 350k users ~ 10M events
+    parser.add_argument("--users", type=int, default=350_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    run_benchmark(n_users=args.users, seed=args.seed, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
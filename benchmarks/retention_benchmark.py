@@ -0,0 +1,116 @@
+import argparse
+import logging
+import time
+
+from rich.console import Console
+from rich.table import Table
+
+from metric_anomaly_investigator.mock_warehouse import MockDataWarehouse
+
+logger = logging.getLogger(__name__)
+console = Console()
+
+USER_PROFILES_COLUMN_MAP = {
+    "platform": "signup_platform",
+    "country": "signup_country",
+}
+
+
+def legacy_cohort_retention(
+    warehouse: MockDataWarehouse,
+    cohort_date: str,
+    retention_days: list[int],
+    filters: dict[str, str] | None = None,
+) -> dict[str, float]:
+    """
+    Reference implementation: one event_stream join per retention day.
+    Kept here to check the single-scan engine against it.
+    """
+    cohort_size_query = """
+        SELECT COUNT(*)
+        FROM user_profiles
+        WHERE DATE(signup_date) = ?
+        """
+    params = [cohort_date]
+    for col, val in (filters or {}).items():
+        cohort_size_query += f" AND {USER_PROFILES_COLUMN_MAP.get(col, col)} = ?"
+        params.append(val)
+
+    cohort_size = warehouse._fetchone(cohort_size_query, params)[0]
+    if cohort_size == 0:
+        return {f"day_{day}": 0.0 for day in retention_days}
+
+    retention_rates = {}
+    for day in retention_days:
+        retention_query = """
+            SELECT COUNT(DISTINCT event_stream.user_id)
+            FROM event_stream
+            JOIN user_profiles ON event_stream.user_id = user_profiles.user_id
+            WHERE DATE(user_profiles.signup_date) = ?
+            AND DATE(event_stream.event_timestamp) = DATE(?, '+' || ? || ' days')
+        """
+        retention_params = [cohort_date, cohort_date, day]
+        for col, val in (filters or {}).items():
+            mapped_col = USER_PROFILES_COLUMN_MAP.get(col, col)
+            retention_query += f" AND user_profiles.{mapped_col} = ?"
+            retention_params.append(val)
+
+        retained_users = warehouse._fetchone(retention_query, retention_params)[0]
+        retention_rates[f"day_{day}"] = retained_users / cohort_size
+
+    return retention_rates
+
+
+def _best_of(repeat: int, fn, *args) -> tuple[float, dict]:
+    best = float("inf")
+    result = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark(
+    cohort_date: str, retention_days: list[int], repeat: int, db_path: str | None
+):
+    kwargs = {"db_path": db_path} if db_path else {}
+    with MockDataWarehouse(**kwargs) as warehouse:
+        legacy_s, legacy = _best_of(
+            repeat, legacy_cohort_retention, warehouse, cohort_date, retention_days
+        )
+        single_s, single = _best_of(
+            repeat, warehouse.analyze_cohort_retention, cohort_date, retention_days
+        )
+
+    if legacy != single:
+        raise AssertionError(f"Results differ:\nlegacy={legacy}\nsingle={single}")
+
+    table = Table(title=f"Retention {cohort_date} ({len(retention_days)} days)")
+    table.add_column("Engine", style="cyan")
+    table.add_column("Best of " + str(repeat), justify="right")
+    table.add_row("per-day loop", f"{legacy_s * 1000:.1f} ms")
+    table.add_row("single scan", f"{single_s * 1000:.1f} ms")
+    console.print(table)
+    console.print(f"Speedup: [bold green]{legacy_s / single_s:.1f}x[/bold green]")
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Benchmark cohort retention")
+    parser.add_argument("--cohort-date", default="2026-01-24")
+    parser.add_argument("--max-day", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db-path", default=None)
+    args = parser.parse_args()
+
+    run_benchmark(
+        cohort_date=args.cohort_date,
+        retention_days=list(range(1, args.max_day + 1)),
+        repeat=args.repeat,
+        db_path=args.db_path,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import json
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+from metric_anomaly_investigator.mock_warehouse import MockDataWarehouse
+from metric_anomaly_investigator.mock_warehouse.loader import (
+    load_database,
+    manifest_path,
+)
+from metric_anomaly_investigator.mock_warehouse.scenarios import (
+    DEFAULT_SCENARIO,
+    SCENARIOS,
+    get_scenario,
+)
+
+logger = logging.getLogger(__name__)
+console = Console()
+
+TIME_RANGE = ("2026-01-28", "2026-02-01")
+BASELINE_RANGE = ("2026-01-25", "2026-01-27")
+FULL_RANGE = ("2026-01-25", "2026-02-01")
+
+
+def _best_of(repeat: int, fn, *args, **kwargs) -> tuple[float, object]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _queries(warehouse: MockDataWarehouse) -> dict:
+    return {
+        "dau by platform": lambda: warehouse.query_metric(
+            "dau", FULL_RANGE, dimensions=["platform"]
+        ),
+        "wau": lambda: warehouse.query_metric("wau", FULL_RANGE),
+        "breakdown by country": lambda: warehouse.get_dimensional_breakdown(
+            "dau", "country", TIME_RANGE, BASELINE_RANGE
+        ),
+        "segment all dimensions": lambda: warehouse.segment_all_dimensions(
+            "dau", TIME_RANGE, BASELINE_RANGE
+        ),
+        "find root causes": lambda: warehouse.find_root_causes(
+            "dau", TIME_RANGE, BASELINE_RANGE
+        ),
+    }
+
+
+def run_benchmark(
+    scale_factors: list[float], scenario_name: str, seed: int, repeat: int, data_dir
+):
+    scenario = get_scenario(scenario_name)
+    timings: dict[str, dict[float, float]] = {}
+    recovered: dict[float, str] = {}
+    for scale_factor in scale_factors:
+        db_path = str(Path(data_dir) / f"sf{scale_factor:g}.db")
+        stats = load_database(
+            db_path, seed=seed, scenario=scenario, scale_factor=scale_factor
+        )
+        timings.setdefault("load", {})[scale_factor] = stats.seconds
+        timings.setdefault("events", {})[scale_factor] = stats.events
+
+        # result caches off: every repeat measures the engine
+        with MockDataWarehouse(
+            db_path=db_path, cache_max_entries=0, partial_cache_max_shapes=0
+        ) as warehouse:
+            for name, query in _queries(warehouse).items():
+                seconds, result = _best_of(repeat, query)
+                timings.setdefault(name, {})[scale_factor] = seconds
+                if name == "find root causes":
+                    root_causes = result
+        manifest = json.loads(manifest_path(db_path).read_text())
+        planted = [incident["segment"] for incident in manifest["incidents"]]
+        # a planted segment counts as found if a reported segment lies inside it
+        found = sum(
+            any(
+                segment.segment.items() >= cause.items()
+                for segment in root_causes.segments
+            )
+            for cause in planted
+        )
+        recovered[scale_factor] = f"{found}/{len(planted)}"
+
+    table = Table(title=f"Scale factors, scenario {scenario.name} (best of {repeat})")
+    table.add_column("Stage", style="cyan")
+    for scale_factor in scale_factors:
+        table.add_column(f"SF{scale_factor:g}", justify="right")
+    for name, by_scale in timings.items():
+        if name == "events":
+            cells = [f"{int(by_scale[sf]):,}" for sf in scale_factors]
+        elif name == "load":
+            cells = [f"{by_scale[sf]:.1f} s" for sf in scale_factors]
+        else:
+            cells = [f"{by_scale[sf] * 1000:.1f} ms" for sf in scale_factors]
+        table.add_row(name, *cells)
+    table.add_row("planted segments in top 5", *[recovered[sf] for sf in scale_factors])
+    console.print(table)
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(
+        description="Benchmark warehouse queries across dataset scale factors"
+    )
+    parser.add_argument(
+        "--scale-factors", type=float, nargs="+", default=[0.1, 0.5, 1.0]
+    )
+    parser.add_argument(
+        "--scenario", choices=sorted(SCENARIOS), default=DEFAULT_SCENARIO.name
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--data-dir", default=None, help="keep the generated databases here"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        run_benchmark(
+            scale_factors=args.scale_factors,
+            scenario_name=args.scenario,
+            seed=args.seed,
+            repeat=args.repeat,
+            data_dir=args.data_dir or scratch,
+        )
+
+
+if __name__ == "__main__":
+    main()
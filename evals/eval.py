@@ -242,9 +242,12 @@ async def run_eval(test_cases: list[dict] | None = None):
     console.print(f"[dim]Running {len(test_cases)} test cases...[/dim]")
 
     results = []
-    for test_case in test_cases:
-        result = await run_single_eval(agent, test_case)
-        results.append(result)
+    try:
+        for test_case in test_cases:
+            result = await run_single_eval(agent, test_case)
+            results.append(result)
+    finally:
+        agent.close()
 
     print_results(results)
     return results
@@ -0,0 +1,131 @@
+import logging
+
+from pydantic_ai.agent import AgentRunResult
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    SystemPromptPart,
+    UserPromptPart,
+)
+
+from metric_anomaly_investigator.schemas import StepResult
+from metric_anomaly_investigator.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# compacted steps keep their first findings, each line cut to this length
+SUMMARY_FINDINGS_PER_STEP = 3
+SUMMARY_LINE_CHARS = 300
+
+
+def format_step_results(steps: list[StepResult]) -> str:
+    lines = []
+    for step in steps:
+        lines.append(f"- Step {step.step_id}: success={step.success}\n")
+        lines.append(f"  Findings: {step.key_findings}\n")
+    return "".join(lines)
+
+
+def summarize_step(step: StepResult) -> str:
+    if not step.success:
+        return f"- Step {step.step_id}: failed"
+    findings = "; ".join(
+        finding.strip() for finding in step.key_findings[:SUMMARY_FINDINGS_PER_STEP]
+    )
+    if len(step.key_findings) > SUMMARY_FINDINGS_PER_STEP:
+        findings += "; ..."
+    return f"- Step {step.step_id}: {findings}"[:SUMMARY_LINE_CHARS]
+
+
+class StepHistory:
+    """
+    The step agent's pydantic-ai message history for one investigation.
+
+    Each decision sends only the step results that are new since the previous
+    one, on top of the earlier exchanges. Once a decision's prompt exceeds
+    `token_budget` input tokens, all but the `keep_recent` latest exchanges
+    are replaced by a one-line-per-step summary, so prompt size stays bounded
+    instead of growing with every step.
+    """
+
+    def __init__(
+        self,
+        query_text: str,
+        token_budget: int = settings.STEP_HISTORY_TOKEN_BUDGET,
+        keep_recent: int = settings.STEP_HISTORY_KEEP_RECENT,
+    ):
+        if keep_recent < 1:
+            raise ValueError(f"keep_recent must be >= 1, got {keep_recent}")
+        self.query_text = query_text
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        # one entry per decision: its messages and the steps its prompt reported
+        self._exchanges: list[tuple[list[ModelMessage], list[StepResult]]] = []
+        self._system_parts: list[SystemPromptPart] = []
+        self._summarized: list[StepResult] = []
+        self._reported = 0
+        # per decision: input tokens, and how many of them were cache reads
+        self.prompt_tokens: list[int] = []
+        self.cached_prompt_tokens: list[int] = []
+
+    def prompt(self, executed_steps: list[StepResult]) -> str:
+        """User prompt of the next decision: the step results it hasn't seen."""
+        new_steps = executed_steps[self._reported :]
+        if not self._exchanges and not self._summarized:
+            prompt = f"User query: {self.query_text}\n"
+            if new_steps:
+                prompt += "\nPrevious step results:\n" + format_step_results(new_steps)
+            return prompt
+        return "New step results:\n" + format_step_results(new_steps)
+
+    def messages(self) -> list[ModelMessage]:
+        """message_history for the next decision."""
+        messages: list[ModelMessage] = []
+        if self._summarized:
+            summary = "\n".join(summarize_step(step) for step in self._summarized)
+            messages.append(
+                ModelRequest(
+                    parts=[
+                        *self._system_parts,
+                        UserPromptPart(
+                            f"User query: {self.query_text}\n\n"
+                            f"Summary of earlier step results:\n{summary}"
+                        ),
+                    ]
+                )
+            )
+        for exchange, _ in self._exchanges:
+            messages.extend(exchange)
+        return messages
+
+    def record(self, result: AgentRunResult, executed_steps: list[StepResult]) -> None:
+        """Add a decision's exchange, compacting once over the token budget."""
+        if not self._exchanges and not self._summarized:
+            first_request = result.new_messages()[0]
+            self._system_parts = [
+                part
+                for part in first_request.parts
+                if isinstance(part, SystemPromptPart)
+            ]
+        self._exchanges.append(
+            (result.new_messages(), executed_steps[self._reported :])
+        )
+        self._reported = len(executed_steps)
+
+        input_tokens = result.usage.input_tokens
+        self.prompt_tokens.append(input_tokens)
+        self.cached_prompt_tokens.append(result.usage.cache_read_tokens)
+        if input_tokens > self.token_budget:
+            self._compact()
+
+    def _compact(self) -> None:
+        dropped = self._exchanges[: -self.keep_recent]
+        if not dropped:
+            return
+        self._exchanges = self._exchanges[-self.keep_recent :]
+        for _, steps in dropped:
+            self._summarized.extend(steps)
+        logger.info(
+            f"Compacted {len(dropped)} step-agent exchanges into a summary of "
+            f"{len(self._summarized)} steps"
+        )
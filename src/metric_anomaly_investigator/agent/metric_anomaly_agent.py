@@ -2,16 +2,23 @@ import logging
 import uuid
 
 from pydantic_ai import Agent
-from pydantic_ai.models.anthropic import AnthropicModel
+from pydantic_ai.models.anthropic import AnthropicModelSettings
 
-from metric_anomaly_investigator.mock_warehouse import MockDataWarehouse
+from metric_anomaly_investigator.mock_warehouse import create_warehouse
 from metric_anomaly_investigator.schemas import (
+    ActionStep,
     ConversationContext,
     InvestigationStep,
     UserQuery,
     StepResult,
     InsightReport,
 )
+from metric_anomaly_investigator.agent.message_history import StepHistory
+from metric_anomaly_investigator.agent.recording import LLMRecordings, create_model
+from metric_anomaly_investigator.agent.prefetch import (
+    SpeculativePrefetcher,
+    predict_next_steps,
+)
 from metric_anomaly_investigator.agent.tool_executor import ToolExecutor
 from metric_anomaly_investigator.agent.prompts import (
     STEP_DECISION_AGENT_PROMPT,
@@ -32,40 +39,56 @@ class MetricAnomalyAgent:
     """
 
     def __init__(self):
-        self.warehouse = MockDataWarehouse()
+        self.warehouse = create_warehouse()
         self.tool_executor = ToolExecutor(self.warehouse)
+        # shared by both sub-agents when recording or replaying LLM calls
+        self.recordings: LLMRecordings | None = None
+        if settings.LLM_MODE != "live":
+            self.recordings = LLMRecordings(settings.LLM_RECORDINGS_PATH)
         self._step_agent = self._create_step_decision_agent()
         self._insights_agent = self._create_insights_agent()
         self.conversations: dict[str, ConversationContext] = {}
 
+    def close(self) -> None:
+        """Stop the tool executor's workers, then close the warehouse."""
+        self.tool_executor.close()
+        self.warehouse.close()
+
     def _create_step_decision_agent(self) -> Agent:
         """Create the agent that decides the next investigation step."""
         return Agent(
-            model=AnthropicModel(model_name=settings.MODEL_NAME),
+            model=create_model("step", recordings=self.recordings),
             output_type=InvestigationStep,
             system_prompt=STEP_DECISION_AGENT_PROMPT,
+            # the message history only grows at its end (until compacted), so
+            # every decision can reuse the previous one's cached prefix
+            model_settings=AnthropicModelSettings(anthropic_cache=True),
         )
 
     def _create_insights_agent(self) -> Agent:
         """Create the agent that generates the final insights report."""
         return Agent(
-            model=AnthropicModel(model_name=settings.MODEL_NAME),
+            model=create_model("insights", recordings=self.recordings),
             output_type=InsightReport,
             system_prompt=INSIGHTS_GENERATOR_AGENT_PROMPT,
         )
 
     async def _decide_next_step(
-        self, query: UserQuery, executed_steps: list[StepResult]
+        self, history: StepHistory, executed_steps: list[StepResult]
     ) -> InvestigationStep:
-        """Use the step agent to decide the next investigation action."""
-        prompt = f"User query: {query.query_text}\n"
-        if executed_steps:
-            prompt += "\nPrevious step results:\n"
-            for step in executed_steps:
-                prompt += f"- Step {step.step_id}: success={step.success}\n"
-                prompt += f"  Findings: {step.key_findings}\n"
-
-        result = await self._step_agent.run(user_prompt=prompt)
+        """
+        Use the step agent to decide the next investigation action, sending
+        only the step results it hasn't seen yet on top of `history`.
+        """
+        result = await self._step_agent.run(
+            user_prompt=history.prompt(executed_steps),
+            message_history=history.messages(),
+        )
+        history.record(result, executed_steps)
+        logger.info(
+            f"Step decision prompt: {history.prompt_tokens[-1]} tokens "
+            f"({history.cached_prompt_tokens[-1]} read from cache)"
+        )
         return result.output
 
     async def _generate_insights(
@@ -112,8 +135,21 @@ class MetricAnomalyAgent:
         data_points = 0
         deployments_found = 0
         confidence_scores = []
+        warehouse_seconds = 0.0
+        queries_executed = 0
+        rows_returned = 0
+        slowest_step = None
 
         for step in executed_steps:
+            if step.perf:
+                warehouse_seconds += step.perf.wall_seconds
+                queries_executed += len(step.perf.queries)
+                rows_returned += step.perf.rows_returned
+                if (
+                    slowest_step is None
+                    or step.perf.wall_seconds > slowest_step.perf.wall_seconds
+                ):
+                    slowest_step = step
             if step.success:
                 confidence_scores.append(step.confidence_score)
                 if step.data:
@@ -134,6 +170,17 @@ class MetricAnomalyAgent:
             "deployments_found": deployments_found,
             "average_confidence_score": round(avg_confidence, 2),
             "requires_followup": avg_confidence < 0.7,
+            "warehouse_seconds": round(warehouse_seconds, 3),
+            "queries_executed": queries_executed,
+            "rows_returned": rows_returned,
+            "slowest_step": (
+                {
+                    "step_id": slowest_step.step_id,
+                    "wall_seconds": round(slowest_step.perf.wall_seconds, 3),
+                }
+                if slowest_step
+                else None
+            ),
         }
 
     async def investigate_anomaly(
@@ -143,8 +190,8 @@ class MetricAnomalyAgent:
         Investigate a metric anomaly using the iterative step-by-step approach.
 
         Flow:
-        1. Step agent decides next action
-        2. Execute the action
+        1. Step agent decides next action (or a batch of independent actions)
+        2. Execute the action off the event loop, running a batch concurrently
         3. Repeat until step agent chooses generate_insights
         4. Insights agent synthesizes all findings into InsightReport
         """
@@ -158,15 +205,49 @@ class MetricAnomalyAgent:
         user_query = UserQuery(query_text=query, context_id=context_id)
         logger.info(f"Starting investigation for context {context_id}")
 
+        history = StepHistory(user_query.query_text)
+        # one prefetcher per investigation: its pending speculations and stats
+        # must not mix with those of investigations running concurrently
+        prefetcher = self.tool_executor.create_prefetcher()
+        try:
+            insights = await self._investigate(query, context, history, prefetcher)
+        finally:
+            if prefetcher is not None:
+                prefetcher.close()
+        context.insights = insights
+        return context
+
+    async def _investigate(
+        self,
+        query: str,
+        context: ConversationContext,
+        history: StepHistory,
+        prefetcher: SpeculativePrefetcher | None,
+    ) -> InsightReport | None:
+        """The decide/execute loop of investigate_anomaly."""
+        executed_actions: list[ActionStep] = []
         insights = None
         for iteration in range(settings.MAX_INVESTIGATION_STEPS):
+            # keep the warehouse busy with the likely next steps while the
+            # step agent decides
+            if prefetcher is not None:
+                prefetcher.speculate(predict_next_steps(query, executed_actions))
             next_step = await self._decide_next_step(
-                query=user_query, executed_steps=context.executed_steps
+                history=history, executed_steps=context.executed_steps
             )
             logger.info(
                 f"Step {iteration + 1}: {next_step.action} - {next_step.reasoning}"
             )
 
+            if next_step.action == "parallel_actions":
+                actions = next_step.parameters.actions
+            elif next_step.action == "generate_insights":
+                actions = []
+            else:
+                actions = [next_step]
+            if prefetcher is not None:
+                prefetcher.resolve(actions)
+
             if next_step.action == "generate_insights":
                 logger.info("Generating insights report...")
                 hypothesis = next_step.parameters.preliminary_hypothesis
@@ -179,23 +260,45 @@ class MetricAnomalyAgent:
                 insights.supporting_data = self._compute_supporting_data(
                     context.executed_steps
                 )
+                insights.supporting_data.update(
+                    step_prompt_tokens=history.prompt_tokens,
+                    step_cached_prompt_tokens=history.cached_prompt_tokens,
+                )
+                if prefetcher is not None:
+                    insights.supporting_data.update(
+                        prefetch_hit_rate=round(prefetcher.stats.hit_rate, 2),
+                        prefetch_saved_seconds=round(prefetcher.stats.saved_seconds, 3),
+                    )
                 logger.info(
                     f"Insights generated with confidence {insights.confidence_score}"
                 )
                 break
 
-            result = self.tool_executor.execute_step(next_step)
-            context.executed_steps.append(result)
-
-            if result.success:
-                logger.info(f"Step {next_step.step_id} executed successfully")
-                for finding in result.key_findings:
-                    logger.info(f"  Finding: {finding}")
-            else:
-                logger.error(f"Step {next_step.step_id} failed: {result.error_message}")
-
-        context.insights = insights
-        return context
+            # off the event loop, so concurrent investigations keep going
+            results = await self.tool_executor.execute_steps_async(
+                actions, prefetcher=prefetcher
+            )
+            executed_actions.extend(actions)
+
+            for result in results:
+                context.executed_steps.append(result)
+                if result.success:
+                    logger.info(f"Step {result.step_id} executed successfully")
+                    for finding in result.key_findings:
+                        logger.info(f"  Finding: {finding}")
+                else:
+                    logger.error(
+                        f"Step {result.step_id} failed: {result.error_message}"
+                    )
+
+        if prefetcher is not None:
+            stats = prefetcher.stats
+            logger.info(
+                f"Speculative prefetch: {stats.hits}/{stats.hits + stats.misses} "
+                f"steps served ({stats.hit_rate:.0%}), "
+                f"{stats.saved_seconds:.2f}s saved, {stats.cancelled} cancelled"
+            )
+        return insights
 
     async def follow_up_conversation(
         self,
@@ -0,0 +1,172 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from metric_anomaly_investigator.schemas import (
+    ActionStep,
+    CheckDeploymentsStep,
+    QueryMetricStep,
+    SegmentAllDimensionsStep,
+    SegmentByDimensionStep,
+    StepResult,
+)
+from metric_anomaly_investigator.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# dimensions in the order investigations usually segment them
+PREFETCH_DIMENSIONS = ["platform", "country", "device_type", "app_version"]
+ISO_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+METRIC_PATTERNS = {
+    "dau": re.compile(r"\bdau\b|daily active", re.IGNORECASE),
+    "wau": re.compile(r"\bwau\b|weekly active", re.IGNORECASE),
+    "events_per_user": re.compile(r"events[ _]per[ _]user", re.IGNORECASE),
+}
+SPECULATIVE_REASONING = "speculative prefetch"
+
+
+@dataclass
+class PrefetchStats:
+    speculated: int = 0
+    hits: int = 0
+    misses: int = 0
+    cancelled: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def step_key(step: ActionStep) -> tuple[str, str]:
+    """Identifies what a step computes, regardless of its step_id and reasoning."""
+    parameters = step.parameters.model_dump(mode="json")
+    return step.action, json.dumps(parameters, sort_keys=True)
+
+
+def predict_next_steps(
+    query_text: str,
+    history: list[ActionStep],
+    max_steps: int = settings.PREFETCH_MAX_STEPS,
+) -> list[ActionStep]:
+    """
+    Most probable follow-up actions, most likely first: the anomaly window
+    comes from the latest executed step (or the dates in `query_text`), and
+    the usual investigation order is magnitude -> segmentation -> deployments.
+    """
+    metric_name = time_range = baseline_range = None
+    for executed in reversed(history):
+        parameters = executed.parameters
+        metric_name = metric_name or getattr(parameters, "metric_name", None)
+        time_range = time_range or getattr(parameters, "time_range", None)
+        baseline_range = baseline_range or getattr(parameters, "baseline_range", None)
+    if time_range is None:
+        dates = sorted(ISO_DATE.findall(query_text))
+        if len(dates) >= 2:
+            time_range = (dates[0], dates[-1])
+    if metric_name is None:
+        metric_name = next(
+            (name for name, p in METRIC_PATTERNS.items() if p.search(query_text)),
+            None,
+        )
+    if time_range is None:
+        return []
+
+    def speculative(cls, **parameters):
+        return cls(step_id=0, reasoning=SPECULATIVE_REASONING, parameters=parameters)
+
+    candidates = []
+    if metric_name and not history:
+        candidates.append(
+            speculative(QueryMetricStep, metric_name=metric_name, time_range=time_range)
+        )
+    candidates.append(speculative(CheckDeploymentsStep, time_range=time_range))
+    if metric_name and baseline_range:
+        window = {
+            "metric_name": metric_name,
+            "time_range": time_range,
+            "baseline_range": baseline_range,
+        }
+        candidates.append(speculative(SegmentAllDimensionsStep, **window))
+        # find_root_causes scans every dimension combination; too costly to
+        # run on a guess
+        candidates.extend(
+            speculative(SegmentByDimensionStep, dimension=dimension, **window)
+            for dimension in PREFETCH_DIMENSIONS
+        )
+
+    done = {step_key(s) for s in history}
+    return [s for s in candidates if step_key(s) not in done][:max_steps]
+
+
+class SpeculativePrefetcher:
+    """
+    Runs predicted steps in the background while the step agent is thinking.
+
+    Results are parked by `step_key`; `take` hands one out when the chosen
+    step computes the same thing, waiting for it if it is still running.
+    `resolve` cancels speculations the chosen steps won't use. A speculation
+    already running when cancelled finishes anyway (SQLite can't be stopped
+    mid-query from here) and only warms the warehouse result cache.
+    """
+
+    def __init__(
+        self,
+        run_step: Callable[[ActionStep], StepResult],
+        max_workers: int = settings.PREFETCH_WORKERS,
+    ):
+        self._run_step = run_step
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="prefetch"
+        )
+        self._pending: dict[tuple[str, str], Future[StepResult]] = {}
+        self._lock = threading.Lock()
+        self.stats = PrefetchStats()
+
+    def speculate(self, steps: list[ActionStep]) -> None:
+        with self._lock:
+            for step in steps:
+                key = step_key(step)
+                if key not in self._pending:
+                    self._pending[key] = self._executor.submit(self._run_step, step)
+                    self.stats.speculated += 1
+        if steps:
+            logger.debug(f"Speculating {[step.action for step in steps]}")
+
+    def resolve(self, steps: list[ActionStep]) -> None:
+        """Cancel every speculation none of `steps` will take."""
+        keep = {step_key(step) for step in steps}
+        with self._lock:
+            for key in [key for key in self._pending if key not in keep]:
+                if self._pending.pop(key).cancel():
+                    self.stats.cancelled += 1
+
+    def take(self, step: ActionStep) -> StepResult | None:
+        """The speculative result for `step`, or None on a miss."""
+        with self._lock:
+            future = self._pending.pop(step_key(step), None)
+        result = None
+        waited = 0.0
+        if future is not None and not future.cancelled():
+            started = time.perf_counter()
+            result = future.result()
+            waited = time.perf_counter() - started
+        with self._lock:
+            # a failed speculation is re-run so the step reports its own error
+            if result is None or not result.success:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self.stats.saved_seconds += max(result.perf.wall_seconds - waited, 0.0)
+        return result.model_copy(update={"step_id": step.step_id})
+
+    def close(self) -> None:
+        with self._lock:
+            self._pending.clear()
+        self._executor.shutdown(cancel_futures=True)
@@ -0,0 +1,145 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Literal
+
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter, ModelResponse
+from pydantic_ai.models import Model, ModelRequestParameters
+from pydantic_ai.models.anthropic import AnthropicModel
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+from metric_anomaly_investigator.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# live: call Anthropic
+# record: call Anthropic and store every response by prompt hash
+# replay: answer from the stored responses only, no network
+LLMMode = Literal["live", "record", "replay"]
+
+# message part fields that make up a prompt; timestamps and tool call ids
+# differ between otherwise identical runs, so they are left out of the hash
+PROMPT_FIELDS = ("content", "tool_name", "args")
+
+
+class RecordingNotFoundError(LookupError):
+    pass
+
+
+def prompt_key(messages: list[ModelMessage]) -> str:
+    """Hash of the prompt content of `messages`."""
+    prompt = [
+        [
+            {"part_kind": part.part_kind}
+            | {
+                field: getattr(part, field)
+                for field in PROMPT_FIELDS
+                if hasattr(part, field)
+            }
+            for part in message.parts
+        ]
+        for message in messages
+    ]
+    encoded = json.dumps(prompt, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class LLMRecordings:
+    """
+    Model responses keyed by prompt hash, appended to a JSONL file as they
+    are recorded. A prompt recorded twice replays its latest response.
+    """
+
+    def __init__(self, path: str = settings.LLM_RECORDINGS_PATH):
+        self.path = path
+        self._responses: dict[str, ModelResponse] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    record = json.loads(line)
+                    [response] = ModelMessagesTypeAdapter.validate_python(
+                        [record["response"]]
+                    )
+                    self._responses[record["key"]] = response
+            logger.info(f"Loaded {len(self._responses)} LLM recordings from {path}")
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def get(self, key: str) -> ModelResponse | None:
+        response = self._responses.get(key)
+        # FunctionModel stamps its own model name on the response it returns
+        return copy.deepcopy(response) if response is not None else None
+
+    def add(self, role: str, key: str, response: ModelResponse) -> None:
+        [dumped] = ModelMessagesTypeAdapter.dump_python([response], mode="json")
+        record = {"role": role, "key": key, "response": dumped}
+        with self._lock:
+            self._responses[key] = response
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+
+class RecordingModel(WrapperModel):
+    """Passes requests through to `wrapped` and records every response."""
+
+    def __init__(self, wrapped: Model, recordings: LLMRecordings, role: str):
+        super().__init__(wrapped)
+        self.recordings = recordings
+        self.role = role
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        response = await super().request(
+            messages, model_settings, model_request_parameters
+        )
+        self.recordings.add(self.role, prompt_key(messages), response)
+        return response
+
+
+def replay_model(recordings: LLMRecordings, role: str) -> FunctionModel:
+    """A model that answers only prompts found in `recordings`."""
+
+    def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        key = prompt_key(messages)
+        response = recordings.get(key)
+        if response is None:
+            raise RecordingNotFoundError(
+                f"No recorded {role} response for prompt {key[:12]} in "
+                f"{recordings.path}; re-run with LLM_MODE=record"
+            )
+        return response
+
+    return FunctionModel(respond, model_name=f"replay:{role}")
+
+
+def create_model(
+    role: str,
+    mode: LLMMode = settings.LLM_MODE,
+    recordings: LLMRecordings | None = None,
+) -> Model:
+    """The model an agent uses for `role` ("step", "insights") in `mode`."""
+    match mode:
+        case "live":
+            return AnthropicModel(model_name=settings.MODEL_NAME)
+        case "record":
+            return RecordingModel(
+                AnthropicModel(model_name=settings.MODEL_NAME),
+                recordings or LLMRecordings(),
+                role,
+            )
+        case "replay":
+            return replay_model(recordings or LLMRecordings(), role)
+        case _:
+            raise ValueError(f"Unknown LLM mode: {mode}. Supported: {LLMMode}")
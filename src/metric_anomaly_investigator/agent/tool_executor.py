@@ -1,24 +1,124 @@
+import asyncio
 import logging
+import multiprocessing
+import threading
+import time
 import traceback
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Literal
 
+from metric_anomaly_investigator.agent.prefetch import SpeculativePrefetcher
 from metric_anomaly_investigator.schemas import (
+    ActionStep,
     InvestigationStep,
     StepResult,
+    SamplingParams,
     QueryMetricParams,
     SegmentByDimensionParams,
+    SegmentAllDimensionsParams,
+    FindRootCausesParams,
     CheckDeploymentsParams,
     AnalyzeRetentionParams,
     StatisticalTestParams,
 )
-from metric_anomaly_investigator.mock_warehouse import MockDataWarehouse
+from metric_anomaly_investigator.mock_warehouse import (
+    MockDataWarehouse,
+    create_warehouse,
+)
+from metric_anomaly_investigator.mock_warehouse.async_warehouse import run_off_loop
+from metric_anomaly_investigator.mock_warehouse.instrumentation import summarize
 from metric_anomaly_investigator.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# thread: share this process's warehouse, its pool and caches
+# process: each worker opens its own warehouse, so CPU-bound Python work
+# (root-cause search, findings) also runs outside the GIL
+AsyncExecutorKind = Literal["thread", "process"]
+
+# ToolExecutor of a process-pool worker, set by _init_worker
+_worker_executor: "ToolExecutor | None" = None
+
+
+def _init_worker(db_path: str) -> None:
+    global _worker_executor
+    _worker_executor = ToolExecutor(create_warehouse(db_path=db_path), prefetch=False)
+
+
+def _execute_in_worker(step: ActionStep) -> StepResult:
+    return _worker_executor.execute_step(step)
+
 
 class ToolExecutor:
-    def __init__(self, warehouse: MockDataWarehouse):
+    def __init__(
+        self,
+        warehouse: MockDataWarehouse,
+        max_parallel_actions: int = settings.MAX_PARALLEL_ACTIONS,
+        prefetch: bool = settings.SPECULATIVE_PREFETCH,
+        async_executor: AsyncExecutorKind = settings.ASYNC_EXECUTOR,
+        async_workers: int = settings.ASYNC_EXECUTOR_WORKERS,
+    ):
+        if max_parallel_actions < 1:
+            raise ValueError(
+                f"max_parallel_actions must be >= 1, got {max_parallel_actions}"
+            )
+        if async_executor not in ("thread", "process"):
+            raise ValueError(
+                f"Unknown async executor: {async_executor}. "
+                f"Supported: {AsyncExecutorKind}"
+            )
         self.warehouse = warehouse
+        self.max_parallel_actions = max_parallel_actions
+        self.prefetch = prefetch
+        self.async_executor = async_executor
+        self.async_workers = async_workers
+        # created on first async use, so sync callers never spawn workers
+        self._async_pool: Executor | None = None
+        self._async_pool_lock = threading.Lock()
+
+    def close(self) -> None:
+        """Stop the async pool; the warehouse stays open."""
+        with self._async_pool_lock:
+            if self._async_pool is not None:
+                self._async_pool.shutdown(cancel_futures=True)
+                self._async_pool = None
+
+    def create_prefetcher(self) -> SpeculativePrefetcher | None:
+        """
+        A prefetcher for one investigation (None when prefetch is off). The
+        caller passes it to the execute methods and closes it when done.
+        """
+        if not self.prefetch:
+            return None
+        return SpeculativePrefetcher(self._run_step)
+
+    def _get_async_pool(self) -> Executor:
+        with self._async_pool_lock:
+            if self._async_pool is None:
+                match self.async_executor:
+                    case "thread":
+                        self._async_pool = ThreadPoolExecutor(
+                            max_workers=self.async_workers,
+                            thread_name_prefix="async-step",
+                        )
+                    case "process":
+                        # spawn: this process runs scan and prefetch threads,
+                        # which fork() would copy mid-flight
+                        self._async_pool = ProcessPoolExecutor(
+                            max_workers=self.async_workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                            initializer=_init_worker,
+                            initargs=(self.warehouse.db_path,),
+                        )
+            return self._async_pool
+
+    @staticmethod
+    def _sampling_kwargs(parameters: SamplingParams) -> dict:
+        return {
+            "approximate": parameters.approximate,
+            "sampling_rate": parameters.sampling_rate
+            or settings.APPROXIMATE_SAMPLING_RATE,
+        }
 
     def _execute_query_metric(self, parameters: QueryMetricParams | dict) -> dict:
         if isinstance(parameters, dict):
@@ -28,6 +128,7 @@ class ToolExecutor:
             time_range=tuple(parameters.time_range),
             dimensions=parameters.dimensions,
             filters=parameters.filters,
+            **self._sampling_kwargs(parameters),
         )
         return {"metric_data": [r.model_dump() for r in results]}
 
@@ -43,9 +144,38 @@ class ToolExecutor:
             time_range=tuple(parameters.time_range),
             baseline_range=tuple(parameters.baseline_range),
             min_drop_threshold=parameters.min_drop_threshold,
+            **self._sampling_kwargs(parameters),
+        )
+        return {"segmented_data": [r.model_dump() for r in results]}
+
+    def _execute_all_dimensions_segmentation(
+        self, parameters: SegmentAllDimensionsParams | dict
+    ) -> dict:
+        if isinstance(parameters, dict):
+            parameters = SegmentAllDimensionsParams(**parameters)
+        results = self.warehouse.segment_all_dimensions(
+            metric_name=parameters.metric_name,
+            time_range=tuple(parameters.time_range),
+            baseline_range=tuple(parameters.baseline_range),
+            min_drop_threshold=parameters.min_drop_threshold,
+            **self._sampling_kwargs(parameters),
         )
         return {"segmented_data": [r.model_dump() for r in results]}
 
+    def _execute_root_cause_search(
+        self, parameters: FindRootCausesParams | dict
+    ) -> dict:
+        if isinstance(parameters, dict):
+            parameters = FindRootCausesParams(**parameters)
+        result = self.warehouse.find_root_causes(
+            metric_name=parameters.metric_name,
+            time_range=tuple(parameters.time_range),
+            baseline_range=tuple(parameters.baseline_range),
+            top_k=parameters.top_k,
+            max_depth=parameters.max_depth,
+        )
+        return {"root_causes": result.model_dump()}
+
     def _execute_deployment_check(
         self, parameters: CheckDeploymentsParams | dict
     ) -> dict:
@@ -79,6 +209,7 @@ class ToolExecutor:
             control_filters=parameters.control_filters,
             treatment_filters=parameters.treatment_filters,
             time_range=tuple(parameters.time_range),
+            **self._sampling_kwargs(parameters),
         )
         return {"statistical_test_result": result}
 
@@ -91,6 +222,11 @@ class ToolExecutor:
                     findings.append(
                         f"Queried {len(metric_data)} data points for the metric."
                     )
+                    if metric_data[0].get("confidence_interval"):
+                        findings.append(
+                            "  (approximate: estimated from a user sample, "
+                            "see confidence_interval)"
+                        )
             case "segment_by_dimension":
                 segmented_data = data.get("segmented_data", [])
                 if segmented_data:
@@ -109,7 +245,49 @@ class ToolExecutor:
                         findings.append(
                             f"  - {dim_value}: {pct_change:+.1%} change "
                             f"(before={before:.0f}, after={after:.0f}, n={sample_size})"
+                            f"{self._interval_note(segment)}"
                         )
+            case "segment_all_dimensions":
+                segmented_data = data.get("segmented_data", [])
+                if segmented_data:
+                    findings.append("Largest drops across all dimensions:")
+                    for segment in segmented_data:
+                        dim_name = segment.get("dimension_name", "unknown")
+                        dim_value = segment.get("dimension_value", "unknown")
+                        pct_change = segment.get("pct_change", 0)
+                        before = segment.get("before_value", 0)
+                        after = segment.get("after_value", 0)
+                        sample_size = segment.get("sample_size", 0)
+                        findings.append(
+                            f"  - {dim_name}={dim_value}: {pct_change:+.1%} change "
+                            f"(before={before:.0f}, after={after:.0f}, n={sample_size})"
+                            f"{self._interval_note(segment)}"
+                        )
+                else:
+                    findings.append("No segment dropped beyond the threshold.")
+            case "find_root_causes":
+                root_causes = data.get("root_causes", {})
+                segments = root_causes.get("segments", [])
+                if segments:
+                    note = " (time budget reached)" if root_causes["truncated"] else ""
+                    findings.append(
+                        f"Top root-cause segments out of "
+                        f"{root_causes['cells_evaluated']} searched{note}:"
+                    )
+                    for segment in segments:
+                        name = ", ".join(
+                            f"{dim}={value}"
+                            for dim, value in segment["segment"].items()
+                        )
+                        findings.append(
+                            f"  - {name}: {segment['pct_change']:+.1%} change "
+                            f"(before={segment['baseline_value']:.2f}, "
+                            f"after={segment['current_value']:.2f}), "
+                            f"explains {segment['explanatory_power']:.0%} of the change, "
+                            f"score={segment['score']:.2f}"
+                        )
+                else:
+                    findings.append("No segment explains the change.")
             case "check_deployments":
                 deployments = data.get("deployments", [])
                 if deployments:
@@ -145,12 +323,74 @@ class ToolExecutor:
                         f"significant={significant}, "
                         f"control_mean={control_mean:.2f}, treatment_mean={treatment_mean:.2f}"
                     )
+                    if "sampling_rate" in test_result:
+                        control_low, control_high = test_result["control_mean_interval"]
+                        treatment_low, treatment_high = test_result[
+                            "treatment_mean_interval"
+                        ]
+                        findings.append(
+                            f"  (approximate, {test_result['sampling_rate']:.0%} user "
+                            f"sample: 95% CI control=[{control_low:.2f}, "
+                            f"{control_high:.2f}], treatment=[{treatment_low:.2f}, "
+                            f"{treatment_high:.2f}])"
+                        )
 
         return findings
 
+    @staticmethod
+    def _interval_note(segment: dict) -> str:
+        interval = segment.get("pct_change_interval")
+        if not interval:
+            return ""
+        return f" [95% CI {interval[0]:+.1%} to {interval[1]:+.1%}, sampled]"
+
     def _compute_confidence(self, action: str, data: dict) -> float:
+        confidence = self._evidence_confidence(action, data)
+        if confidence is None:
+            return confidence
+        # approximate results: discount by the relative width of their
+        # confidence intervals, so a noisy sample never scores like an
+        # exact query
+        return confidence / (1.0 + self._sampling_error(action, data))
+
+    @staticmethod
+    def _sampling_error(action: str, data: dict) -> float:
+        """Mean relative half-width of the result's confidence intervals."""
+        estimates = []
         match action:
-            case "segment_by_dimension":
+            case "query_metric":
+                estimates = [
+                    (point["value"], point["confidence_interval"])
+                    for point in data.get("metric_data", [])
+                ]
+            case "segment_by_dimension" | "segment_all_dimensions":
+                estimates = [
+                    (segment["pct_change"], segment["pct_change_interval"])
+                    for segment in data.get("segmented_data", [])
+                ]
+            case "statistical_analysis":
+                test_result = data.get("statistical_test_result", {})
+                if "sampling_rate" in test_result:
+                    estimates = [
+                        (
+                            test_result["control_mean"],
+                            test_result["control_mean_interval"],
+                        ),
+                        (
+                            test_result["treatment_mean"],
+                            test_result["treatment_mean_interval"],
+                        ),
+                    ]
+        errors = [
+            (interval[1] - interval[0]) / 2 / abs(value)
+            for value, interval in estimates
+            if interval is not None and value
+        ]
+        return sum(errors) / len(errors) if errors else 0.0
+
+    def _evidence_confidence(self, action: str, data: dict) -> float | None:
+        match action:
+            case "segment_by_dimension" | "segment_all_dimensions":
                 segments = data.get("segmented_data", [])
                 if len(segments) == 0:  # low confidence
                     return 0.3
@@ -165,6 +405,17 @@ class ToolExecutor:
                     return 0.7
                 else:
                     return 0.5
+            case "find_root_causes":
+                segments = data.get("root_causes", {}).get("segments", [])
+                if len(segments) == 0:
+                    return 0.3
+                top_score = segments[0]["score"]
+                if top_score > 0.5:
+                    return 0.85
+                elif top_score > 0.2:
+                    return 0.7
+                else:
+                    return 0.5
             case "check_deployments":
                 deployments = data.get("deployments", [])
                 if len(deployments) > 0:
@@ -174,7 +425,92 @@ class ToolExecutor:
 
         return settings.DEFAULT_MODEL_CONFIDENCE
 
-    def execute_step(self, step: InvestigationStep) -> StepResult:
+    def execute_step(
+        self,
+        step: InvestigationStep,
+        prefetcher: SpeculativePrefetcher | None = None,
+    ) -> StepResult:
+        if prefetcher is not None:
+            result = prefetcher.take(step)
+            if result is not None:
+                logger.info(f"Step {step.step_id} served by speculative prefetch")
+                return result
+        return self._run_step(step)
+
+    def _run_step(self, step: InvestigationStep) -> StepResult:
+        started = time.perf_counter()
+        with self.warehouse.profiler.record() as queries:
+            result = self._execute_step(step)
+        result.perf = summarize(time.perf_counter() - started, queries)
+        logger.info(
+            f"Step {step.step_id} took {result.perf.wall_seconds:.3f}s "
+            f"({len(queries)} queries, {result.perf.query_seconds:.3f}s in SQLite)"
+        )
+        return result
+
+    def execute_steps(
+        self,
+        steps: list[ActionStep],
+        prefetcher: SpeculativePrefetcher | None = None,
+    ) -> list[StepResult]:
+        """
+        Run independent steps concurrently on up to `max_parallel_actions`
+        threads; results come back in the order of `steps`.
+        """
+        if len(steps) == 1:
+            return [self.execute_step(steps[0], prefetcher)]
+        # the warehouse is thread-safe (pooled connections, locked caches) and
+        # sqlite3 releases the GIL while a query runs
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_parallel_actions, len(steps)),
+            thread_name_prefix="investigation-action",
+        ) as pool:
+            return list(
+                pool.map(lambda step: self.execute_step(step, prefetcher), steps)
+            )
+
+    async def execute_step_async(
+        self,
+        step: ActionStep,
+        prefetcher: SpeculativePrefetcher | None = None,
+    ) -> StepResult:
+        """
+        execute_step without blocking the event loop. Cancelling the awaiting
+        task drops a queued step; on the thread pool it also aborts a running
+        step's SQLite queries (a process worker finishes its step).
+        """
+        if self.async_executor == "thread":
+            return await run_off_loop(
+                self._get_async_pool(), self.execute_step, step, prefetcher
+            )
+        if prefetcher is not None:
+            # a hit may still be running; wait for it off the loop
+            result = await asyncio.to_thread(prefetcher.take, step)
+            if result is not None:
+                return result
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_async_pool(), _execute_in_worker, step
+        )
+
+    async def execute_steps_async(
+        self,
+        steps: list[ActionStep],
+        prefetcher: SpeculativePrefetcher | None = None,
+    ) -> list[StepResult]:
+        """
+        execute_steps without blocking the event loop, at most
+        `max_parallel_actions` at a time; results in the order of `steps`.
+        """
+        limit = asyncio.Semaphore(self.max_parallel_actions)
+
+        async def execute(step: ActionStep) -> StepResult:
+            async with limit:
+                return await self.execute_step_async(step, prefetcher)
+
+        return list(await asyncio.gather(*(execute(step) for step in steps)))
+
+    def _execute_step(self, step: InvestigationStep) -> StepResult:
         try:
             action_value = step.action  # Already a string from Literal type
             logger.info(f"Executing action: {action_value}")
@@ -184,6 +520,10 @@ class ToolExecutor:
                     data = self._execute_query_metric(step.parameters)
                 case "segment_by_dimension":
                     data = self._execute_segmentation(step.parameters)
+                case "segment_all_dimensions":
+                    data = self._execute_all_dimensions_segmentation(step.parameters)
+                case "find_root_causes":
+                    data = self._execute_root_cause_search(step.parameters)
                 case "check_deployments":
                     data = self._execute_deployment_check(step.parameters)
                 case "analyze_retention":
@@ -19,25 +19,28 @@ async def async_main():
 
     context_id = None
 
-    while True:
-        query = input("Enter your anomaly query (or 'exit' to quit): ").strip()
-        if query.lower() == "exit":
-            break
-        if not query:
-            continue
-
-        try:
-            context = await agent.investigate_anomaly(query, context_id=context_id)
-            logger.info(f"Investigation Plan:\n{context}\n")
-
-            report = agent.conversations[context.conversation_id].insights
-            if report:
-                print_report(report, console)
-            else:
-                logger.warning("No insights report generated.")
-        except Exception as e:
-            logger.error(f"Error during investigation: {e}")
-            logger.error(traceback.format_exc())
+    try:
+        while True:
+            query = input("Enter your anomaly query (or 'exit' to quit): ").strip()
+            if query.lower() == "exit":
+                break
+            if not query:
+                continue
+
+            try:
+                context = await agent.investigate_anomaly(query, context_id=context_id)
+                logger.info(f"Investigation Plan:\n{context}\n")
+
+                report = agent.conversations[context.conversation_id].insights
+                if report:
+                    print_report(report, console)
+                else:
+                    logger.warning("No insights report generated.")
+            except Exception as e:
+                logger.error(f"Error during investigation: {e}")
+                logger.error(traceback.format_exc())
+    finally:
+        agent.close()
 
 
 def main():
@@ -1,9 +1,25 @@
-from .generator import generate_user_profiles, generate_events, generate_deployments
+from .generator import (
+    generate_user_profiles,
+    generate_events,
+    generate_deployments,
+    iter_block_events,
+    iter_events,
+    iter_user_blocks,
+)
 from .warehouse import MockDataWarehouse
+from .columnar import ColumnarWarehouse
+from .factory import create_warehouse
+from .async_warehouse import AsyncWarehouse
 
 __all__ = [
     "generate_user_profiles",
     "generate_events",
     "generate_deployments",
+    "iter_block_events",
+    "iter_events",
+    "iter_user_blocks",
     "MockDataWarehouse",
+    "ColumnarWarehouse",
+    "create_warehouse",
+    "AsyncWarehouse",
 ]
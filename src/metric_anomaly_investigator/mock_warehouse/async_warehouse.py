@@ -0,0 +1,100 @@
+import asyncio
+import contextvars
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from metric_anomaly_investigator.mock_warehouse.instrumentation import cancellable
+from metric_anomaly_investigator.mock_warehouse.warehouse import MockDataWarehouse
+from metric_anomaly_investigator.schemas import (
+    Deployment,
+    DimensionalBreakdown,
+    MetricDataPoint,
+    RootCauseAnalysis,
+)
+from metric_anomaly_investigator.settings import settings
+
+T = TypeVar("T")
+
+
+async def run_off_loop(
+    executor: Executor, fn: Callable[..., T], /, *args: Any, **kwargs: Any
+) -> T:
+    """
+    Await `fn(*args, **kwargs)` run on a thread of `executor`, in a copy of
+    the caller's context. Cancelling the awaiting task drops the call if it
+    hasn't started, and otherwise aborts its SQLite queries, so the thread
+    is freed within a progress-handler tick instead of finishing the scan.
+    """
+    cancelled = threading.Event()
+    context = contextvars.copy_context()
+
+    def call() -> T:
+        with cancellable(cancelled):
+            return fn(*args, **kwargs)
+
+    future = executor.submit(context.run, call)
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+
+
+class AsyncWarehouse:
+    """
+    Async facade over a MockDataWarehouse: every query runs on a thread pool
+    (sqlite3 releases the GIL while a query steps), so a slow scan never
+    blocks the event loop and concurrent investigations overlap.
+    """
+
+    def __init__(
+        self,
+        warehouse: MockDataWarehouse,
+        max_workers: int = settings.ASYNC_EXECUTOR_WORKERS,
+    ):
+        self.warehouse = warehouse
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="async-warehouse"
+        )
+
+    def close(self) -> None:
+        """Shut the thread pool down; the wrapped warehouse stays open."""
+        self._executor.shutdown(cancel_futures=True)
+
+    async def __aenter__(self) -> "AsyncWarehouse":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    async def _run(self, method: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await run_off_loop(self._executor, method, *args, **kwargs)
+
+    async def query_metric(self, *args, **kwargs) -> list[MetricDataPoint]:
+        return await self._run(self.warehouse.query_metric, *args, **kwargs)
+
+    async def get_dimensional_breakdown(
+        self, *args, **kwargs
+    ) -> list[DimensionalBreakdown]:
+        return await self._run(
+            self.warehouse.get_dimensional_breakdown, *args, **kwargs
+        )
+
+    async def segment_all_dimensions(
+        self, *args, **kwargs
+    ) -> list[DimensionalBreakdown]:
+        return await self._run(self.warehouse.segment_all_dimensions, *args, **kwargs)
+
+    async def find_root_causes(self, *args, **kwargs) -> RootCauseAnalysis:
+        return await self._run(self.warehouse.find_root_causes, *args, **kwargs)
+
+    async def check_deployments(self, *args, **kwargs) -> list[Deployment]:
+        return await self._run(self.warehouse.check_deployments, *args, **kwargs)
+
+    async def analyze_cohort_retention(self, *args, **kwargs) -> dict[str, float]:
+        return await self._run(self.warehouse.analyze_cohort_retention, *args, **kwargs)
+
+    async def run_statistical_test(self, *args, **kwargs) -> dict[str, Any]:
+        return await self._run(self.warehouse.run_statistical_test, *args, **kwargs)
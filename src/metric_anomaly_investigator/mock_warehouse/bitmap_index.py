@@ -0,0 +1,268 @@
+import logging
+import operator
+from datetime import datetime, timedelta
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from metric_anomaly_investigator.mock_warehouse.connection_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+BITMAP_DIMENSIONS = ["platform", "country", "device_type", "app_version", "event_type"]
+
+# popcount lookup for packed uint8 bitsets
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bitset: np.ndarray) -> int:
+    return int(_POPCOUNT[bitset].sum(dtype=np.int64))
+
+
+class UserBitmap:
+    """
+    Set of dense user ids held in one of two containers, as in Roaring
+    bitmaps: a sorted int32 array of ids while the set is sparse, and a
+    packed bitset (1 bit per user, `np.packbits`) once the array would take
+    more room. Most (day, dimension value) sets hold a small share of the
+    users, so they stay arrays.
+    """
+
+    __slots__ = ("n_users", "ids", "bits")
+
+    def __init__(
+        self,
+        n_users: int,
+        ids: np.ndarray | None = None,
+        bits: np.ndarray | None = None,
+    ):
+        self.n_users = n_users
+        self.ids = ids
+        self.bits = bits
+
+    @classmethod
+    def from_ids(cls, ids: np.ndarray, n_users: int) -> "UserBitmap":
+        return cls(n_users, ids=np.unique(ids).astype(np.int32))._compact()
+
+    @property
+    def _bitset_bytes(self) -> int:
+        return (self.n_users + 7) // 8
+
+    def _compact(self) -> "UserBitmap":
+        """Switch to whichever container is smaller for the current size."""
+        if self.ids is not None:
+            if self.ids.nbytes >= self._bitset_bytes:
+                bits = np.zeros(self.n_users, dtype=bool)
+                bits[self.ids] = True
+                return UserBitmap(self.n_users, bits=np.packbits(bits))
+        elif popcount(self.bits) * 4 < self._bitset_bytes:
+            ids = np.flatnonzero(np.unpackbits(self.bits, count=self.n_users))
+            return UserBitmap(self.n_users, ids=ids.astype(np.int32))
+        return self
+
+    def _contains(self, ids: np.ndarray) -> np.ndarray:
+        """Membership of `ids` in this bitset (np.packbits is big-endian)."""
+        return (self.bits[ids >> 3] >> (7 - (ids & 7))) & 1 == 1
+
+    def __and__(self, other: "UserBitmap") -> "UserBitmap":
+        if self.ids is not None and other.ids is not None:
+            ids = np.intersect1d(self.ids, other.ids, assume_unique=True)
+            return UserBitmap(self.n_users, ids=ids)
+        if self.ids is not None:
+            return UserBitmap(self.n_users, ids=self.ids[other._contains(self.ids)])
+        if other.ids is not None:
+            return other & self
+        return UserBitmap(self.n_users, bits=self.bits & other.bits)._compact()
+
+    def __or__(self, other: "UserBitmap") -> "UserBitmap":
+        if self.ids is not None and other.ids is not None:
+            ids = np.union1d(self.ids, other.ids)
+            return UserBitmap(self.n_users, ids=ids)._compact()
+        if self.ids is not None:
+            return other | self
+        bits = self.bits.copy()
+        if other.ids is not None:
+            np.bitwise_or.at(
+                bits, other.ids >> 3, (0x80 >> (other.ids & 7)).astype(np.uint8)
+            )
+        else:
+            bits |= other.bits
+        return UserBitmap(self.n_users, bits=bits)
+
+    def __len__(self) -> int:
+        return len(self.ids) if self.ids is not None else popcount(self.bits)
+
+    def __bool__(self) -> bool:
+        return bool(len(self.ids)) if self.ids is not None else bool(self.bits.any())
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes if self.ids is not None else self.bits.nbytes
+
+
+class BitmapIndex:
+    """
+    In-process bitmap index of daily active users.
+
+    Users are mapped to dense integer ids, and for every (day, dimension value)
+    the index keeps a UserBitmap of users with at least one event. Exact
+    distinct counts then become set algebra:
+
+    - DAU with filters: size of the AND of the filter bitmaps for that day
+    - WAU / rolling windows: size of the OR over days of the per-day AND
+
+    The index is a snapshot of the data it was built from (`fingerprint`);
+    days it has no bitmaps for are left to SQL, see `covers`.
+
+    Intersecting two dimensions is only exact when, on a given day, a user's
+    events share one value of at least one of them (e.g. platform, which the
+    generator fixes per user). The index records which dimensions have that
+    property and declines queries that would intersect two dimensions that
+    don't, so callers can fall back to SQL.
+    """
+
+    def __init__(
+        self,
+        n_users: int,
+        days: list[str],
+        bitmaps: dict[tuple[str, str, str], UserBitmap],
+        day_bitmaps: dict[str, UserBitmap],
+        single_valued: set[str],
+        fingerprint: tuple | None = None,
+    ):
+        self.n_users = n_users
+        self.fingerprint = fingerprint
+        self.days = days
+        self._bitmaps = bitmaps
+        self._day_bitmaps = day_bitmaps
+        self._values: dict[tuple[str, str], list[str]] = {}
+        for day, dim, value in sorted(bitmaps):
+            self._values.setdefault((day, dim), []).append(value)
+        self.single_valued = single_valued
+
+    @classmethod
+    def build(
+        cls, pool: ConnectionPool, fingerprint: tuple | None = None
+    ) -> "BitmapIndex":
+        """Index event_stream; `fingerprint` identifies the data it reads."""
+        dims_sql = ", ".join(BITMAP_DIMENSIONS)
+        with pool.connection() as conn:
+            activity = pd.read_sql_query(
+                f"SELECT DISTINCT event_date, user_id, {dims_sql} FROM event_stream",
+                conn,
+            )
+        user_codes, unique_users = pd.factorize(activity["user_id"], sort=True)
+        activity["user_code"] = user_codes
+        n_users = len(unique_users)
+
+        def pack(codes: np.ndarray) -> UserBitmap:
+            return UserBitmap.from_ids(codes, n_users)
+
+        day_bitmaps = {
+            day: pack(group["user_code"].to_numpy())
+            for day, group in activity.groupby("event_date")
+        }
+        bitmaps = {}
+        single_valued = set()
+        user_days = activity[["event_date", "user_code"]].drop_duplicates().shape[0]
+        for dim in BITMAP_DIMENSIONS:
+            per_value = activity[["event_date", dim, "user_code"]].drop_duplicates()
+            if len(per_value) == user_days:
+                single_valued.add(dim)
+            for (day, value), group in per_value.groupby(["event_date", dim]):
+                bitmaps[(day, dim, str(value))] = pack(group["user_code"].to_numpy())
+
+        index = cls(
+            n_users,
+            sorted(day_bitmaps),
+            bitmaps,
+            day_bitmaps,
+            single_valued,
+            fingerprint,
+        )
+        logger.info(
+            f"Built bitmap index: {n_users} users, {len(bitmaps)} bitmaps, "
+            f"{index.nbytes / 1024:.0f} KiB"
+        )
+        return index
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.nbytes for b in self._bitmaps.values()) + sum(
+            b.nbytes for b in self._day_bitmaps.values()
+        )
+
+    def supports(
+        self, metric_name: str, dimensions: list[str], filters: dict[str, str]
+    ) -> bool:
+        if metric_name not in ("dau", "wau"):
+            return False
+        columns = {*dimensions, *filters}
+        if not columns <= set(BITMAP_DIMENSIONS):
+            return False
+        return len(columns - self.single_valued) <= 1
+
+    def covers(self, time_range: tuple[str, str]) -> bool:
+        """Whether the index has bitmaps for every day of `time_range`."""
+        day = datetime.strptime(time_range[0][:10], "%Y-%m-%d")
+        end = datetime.strptime(time_range[1][:10], "%Y-%m-%d")
+        days = set(self.days)
+        while day <= end:
+            if day.strftime("%Y-%m-%d") not in days:
+                return False
+            day += timedelta(days=1)
+        return True
+
+    def _day_groups(
+        self, day: str, dimensions: list[str], filters: dict[str, str]
+    ) -> dict[tuple[str, ...], UserBitmap]:
+        """Bitmaps of users active on `day`, per combination of dimension values."""
+        empty = UserBitmap.from_ids(np.array([], dtype=np.int32), self.n_users)
+        base = reduce(
+            operator.and_,
+            (self._bitmaps.get((day, col, val), empty) for col, val in filters.items()),
+            self._day_bitmaps[day],
+        )
+        groups = {(): base}
+        for dim in dimensions:
+            expanded = {}
+            for key, bitmap in groups.items():
+                for value in self._values.get((day, dim), []):
+                    combined = bitmap & self._bitmaps[(day, dim, value)]
+                    if combined:
+                        expanded[(*key, value)] = combined
+            groups = expanded
+        return groups
+
+    def query(
+        self,
+        metric_name: str,
+        time_range: tuple[str, str],
+        dimensions: list[str],
+        filters: dict[str, str],
+    ) -> list[dict]:
+        start, end = time_range
+        days = [day for day in self.days if start <= day <= end]
+
+        buckets: dict[str, dict[tuple[str, ...], UserBitmap]] = {}
+        for day in days:
+            if metric_name == "wau":
+                bucket = datetime.strptime(day, "%Y-%m-%d").strftime("%Y-%W")
+            else:
+                bucket = day
+            merged = buckets.setdefault(bucket, {})
+            for key, bitmap in self._day_groups(day, dimensions, filters).items():
+                merged[key] = merged[key] | bitmap if key in merged else bitmap
+
+        bucket_col = "week" if metric_name == "wau" else "date"
+        results = []
+        for bucket in sorted(buckets):
+            for key in sorted(buckets[bucket]):
+                users = len(buckets[bucket][key])
+                if users == 0:
+                    continue
+                row_dict = {bucket_col: bucket, "value": users}
+                row_dict.update(zip(dimensions, key))
+                results.append(row_dict)
+        return results
@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from metric_anomaly_investigator.mock_warehouse.query_compiler import (
+    ALLOWED_COLUMNS,
+    SUPPORTED_METRICS,
+    validate_columns,
+)
+from metric_anomaly_investigator.mock_warehouse.warehouse import MockDataWarehouse
+from metric_anomaly_investigator.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ColumnarWarehouse(MockDataWarehouse):
+    """
+    MockDataWarehouse backend that answers metric queries from NumPy arrays.
+
+    event_stream is loaded once into columns: int32 day indices, int32 dense
+    user ids and dictionary-encoded categoricals for every column in
+    ALLOWED_COLUMNS. query_metric, get_dimensional_breakdown and
+    run_statistical_test then run as vectorized group-bys with
+    np.unique/np.bincount. Deployments and cohort retention still go through
+    SQLite. The arrays are reloaded when the data fingerprint changes.
+    """
+
+    def __init__(
+        self,
+        db_path: str = settings.DB_URL,
+        pool_size: int = settings.DB_POOL_SIZE,
+        auto_migrate: bool = False,
+        **kwargs,
+    ):
+        super().__init__(
+            db_path=db_path,
+            pool_size=pool_size,
+            auto_migrate=auto_migrate,
+            distinct_mode="exact",
+            **kwargs,
+        )
+        self._reload_lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        """(Re)load event_stream into memory."""
+        if self.cache is not None:
+            self.cache.clear()
+        if self.partial_cache is not None:
+            self.partial_cache.clear()
+        started = time.perf_counter()
+        # taken before reading, so a write during the load triggers another
+        self._loaded_fingerprint = self._data_fingerprint()
+        with self._pool.connection() as conn:
+            events = pd.read_sql_query(
+                f"SELECT event_date, user_id, {', '.join(ALLOWED_COLUMNS)} "
+                "FROM event_stream",
+                conn,
+            )
+
+        day_codes, days = pd.factorize(events["event_date"], sort=True)
+        # keep rows ordered by day so a time range is a contiguous slice
+        order = np.argsort(day_codes, kind="stable")
+        events = events.iloc[order].reset_index(drop=True)
+        self._days = np.asarray(days, dtype=str)
+        self._day = day_codes[order].astype(np.int32)
+        self._day_offsets = np.searchsorted(self._day, np.arange(len(days) + 1))
+
+        weeks = [datetime.strptime(d, "%Y-%m-%d").strftime("%Y-%W") for d in days]
+        week_codes, week_labels = pd.factorize(pd.Series(weeks), sort=True)
+        self._week_of_day = week_codes.astype(np.int32)
+        self._weeks = np.asarray(week_labels, dtype=str)
+
+        user_codes, users = pd.factorize(events["user_id"])
+        self._user = user_codes.astype(np.int32)
+        self._n_users = len(users)
+
+        self._codes: dict[str, np.ndarray] = {}
+        self._categories: dict[str, list[str]] = {}
+        for col in ALLOWED_COLUMNS:
+            codes, categories = pd.factorize(
+                events[col], sort=True, use_na_sentinel=False
+            )
+            self._codes[col] = codes.astype(np.int16)
+            # NULL stays None, as in the rows the SQL path returns
+            self._categories[col] = [None if pd.isna(c) else str(c) for c in categories]
+
+        logger.info(
+            f"Loaded {len(self._day)} events into columnar arrays "
+            f"in {time.perf_counter() - started:.2f}s ({self.nbytes / 2**20:.1f} MiB)"
+        )
+
+    def _reload_if_changed(self) -> None:
+        with self._reload_lock:
+            if self._data_fingerprint() != self._loaded_fingerprint:
+                logger.info("Data changed, reloading columnar arrays")
+                self.reload()
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self._day.nbytes
+            + self._user.nbytes
+            + sum(codes.nbytes for codes in self._codes.values())
+        )
+
+    def _select_rows(
+        self, time_range: tuple[str, str], filters: dict[str, str]
+    ) -> np.ndarray:
+        start, end = time_range
+        first_day = np.searchsorted(self._days, start, side="left")
+        last_day = np.searchsorted(self._days, end, side="right")
+        window = slice(self._day_offsets[first_day], self._day_offsets[last_day])
+        mask = np.ones(window.stop - window.start, dtype=bool)
+        for col, val in filters.items():
+            if val not in self._categories[col]:
+                return np.empty(0, dtype=np.int64)
+            mask &= self._codes[col][window] == self._categories[col].index(val)
+        return window.start + np.flatnonzero(mask)
+
+    def _segment_periods(
+        self,
+        metric_name: str,
+        dimensions: list[str],
+        periods: dict[str, tuple[str, str]],
+    ) -> list[dict]:
+        # one row selection per period, shared by every dimension's group-by
+        self._validate(metric_name, dimensions, {})
+        self._reload_if_changed()
+        results = []
+        for period, time_range in periods.items():
+            rows = self._select_rows(time_range, {})
+            for dim in dimensions:
+                bucket_rows = self._group_rows(metric_name, rows, [dim])
+                results.extend(self._average_buckets(period, dim, bucket_rows))
+        return results
+
+    def _validate(
+        self, metric_name: str, dimensions: list[str], filters: dict[str, str]
+    ) -> None:
+        if metric_name not in ("dau", "wau", "events_per_user"):
+            raise ValueError(
+                f"Unsupported metric: {metric_name}. Supported: {SUPPORTED_METRICS}"
+            )
+        validate_columns([*dimensions, *filters])
+
+    def _query_metric_rows(
+        self,
+        metric_name: str,
+        time_range: tuple[str, str],
+        dimensions: list[str],
+        filters: dict[str, str],
+    ) -> list[dict]:
+        self._validate(metric_name, dimensions, filters)
+        self._reload_if_changed()
+        return self._group_rows(
+            metric_name, self._select_rows(time_range, filters), dimensions
+        )
+
+    def _group_rows(
+        self, metric_name: str, rows: np.ndarray, dimensions: list[str]
+    ) -> list[dict]:
+        if len(rows) == 0:
+            return []
+
+        if metric_name == "wau":
+            bucket_col, labels = "week", self._weeks
+            group_key = self._week_of_day[self._day[rows]].astype(np.int64)
+        else:
+            bucket_col, labels = "date", self._days
+            group_key = self._day[rows].astype(np.int64)
+        # mixed-radix key: bucket, then each dimension code
+        for dim in dimensions:
+            group_key = group_key * len(self._categories[dim]) + self._codes[dim][rows]
+
+        group_keys, group_of_row = np.unique(group_key, return_inverse=True)
+        n_groups = len(group_keys)
+        events = np.bincount(group_of_row, minlength=n_groups)
+        group_users = np.unique(
+            group_of_row.astype(np.int64) * self._n_users + self._user[rows]
+        )
+        users = np.bincount(group_users // self._n_users, minlength=n_groups)
+
+        decoded = {}
+        remaining = group_keys
+        for dim in reversed(dimensions):
+            radix = len(self._categories[dim])
+            decoded[dim] = remaining % radix
+            remaining = remaining // radix
+        buckets = remaining
+
+        results = []
+        for g in range(n_groups):
+            value = (
+                events[g] / users[g] if metric_name == "events_per_user" else users[g]
+            )
+            row_dict = {bucket_col: labels[buckets[g]], "value": value}
+            for dim in dimensions:
+                row_dict[dim] = self._categories[dim][decoded[dim][g]]
+            results.append(row_dict)
+        return results
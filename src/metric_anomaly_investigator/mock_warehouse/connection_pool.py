@@ -0,0 +1,131 @@
+import logging
+import queue
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Read-optimized pragmas applied to every pooled connection.
+# - query_only: the warehouse never writes through the pool
+# - mmap_size: serve pages straight from the OS page cache (256 MiB)
+# - cache_size: negative value is in KiB, i.e. a 64 MiB page cache per connection
+# - temp_store: keep sort/group-by temp b-trees in memory
+READ_PRAGMAS: dict[str, str | int] = {
+    "query_only": "ON",
+    "mmap_size": 268_435_456,
+    "cache_size": -65_536,
+    "temp_store": "MEMORY",
+}
+
+# Prepared statements kept per connection, keyed by SQL text. Compiled query
+# shapes (see query_compiler) times event_stream partitions can outgrow the
+# sqlite3 default of 128.
+PREPARED_STATEMENT_CACHE_SIZE = 512
+
+
+class PoolClosedError(RuntimeError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of long-lived SQLite connections.
+
+    Connections are opened lazily (up to `size`) and handed out one caller at a
+    time, so they can be shared across threads and across asyncio tasks that
+    call the warehouse from the event loop. Keeping the connections open
+    preserves each connection's page cache between queries.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = 4,
+        timeout: float = 30.0,
+        pragmas: dict[str, str | int] | None = None,
+        uri: bool = False,
+    ):
+        if size < 1:
+            raise ValueError(f"Pool size must be >= 1, got {size}")
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = READ_PRAGMAS if pragmas is None else pragmas
+        self.uri = uri
+
+        # LIFO so the most recently used (warmest) connection is reused first
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._all: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            uri=self.uri,
+            check_same_thread=False,  # guarded by the pool: one holder at a time
+            cached_statements=PREPARED_STATEMENT_CACHE_SIZE,
+        )
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise PoolClosedError("Connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._all) < self.size:
+                conn = self._connect()
+                self._all.append(conn)
+                logger.debug(f"Opened pooled connection {len(self._all)}/{self.size}")
+                return conn
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty as e:
+            raise TimeoutError(
+                f"No SQLite connection available after {self.timeout}s "
+                f"(pool size {self.size})"
+            ) from e
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        if self._closed:
+            conn.close()
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for the duration of the `with` block."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def close(self) -> None:
+        """Close every connection. Connections still borrowed close on release."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+            self._all.clear()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
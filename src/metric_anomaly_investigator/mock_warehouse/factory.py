@@ -0,0 +1,22 @@
+from typing import Literal
+
+from metric_anomaly_investigator.mock_warehouse.columnar import ColumnarWarehouse
+from metric_anomaly_investigator.mock_warehouse.warehouse import MockDataWarehouse
+from metric_anomaly_investigator.settings import settings
+
+WarehouseBackend = Literal["sqlite", "columnar"]
+
+
+def create_warehouse(
+    backend: WarehouseBackend = settings.WAREHOUSE_BACKEND, **kwargs
+) -> MockDataWarehouse:
+    """Build the warehouse backend selected in settings (or by `backend`)."""
+    match backend:
+        case "sqlite":
+            return MockDataWarehouse(**kwargs)
+        case "columnar":
+            return ColumnarWarehouse(**kwargs)
+        case _:
+            raise ValueError(
+                f"Unknown warehouse backend: {backend}. Supported: {WarehouseBackend}"
+            )
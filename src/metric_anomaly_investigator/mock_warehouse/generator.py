@@ -1,11 +1,20 @@
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import random
+import binascii
 import json
-import uuid
 import logging
-import sqlite3
+import multiprocessing
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from metric_anomaly_investigator.mock_warehouse.scenarios import (
+    DEFAULT_SCENARIO,
+    SEGMENT_COLUMNS,
+    Scenario,
+)
 
 logger = logging.getLogger(__name__)
 START_DATE = datetime(2026, 1, 25)
@@ -22,30 +31,87 @@ APP_VERSIONS = {
     "android": ["2.2.0", "2.3.0"],  # 2.3.0 is the buggy version
     "web": ["2.2.0"],
 }
+EVENTS_PER_USER = {"free": 4, "pro": 12, "enterprise": 15}  # Poisson means
+EVENT_TYPES = ["session_start", "page_view", "feature_used", "search", "share"]
+PAGES = ["home", "feed", "profile", "settings"]
+DAILY_ACTIVE_RATE = 0.70
+# Users, and each day's events, are generated per block of this many users
+# (in users_df order), so memory doesn't grow with the user base.
+# Part of the seed stream layout: changing it changes the generated data.
+USER_BLOCK_SIZE = 50_000
+MAX_SCALE_FACTOR = 100  # SF1 = TOTAL_USERS users over START_DATE..END_DATE
 
+# string columns are built from these shared objects instead of one new
+# string per event
+_EVENT_TYPES = np.array(EVENT_TYPES, dtype=object)
+_PROPERTIES = np.array([json.dumps({"page": page}) for page in PAGES], dtype=object)
+_DEVICE_TYPES = np.array(["desktop", "mobile"], dtype=object)
+
+
+def random_uuids(rng: np.random.Generator, n: int) -> np.ndarray:
+    """n random (version 4) UUID strings drawn from `rng`."""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    hexed = np.frombuffer(binascii.hexlify(raw.tobytes()), dtype=np.uint8)
+    hexed = hexed.reshape(n, 32)
+    formatted = np.full((n, 36), ord("-"), dtype=np.uint8)
+    # 8-4-4-4-12 hex digit groups; group i is shifted right by i dashes
+    for dashes, (start, end) in enumerate(
+        [(0, 8), (8, 12), (12, 16), (16, 20), (20, 32)]
+    ):
+        formatted[:, start + dashes : end + dashes] = hexed[:, start:end]
+    return formatted.view("S36").ravel().astype("U36").astype(object)
+
+
+def day_rng(entropy: int, day: datetime, block: int = 0) -> np.random.Generator:
+    """
+    Independent random stream per calendar day and user block, so a chunk's
+    events don't depend on which other days are generated (or in what order).
+    """
+    seed_seq = np.random.SeedSequence(entropy, spawn_key=(day.toordinal(), block))
+    return np.random.default_rng(seed_seq)
 
-def generate_user_profiles(n_users: int = TOTAL_USERS) -> pd.DataFrame:
-    user_ids = [str(uuid.uuid4()) for _ in range(n_users)]
-    signup_dates = [
-        (START_DATE - timedelta(days=random.randint(1, 365))).date()
-        for _ in range(n_users)
-    ]
-    signup_platforms = np.random.choice(
-        list(PLATFORMS.keys()), size=n_users, p=list(PLATFORMS.values())
-    )
-    signup_countries = np.random.choice(
-        list(COUNTRIES.keys()), size=n_users, p=list(COUNTRIES.values())
-    )
-    acquisition_channels = np.random.choice(
-        list(CHANNELS.keys()), size=n_users, p=list(CHANNELS.values())
-    )
-    signup_cohorts = [
-        (START_DATE - timedelta(days=random.randint(1, 365))).date().strftime("%Y-W%U")
-        for _ in range(n_users)
-    ]
-    user_tiers = np.random.choice(
-        list(TIERS.keys()), size=n_users, p=list(TIERS.values())
-    )
+
+def block_rng(entropy: int, block: int, stream: int) -> np.random.Generator:
+    """
+    Per user block streams that don't depend on the day: stream 0 draws the
+    block's user profiles, stream 1 + i the rollout draws of incident i.
+    """
+    # day ordinals start at 1, so (0, ...) never collides with a day stream
+    seed_seq = np.random.SeedSequence(entropy, spawn_key=(0, block, stream))
+    return np.random.default_rng(seed_seq)
+
+
+def users_for_scale_factor(scale_factor: float) -> int:
+    """Number of users in a dataset of the given scale factor."""
+    if not 0 < scale_factor <= MAX_SCALE_FACTOR:
+        raise ValueError(
+            f"Scale factor must be in (0, {MAX_SCALE_FACTOR}], got {scale_factor}"
+        )
+    return round(TOTAL_USERS * scale_factor)
+
+
+def _user_block(rng: np.random.Generator, n_users: int) -> pd.DataFrame:
+    def choice(weights: dict[str, float]) -> np.ndarray:
+        return rng.choice(
+            np.array(list(weights), dtype=object),
+            size=n_users,
+            p=list(weights.values()),
+        )
+
+    # 1-365 days before START_DATE: index shared date/label objects
+    days_before = [START_DATE - timedelta(days=k) for k in range(366)]
+    dates = np.array([day.date() for day in days_before], dtype=object)
+    cohorts = np.array([day.strftime("%Y-W%U") for day in days_before], dtype=object)
+
+    user_ids = random_uuids(rng, n_users)
+    signup_dates = dates[rng.integers(1, 366, n_users)]
+    signup_platforms = choice(PLATFORMS)
+    signup_countries = choice(COUNTRIES)
+    acquisition_channels = choice(CHANNELS)
+    signup_cohorts = cohorts[rng.integers(1, 366, n_users)]
+    user_tiers = choice(TIERS)
 
     user_profiles = pd.DataFrame(
         {
@@ -62,20 +128,78 @@ def generate_user_profiles(n_users: int = TOTAL_USERS) -> pd.DataFrame:
     return user_profiles
 
 
-def generate_events(
-    users_df: pd.DataFrame,
-    start_date: datetime = START_DATE,
-    end_date: datetime = END_DATE,
-):
-    """Generate event stream with planted anomaly"""
-    events = []
-    event_types = ["session_start", "page_view", "feature_used", "search", "share"]
+def iter_user_blocks(
+    n_users: int = TOTAL_USERS, seed: int | None = None
+) -> Iterator[pd.DataFrame]:
+    """
+    User profiles, one DataFrame per block of USER_BLOCK_SIZE users, each
+    drawn from the block's own stream so no block depends on the others.
+    """
+    entropy = np.random.SeedSequence(seed).entropy
+    # at least one (empty) block, so no users still gives the columns
+    for block, block_start in enumerate(range(0, max(n_users, 1), USER_BLOCK_SIZE)):
+        block_size = min(USER_BLOCK_SIZE, n_users - block_start)
+        yield _user_block(block_rng(entropy, block, 0), block_size)
+
+
+def generate_user_profiles(
+    n_users: int = TOTAL_USERS, seed: int | None = None
+) -> pd.DataFrame:
+    return pd.concat(list(iter_user_blocks(n_users, seed)), ignore_index=True)
+
+
+class EventPartitions:
+    """
+    Everything needed to generate any one partition (a day) of the event
+    stream of one block of USER_BLOCK_SIZE users on its own.
+
+    Each partition draws its active users, per-user event counts (Poisson by
+    tier), app versions, incident dropouts, timestamps and event attributes
+    as arrays from its own `day_rng` stream, so partitions can be generated
+    in any order, or in different processes, with the same result. Which
+    users fall in an incident's partial rollout is drawn once per incident
+    and block, from a `block_rng` stream, so it doesn't change from day to
+    day.
+    """
+
+    def __init__(
+        self,
+        users_df: pd.DataFrame,
+        seed: int | None = None,
+        scenario: Scenario = DEFAULT_SCENARIO,
+        block: int = 0,
+    ):
+        # resolved once, so seed=None still gives every partition one master seed
+        self.entropy = np.random.SeedSequence(seed).entropy
+        self.scenario = scenario
+        self.block = block
+        self.user_ids = users_df["user_id"].to_numpy(dtype=object)
+        self.platforms = users_df["signup_platform"].to_numpy(dtype=object)
+        self.countries = users_df["signup_country"].to_numpy(dtype=object)
+        tiers = users_df["user_tier"].to_numpy(dtype=object)
+        self.events_per_user = np.array(
+            [EVENTS_PER_USER.get(tier, EVENTS_PER_USER["free"]) for tier in tiers],
+            dtype=float,
+        )
+        self.mobile = np.isin(self.platforms, ["ios", "android"]).astype(int)
+        segment_values = {
+            key: users_df[column].to_numpy(dtype=object)
+            for key, column in SEGMENT_COLUMNS.items()
+        }
+        self.incident_users = [
+            incident.affected_users(
+                segment_values,
+                block_rng(self.entropy, block, 1 + i).random(len(self.user_ids)),
+            )
+            for i, incident in enumerate(scenario.incidents)
+        ]
 
-    current_date = start_date
+    def generate(self, day: datetime) -> pd.DataFrame:
+        rng = day_rng(self.entropy, day, self.block)
+        block_size = len(self.user_ids)
 
-    while current_date <= end_date:
         # Day-of-week seasonality
-        day_of_week = current_date.weekday()
+        day_of_week = day.weekday()
         if day_of_week in [5, 6]:  # Weekend
             activity_multiplier = 0.80
         elif day_of_week == 0:  # Monday
@@ -83,135 +207,180 @@ def generate_events(
         else:
             activity_multiplier = 1.0
 
-        # Active users for this day (~70% of total user base)
-        daily_active_rate = 0.70 * activity_multiplier
-        active_users = users_df.sample(frac=daily_active_rate)
-
-        for _, user in active_users.iterrows():
-            if user["user_tier"] == "pro":
-                events_per_user = np.random.poisson(12)  # Pro users more active
-            elif user["user_tier"] == "enterprise":
-                events_per_user = np.random.poisson(15)
-            else:
-                events_per_user = np.random.poisson(4)
-
-            platform = user["signup_platform"]
-            country = user["signup_country"]
-
-            # APP VERSION LOGIC - Key for anomaly
-            # ANOMALY: Android users in India on v2.3.0 have 60% drop rate after Jan 28
-            # 60% of India Android users experience the bug (drop out)
-            if platform == "android":
-                if country == "IN" and current_date >= datetime(2026, 1, 28):
-                    app_version = "2.3.0"
-                    if random.random() < 0.60:
-                        continue  # Skip this user (simulates crash/poor UX)
-                else:
-                    app_version = random.choice(APP_VERSIONS["android"])
-            else:
-                app_version = random.choice(APP_VERSIONS[platform])
-
-            session_id = str(uuid.uuid4())
-
-            for _ in range(events_per_user):
-                event_time = current_date + timedelta(
-                    hours=random.randint(0, 23),
-                    minutes=random.randint(0, 59),
-                    seconds=random.randint(0, 59),
-                )
-
-                events.append(
-                    {
-                        "event_id": str(uuid.uuid4()),
-                        "user_id": user["user_id"],
-                        "event_type": random.choice(event_types),
-                        "event_timestamp": event_time,
-                        "platform": platform,
-                        "country": country,
-                        "device_type": "mobile"
-                        if platform in ["ios", "android"]
-                        else "desktop",
-                        "app_version": app_version,
-                        "session_id": session_id,
-                        "properties": json.dumps(
-                            {
-                                "page": random.choice(
-                                    ["home", "feed", "profile", "settings"]
-                                )
-                            }
-                        ),
-                    }
-                )
-
-        current_date += timedelta(days=1)
-
-    return pd.DataFrame(events)
-
-
-def generate_deployments():
-    return pd.DataFrame(
-        [
-            {
-                "deployment_id": "deployment_1",
-                "deployment_date": datetime(2026, 1, 20, 10, 0, 0),
-                "app_version": "2.2.1",
-                "platform": "ios",
-                "rollout_percentage": 1.0,
-                "regions": "all",
-                "deployment_type": "app_release",
-            },
-            {
-                "deployment_id": "deploy_002",
-                "deployment_date": datetime(2026, 1, 25, 14, 30),
-                "app_version": "2.3.0",
-                "platform": "ios",
-                "rollout_percentage": 1.0,
-                "regions": "all",
-                "deployment_type": "app_release",
-            },
-            {
-                "deployment_id": "deploy_003",
-                "deployment_date": datetime(
-                    2026, 1, 28, 9, 0
-                ),  # THE PROBLEMATIC DEPLOYMENT
-                "app_version": "2.3.0",
-                "platform": "android",
-                "rollout_percentage": 1.0,
-                "regions": json.dumps(["IN", "BR"]),  # Rolled out to India and Brazil
-                "deployment_type": "app_release",
-            },
+        # Active users for this day (~70% of the block)
+        n_active = min(
+            round(DAILY_ACTIVE_RATE * activity_multiplier * block_size), block_size
+        )
+        active = np.sort(rng.choice(block_size, size=n_active, replace=False))
+        counts = rng.poisson(self.events_per_user[active])
+
+        # APP VERSION LOGIC - Key for anomaly
+        version_draw = rng.random(n_active)
+        app_versions = np.full(n_active, None, dtype=object)
+        for platform, versions in APP_VERSIONS.items():
+            on_platform = self.platforms[active] == platform
+            picks = (version_draw[on_platform] * len(versions)).astype(int)
+            app_versions[on_platform] = np.array(versions, dtype=object)[picks]
+        for incident, affected_users in zip(
+            self.scenario.incidents, self.incident_users
+        ):
+            dropout_rate = incident.dropout_rate_on(day)
+            if dropout_rate == 0:
+                continue
+            affected = affected_users[active]
+            if incident.app_version is not None:
+                app_versions[affected] = incident.app_version
+            dropped = affected & (rng.random(n_active) < dropout_rate)
+            counts[dropped] = 0  # skip these users for the day
+
+        session_ids = random_uuids(rng, n_active)
+        rows = np.repeat(np.arange(n_active), counts)
+        users = active[rows]
+        n_events = len(rows)
+        seconds = rng.integers(0, 24 * 60 * 60, n_events).astype("timedelta64[s]")
+
+        return pd.DataFrame(
             {
-                "deployment_id": "deploy_004",
-                "deployment_date": datetime(2026, 1, 30, 16, 0),
-                "app_version": "2.2.0",
-                "platform": "web",
-                "rollout_percentage": 1.0,
-                "regions": "all",
-                "deployment_type": "app_release",
-            },
-        ]
+                "event_id": random_uuids(rng, n_events),
+                "user_id": self.user_ids[users],
+                "event_type": _EVENT_TYPES[rng.integers(0, len(EVENT_TYPES), n_events)],
+                "event_timestamp": np.datetime64(day, "s") + seconds,
+                "platform": self.platforms[users],
+                "country": self.countries[users],
+                "device_type": _DEVICE_TYPES[self.mobile[users]],
+                "app_version": app_versions[rows],
+                "session_id": session_ids[rows],
+                "properties": _PROPERTIES[rng.integers(0, len(PAGES), n_events)],
+            }
+        )
+
+
+def iter_block_events(
+    user_blocks: Iterable[pd.DataFrame],
+    start_date: datetime = START_DATE,
+    end_date: datetime = END_DATE,
+    seed: int | None = None,
+    scenario: Scenario = DEFAULT_SCENARIO,
+    workers: int = 1,
+) -> Iterator[pd.DataFrame]:
+    """
+    Generate the event stream of `user_blocks` (consecutive blocks of
+    USER_BLOCK_SIZE users) with the scenario's planted incidents, one
+    DataFrame per day of each block, block by block.
+
+    Blocks are taken from `user_blocks` only as their days are generated,
+    so at most the blocks with days in flight are held in memory. With
+    `workers` > 1 the partitions are generated in a process pool, at most
+    2 x `workers` ahead of the consumer; the output is the same for any
+    number of workers.
+    """
+    entropy = np.random.SeedSequence(seed).entropy
+    days = [
+        start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)
+    ]
+    blocks = (
+        EventPartitions(users_df, entropy, scenario, block)
+        for block, users_df in enumerate(user_blocks)
+    )
+    if workers <= 1:
+        for partitions in blocks:
+            for day in days:
+                yield partitions.generate(day)
+        return
+
+    # spawn: forking a process that may already run threads (a loader in a
+    # server, the warehouse's scan pool) can deadlock the children on a
+    # lock held at fork time. Each task carries its block's arrays, so the
+    # workers hold no more of the user base than the consumer does.
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        pending: deque[Future] = deque()
+        for partitions in blocks:
+            for day in days:
+                pending.append(pool.submit(partitions.generate, day))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_events(
+    users_df: pd.DataFrame,
+    start_date: datetime = START_DATE,
+    end_date: datetime = END_DATE,
+    seed: int | None = None,
+    scenario: Scenario = DEFAULT_SCENARIO,
+    workers: int = 1,
+) -> Iterator[pd.DataFrame]:
+    """
+    Generate the event stream with the scenario's planted incidents, one
+    DataFrame per day and block of USER_BLOCK_SIZE users, see
+    `iter_block_events`.
+    """
+    user_blocks = (
+        users_df.iloc[block_start : block_start + USER_BLOCK_SIZE]
+        for block_start in range(0, len(users_df), USER_BLOCK_SIZE)
+    )
+    yield from iter_block_events(
+        user_blocks, start_date, end_date, seed, scenario, workers
+    )
+
+
+def generate_events(
+    users_df: pd.DataFrame,
+    start_date: datetime = START_DATE,
+    end_date: datetime = END_DATE,
+    seed: int | None = None,
+    scenario: Scenario = DEFAULT_SCENARIO,
+    workers: int = 1,
+) -> pd.DataFrame:
+    """Generate event stream with the scenario's planted incidents"""
+    return pd.concat(
+        list(iter_events(users_df, start_date, end_date, seed, scenario, workers)),
+        ignore_index=True,
     )
 
 
+def generate_deployments(scenario: Scenario = DEFAULT_SCENARIO) -> pd.DataFrame:
+    """Routine releases plus the releases the scenario's incidents ship as."""
+    deployments = [
+        {
+            "deployment_id": "deployment_1",
+            "deployment_date": datetime(2026, 1, 20, 10, 0, 0),
+            "app_version": "2.2.1",
+            "platform": "ios",
+            "rollout_percentage": 1.0,
+            "regions": "all",
+            "deployment_type": "app_release",
+        },
+        {
+            "deployment_id": "deploy_002",
+            "deployment_date": datetime(2026, 1, 25, 14, 30),
+            "app_version": "2.3.0",
+            "platform": "ios",
+            "rollout_percentage": 1.0,
+            "regions": "all",
+            "deployment_type": "app_release",
+        },
+        {
+            "deployment_id": "deploy_004",
+            "deployment_date": datetime(2026, 1, 30, 16, 0),
+            "app_version": "2.2.0",
+            "platform": "web",
+            "rollout_percentage": 1.0,
+            "regions": "all",
+            "deployment_type": "app_release",
+        },
+    ]
+    for incident in scenario.incidents:
+        if (deployment := incident.deployment()) is not None:
+            deployments.append(deployment)
+    deployments.sort(key=lambda d: d["deployment_date"])
+    return pd.DataFrame(deployments)
+
+
 if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO)
-    logger.info("Starting data generation...")
-    users_df = generate_user_profiles()
-    events_df = generate_events(users_df)
-    deployments_df = generate_deployments()
-    logger.info("Data generation complete.")
-    logger.info(f"Generated {len(users_df)} users.")
-    logger.info(f"Generated {len(events_df)} events.")
-    logger.info(f"Generated {len(deployments_df)} deployments.")
-
-    users_df.to_csv("user_profiles.csv", index=False)
-    events_df.to_csv("event_stream.csv", index=False)
-    deployments_df.to_csv("deployments.csv", index=False)
-    logger.info("CSVs saved.")
-
-    connection = sqlite3.connect("data/analytics.db")
-    users_df.to_sql("user_profiles", connection, if_exists="replace", index=False)
-    events_df.to_sql("event_stream", connection, if_exists="replace", index=False)
-    deployments_df.to_sql("deployments", connection, if_exists="replace", index=False)
-    connection.close()
-    logger.info("Data saved to SQLite database.")
+    from metric_anomaly_investigator.mock_warehouse.loader import main
+
+    main()
@@ -0,0 +1,65 @@
+import logging
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Pages copied per backup step; progress is logged after each step. With the
+# default 4 KiB page size that is 64 MiB per step.
+BACKUP_PAGES_PER_STEP = 16_384
+
+
+@dataclass
+class HotCopy:
+    """
+    A shared-cache in-memory copy of an analytics database.
+
+    The database lives as long as `keeper` (or any other connection to `uri`)
+    stays open; pooled connections attach to it with `uri=True`.
+    """
+
+    uri: str
+    keeper: sqlite3.Connection
+    pages: int
+    page_size: int
+    load_seconds: float
+
+    @property
+    def memory_bytes(self) -> int:
+        """Size of the in-memory database pages."""
+        return self.pages * self.page_size
+
+    def close(self) -> None:
+        """Drop the keeper connection, freeing the copy once the pool is closed."""
+        self.keeper.close()
+
+
+def load_hot_copy(db_path: str, pages_per_step: int = BACKUP_PAGES_PER_STEP) -> HotCopy:
+    """Copy `db_path` into a fresh shared-cache `:memory:` database."""
+    uri = f"file:analytics-{uuid.uuid4().hex}?mode=memory&cache=shared"
+    keeper = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        logger.debug(f"Hot copy of {db_path}: {total - remaining}/{total} pages")
+
+    start = time.perf_counter()
+    try:
+        source.backup(keeper, pages=pages_per_step, progress=progress)
+    except sqlite3.Error:
+        keeper.close()
+        raise
+    finally:
+        source.close()
+    load_seconds = time.perf_counter() - start
+
+    pages = keeper.execute("PRAGMA page_count").fetchone()[0]
+    page_size = keeper.execute("PRAGMA page_size").fetchone()[0]
+    hot_copy = HotCopy(uri, keeper, pages, page_size, load_seconds)
+    logger.info(
+        f"Loaded {db_path} into memory: {pages} pages "
+        f"({hot_copy.memory_bytes / 2**20:.1f} MiB) in {load_seconds:.2f}s"
+    )
+    return hot_copy
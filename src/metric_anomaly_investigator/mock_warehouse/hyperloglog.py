@@ -0,0 +1,162 @@
+import hashlib
+from collections.abc import Iterable
+
+import numpy as np
+
+HLL_PRECISION = 12  # 4096 registers, ~1.6% standard error
+# Stored sketches with few non-zero registers are (register index, rank)
+# pairs; once the pairs take as much room as the 2**precision dense bytes,
+# the dense registers are stored instead. Only dense sketches are that long.
+SPARSE_ENTRY = np.dtype([("index", "<u4"), ("rank", "u1")])
+
+
+def hash_user_ids(user_ids: Iterable[str]) -> np.ndarray:
+    """Stable 64-bit hashes of user ids (independent of PYTHONHASHSEED)."""
+    return np.fromiter(
+        (
+            int.from_bytes(
+                hashlib.blake2b(user_id.encode(), digest_size=8).digest(), "little"
+            )
+            for user_id in user_ids
+        ),
+        dtype=np.uint64,
+    )
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Exact vectorized int.bit_length() for uint64 arrays."""
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        wide = values >= np.uint64(1 << shift)
+        values[wide] >>= np.uint64(shift)
+        length[wide] += shift
+    return length + (values > 0)
+
+
+def register_updates(
+    hashes: np.ndarray, precision: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Split 64-bit hashes into (register index, rank) pairs."""
+    hashes = hashes.astype(np.uint64, copy=False)
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    remaining_bits = 64 - precision
+    tail = hashes & np.uint64((1 << remaining_bits) - 1)
+    # rank = position of the leftmost 1-bit in the remaining bits (1-based)
+    rank = (remaining_bits - _bit_length(tail) + 1).astype(np.uint8)
+    return index, rank
+
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch (Flajolet et al.) backed by a NumPy array.
+
+    Two sketches built with the same precision merge by taking the register-wise
+    maximum, which is what lets distinct users be combined across segments.
+    """
+
+    def __init__(
+        self, precision: int = HLL_PRECISION, registers: np.ndarray | None = None
+    ):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HLL precision must be in [4, 18], got {precision}")
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is None:
+            registers = np.zeros(self.m, dtype=np.uint8)
+        elif registers.shape != (self.m,):
+            raise ValueError(
+                f"Expected {self.m} registers for precision {precision}, "
+                f"got {registers.shape}"
+            )
+        self.registers = registers
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        index, rank = register_updates(hashes, self.precision)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    @classmethod
+    def union(cls, sketches: Iterable["HyperLogLog"]) -> "HyperLogLog":
+        sketches = list(sketches)
+        if not sketches:
+            return cls()
+        registers = np.maximum.reduce([s.registers for s in sketches])
+        return cls(precision=sketches[0].precision, registers=registers)
+
+    def count(self) -> float:
+        return estimate_cardinality(self.registers)
+
+    def to_bytes(self) -> bytes:
+        return self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        registers = np.frombuffer(data, dtype=np.uint8).copy()
+        precision = int(np.log2(len(registers)))
+        return cls(precision=precision, registers=registers)
+
+
+def encode_sketch(index: np.ndarray, rank: np.ndarray, precision: int) -> bytes:
+    """Serialize a sketch from its non-zero registers (unique `index`)."""
+    m = 1 << precision
+    if len(index) * SPARSE_ENTRY.itemsize < m:
+        entries = np.empty(len(index), dtype=SPARSE_ENTRY)
+        entries["index"] = index
+        entries["rank"] = rank
+        return entries.tobytes()
+    registers = np.zeros(m, dtype=np.uint8)
+    registers[index] = rank
+    return registers.tobytes()
+
+
+def merge_sketches(
+    sketches: list[bytes], groups: np.ndarray, n_groups: int, precision: int
+) -> np.ndarray:
+    """
+    (n_groups, 2**precision) registers: each row the union of the encoded
+    sketches whose `groups` entry points at it.
+    """
+    m = 1 << precision
+    registers = np.zeros((n_groups, m), dtype=np.uint8)
+    is_dense = np.array([len(sketch) == m for sketch in sketches], dtype=bool)
+    if is_dense.any():
+        dense = np.frombuffer(
+            b"".join(s for s, d in zip(sketches, is_dense) if d), dtype=np.uint8
+        )
+        np.maximum.at(registers, groups[is_dense], dense.reshape(-1, m))
+    if not is_dense.all():
+        sparse = [s for s, d in zip(sketches, is_dense) if not d]
+        entries = np.frombuffer(b"".join(sparse), dtype=SPARSE_ENTRY)
+        entry_groups = np.repeat(
+            groups[~is_dense], [len(s) // SPARSE_ENTRY.itemsize for s in sparse]
+        )
+        np.maximum.at(
+            registers,
+            (entry_groups, entries["index"].astype(np.int64)),
+            entries["rank"],
+        )
+    return registers
+
+
+def estimate_cardinality(registers: np.ndarray) -> float:
+    return float(estimate_cardinalities(registers[np.newaxis, :])[0])
+
+
+def estimate_cardinalities(registers: np.ndarray) -> np.ndarray:
+    """
+    Row-wise HLL estimates for a (n_sketches, m) register matrix, with the
+    linear-counting correction for small cardinalities.
+    """
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=-1)
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
@@ -0,0 +1,139 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from metric_anomaly_investigator.schemas import QueryStats, StepPerf
+from metric_anomaly_investigator.settings import settings
+
+# own logger so the slow-query log can be routed or silenced separately
+slow_query_logger = logging.getLogger(f"{__name__}.slow_queries")
+
+# the progress handler runs every VM_STEP_INTERVAL SQLite VM instructions, so
+# step counts are rounded down to a multiple of it
+VM_STEP_INTERVAL = 1_000
+
+# QueryStats of the current `record()` block. A ContextVar rather than a
+# thread-local: partition scans run on worker threads within a copy of the
+# caller's context, and share its list.
+_recording: ContextVar[list[QueryStats] | None] = ContextVar(
+    "query_recording", default=None
+)
+# Set by a cancellable caller (see `cancellable`): once the event is set,
+# queries abort at the next progress-handler tick.
+_cancelled: ContextVar[threading.Event | None] = ContextVar(
+    "query_cancelled", default=None
+)
+
+
+class QueryCancelledError(RuntimeError):
+    pass
+
+
+@contextmanager
+def cancellable(cancelled: threading.Event) -> Iterator[None]:
+    """Abort every query run inside the block once `cancelled` is set."""
+    token = _cancelled.set(cancelled)
+    try:
+        yield
+    finally:
+        _cancelled.reset(token)
+
+
+class QueryProfiler:
+    """
+    Times every warehouse SQL query and records it in the enclosing `record()`
+    block, optionally with its EXPLAIN QUERY PLAN and SQLite VM step count.
+    Queries slower than `slow_query_seconds` are logged with their plan.
+    """
+
+    def __init__(
+        self,
+        slow_query_seconds: float = settings.SLOW_QUERY_SECONDS,
+        explain: bool = settings.QUERY_EXPLAIN,
+        count_vm_steps: bool = settings.QUERY_COUNT_VM_STEPS,
+    ):
+        self.slow_query_seconds = slow_query_seconds
+        self.explain = explain
+        self.count_vm_steps = count_vm_steps
+
+    @contextmanager
+    def record(self) -> Iterator[list[QueryStats]]:
+        """Collect the QueryStats of every query run inside the block."""
+        queries: list[QueryStats] = []
+        token = _recording.set(queries)
+        try:
+            yield queries
+        finally:
+            _recording.reset(token)
+
+    @staticmethod
+    def _plan(conn: sqlite3.Connection, query: str, params: list) -> list[str]:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+        return [row[3] for row in rows]
+
+    def fetchall(
+        self, conn: sqlite3.Connection, query: str, params: list
+    ) -> tuple[list[str], list[tuple]]:
+        cancelled = _cancelled.get()
+        if cancelled is not None and cancelled.is_set():
+            raise QueryCancelledError("Query cancelled before it started")
+        plan = self._plan(conn, query, params) if self.explain else None
+        vm_steps = 0
+
+        def on_progress() -> bool:
+            nonlocal vm_steps
+            vm_steps += VM_STEP_INTERVAL
+            # true aborts the query (sqlite3.OperationalError: interrupted)
+            return cancelled is not None and cancelled.is_set()
+
+        use_handler = self.count_vm_steps or cancelled is not None
+        if use_handler:
+            conn.set_progress_handler(on_progress, VM_STEP_INTERVAL)
+        started = time.perf_counter()
+        try:
+            cursor = conn.execute(query, params)
+            cols = [d[0] for d in cursor.description]
+            rows = cursor.fetchall()
+        except sqlite3.OperationalError as e:
+            if cancelled is not None and cancelled.is_set():
+                raise QueryCancelledError("Query cancelled") from e
+            raise
+        finally:
+            if use_handler:
+                conn.set_progress_handler(None, 0)
+        seconds = time.perf_counter() - started
+
+        stats = QueryStats(
+            sql=" ".join(query.split()),
+            param_types=[type(param).__name__ for param in params],
+            seconds=seconds,
+            rows=len(rows),
+            vm_steps=vm_steps if self.count_vm_steps else None,
+            plan=plan,
+        )
+        if seconds >= self.slow_query_seconds:
+            slow_plan = plan or self._plan(conn, query, params)
+            slow_query_logger.warning(
+                f"Slow query ({seconds:.2f}s, {len(rows)} rows): {stats.sql} "
+                f"params={list(params)} plan={slow_plan}"
+            )
+        recording = _recording.get()
+        if recording is not None:
+            recording.append(stats)
+        return cols, rows
+
+
+def summarize(wall_seconds: float, queries: list[QueryStats]) -> StepPerf:
+    """Roll the queries of one step up into its StepPerf."""
+    counted = [q.vm_steps for q in queries if q.vm_steps is not None]
+    return StepPerf(
+        wall_seconds=wall_seconds,
+        query_seconds=sum(q.seconds for q in queries),
+        rows_returned=sum(q.rows for q in queries),
+        vm_steps=sum(counted) if counted else None,
+        queries=list(queries),
+    )
@@ -0,0 +1,321 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metric_anomaly_investigator.mock_warehouse.generator import (
+    END_DATE,
+    START_DATE,
+    TOTAL_USERS,
+    generate_deployments,
+    iter_block_events,
+    iter_user_blocks,
+    users_for_scale_factor,
+)
+from metric_anomaly_investigator.mock_warehouse.migrations import (
+    DIMENSION_TABLE_INDEXES,
+    apply_migrations,
+)
+from metric_anomaly_investigator.mock_warehouse.partitions import (
+    create_partition,
+    event_index_statements,
+    partition_table,
+)
+from metric_anomaly_investigator.mock_warehouse.scenarios import (
+    DEFAULT_SCENARIO,
+    SCENARIOS,
+    Scenario,
+    build_manifest,
+    get_scenario,
+)
+
+logger = logging.getLogger(__name__)
+
+# Load-time pragmas. The database is built in a scratch file that is only
+# moved into place once complete, so durability can be traded for speed:
+# - journal_mode / synchronous OFF: no rollback journal and no fsyncs
+# - locking_mode EXCLUSIVE: take the file lock once for the whole load
+# - cache_size: negative value is in KiB, i.e. a fixed 256 MiB page cache
+#   (also the in-memory budget of the CREATE INDEX sorter; temp_store is
+#   left on disk so index builds spill instead of growing with the data)
+LOAD_PRAGMAS: dict[str, str | int] = {
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "locking_mode": "EXCLUSIVE",
+    "cache_size": -262_144,
+}
+
+# Same column types DataFrame.to_sql used to produce. Events go straight
+# into their weekly event_stream partitions (see partitions.py), with the
+# event_date column migration 1 would otherwise add and backfill.
+SCHEMA: tuple[str, ...] = (
+    """
+    CREATE TABLE user_profiles (
+        user_id TEXT,
+        signup_date DATE,
+        signup_platform TEXT,
+        signup_country TEXT,
+        user_cohort TEXT,
+        acquisition_channel TEXT,
+        user_tier TEXT
+    )
+    """,
+    """
+    CREATE TABLE deployments (
+        deployment_id TEXT,
+        deployment_date TIMESTAMP,
+        app_version TEXT,
+        platform TEXT,
+        rollout_percentage REAL,
+        regions TEXT,
+        deployment_type TEXT
+    )
+    """,
+)
+
+EVENT_COLUMNS = [
+    "event_id",
+    "user_id",
+    "event_type",
+    "event_timestamp",
+    "platform",
+    "country",
+    "device_type",
+    "app_version",
+    "session_id",
+    "properties",
+]
+
+# "HH:MM:SS" for every second of a day, shared by all timestamp strings
+_TIMES_OF_DAY = np.array(
+    [f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86_400)],
+    dtype=object,
+)
+
+
+@dataclass
+class LoadStats:
+    users: int = 0
+    events: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.seconds if self.seconds else 0.0
+
+
+def _event_rows(events_df: pd.DataFrame) -> list[tuple]:
+    """event_stream rows with SQLite-style timestamp and event_date strings."""
+    timestamps = events_df["event_timestamp"].to_numpy("datetime64[s]")
+    days = timestamps.astype("datetime64[D]")
+    day_values, day_of_row = np.unique(days, return_inverse=True)
+    day_labels = np.array(
+        [str(day) for day in np.datetime_as_string(day_values)], dtype=object
+    )
+    event_dates = day_labels[day_of_row]
+    seconds = (timestamps - days).astype(np.int64)
+    columns = [
+        event_dates + " " + _TIMES_OF_DAY[seconds]
+        if col == "event_timestamp"
+        else events_df[col].to_numpy(dtype=object)
+        for col in EVENT_COLUMNS
+    ]
+    return list(zip(*(col.tolist() for col in columns), event_dates.tolist()))
+
+
+def manifest_path(db_path: str) -> Path:
+    """Where the ground-truth manifest of the dataset in `db_path` is written."""
+    return Path(db_path).with_suffix(".manifest.json")
+
+
+def load_database(
+    db_path: str,
+    n_users: int = TOTAL_USERS,
+    seed: int | None = None,
+    start_date: datetime = START_DATE,
+    end_date: datetime = END_DATE,
+    csv_dir: str | None = None,
+    scenario: Scenario = DEFAULT_SCENARIO,
+    scale_factor: float | None = None,
+    workers: int = 1,
+) -> LoadStats:
+    """
+    Generate the synthetic dataset straight into a fresh SQLite database.
+
+    Users are generated and inserted one block of USER_BLOCK_SIZE at a time,
+    and each block's events are streamed from `iter_block_events` one chunk
+    (a day of the block) at a time and inserted into its weekly partition
+    with executemany, one transaction per chunk. Only the current block's
+    profiles and per-user arrays are held in memory, so peak memory doesn't
+    depend on the number of users or days. Indexes are built once after the
+    data is in, then the remaining schema migrations are applied. CSV copies
+    are only written when `csv_dir` is given.
+
+    With `workers` > 1, chunks are generated in that many processes while
+    this one inserts them; SQLite takes a single writer, so inserts stay
+    serial. The data doesn't depend on the number of workers.
+
+    `scale_factor`, when given, sets the number of users (SF1 = TOTAL_USERS).
+    The scenario's ground truth is written next to the database, see
+    `manifest_path`.
+    """
+    if scale_factor is not None:
+        n_users = users_for_scale_factor(scale_factor)
+    if seed is None:
+        # drawn once, so users and events share it and the manifest can
+        # record what reproduces the dataset
+        seed = np.random.SeedSequence().entropy
+        logger.info(f"No seed given, using {seed}")
+    started = time.perf_counter()
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    scratch_path = f"{db_path}.loading"
+    if os.path.exists(scratch_path):
+        os.remove(scratch_path)
+    if csv_dir is not None:
+        Path(csv_dir).mkdir(parents=True, exist_ok=True)
+
+    stats = LoadStats()
+    # autocommit mode: transactions are managed explicitly below
+    conn = sqlite3.connect(scratch_path, isolation_level=None)
+    try:
+        for pragma, value in LOAD_PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        for statement in SCHEMA:
+            conn.execute(statement)
+
+        deployments_df = generate_deployments(scenario)
+        deployments_df.to_sql("deployments", conn, if_exists="append", index=False)
+        if csv_dir is not None:
+            deployments_df.to_csv(Path(csv_dir) / "deployments.csv", index=False)
+
+        def user_blocks() -> Iterator[pd.DataFrame]:
+            # each block is inserted as the event generator takes it
+            for users_df in iter_user_blocks(n_users, seed=seed):
+                users_df.to_sql("user_profiles", conn, if_exists="append", index=False)
+                if csv_dir is not None:
+                    users_df.to_csv(
+                        Path(csv_dir) / "user_profiles.csv",
+                        mode="w" if stats.users == 0 else "a",
+                        header=stats.users == 0,
+                        index=False,
+                    )
+                stats.users += len(users_df)
+                yield users_df
+
+        columns = f"{', '.join(EVENT_COLUMNS)}, event_date"
+        placeholders = ", ".join("?" * (len(EVENT_COLUMNS) + 1))
+        partitions: list[str] = []
+        for events_df in iter_block_events(
+            user_blocks(),
+            start_date,
+            end_date,
+            seed=seed,
+            scenario=scenario,
+            workers=workers,
+        ):
+            rows = _event_rows(events_df)
+            if rows:
+                # a chunk is a single day, so it belongs to one partition
+                table = partition_table(rows[0][-1])
+                conn.execute("BEGIN")
+                if table not in partitions:
+                    create_partition(conn, table)
+                    partitions.append(table)
+                conn.executemany(
+                    f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", rows
+                )
+                conn.execute("COMMIT")
+            if csv_dir is not None:
+                events_df.to_csv(
+                    Path(csv_dir) / "event_stream.csv",
+                    mode="w" if stats.chunks == 0 else "a",
+                    header=stats.chunks == 0,
+                    index=False,
+                )
+            stats.events += len(events_df)
+            stats.chunks += 1
+        logger.info(
+            f"Inserted {stats.users} users and {stats.events} events "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        # build the read-path indexes over the loaded data: this is migration
+        # 1, minus the event_date backfill the schema already covers, per
+        # partition. Migration 3 then catalogs the partitions behind the
+        # event_stream view.
+        conn.execute("BEGIN")
+        for table in partitions:
+            for statement in event_index_statements(table):
+                conn.execute(statement)
+        for statement in DIMENSION_TABLE_INDEXES:
+            conn.execute(statement)
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA user_version = 1")
+        conn.execute("COMMIT")
+        conn.execute("PRAGMA journal_mode = DELETE")
+        apply_migrations(conn)
+    finally:
+        conn.close()
+
+    os.replace(scratch_path, db_path)
+    manifest = build_manifest(
+        scenario, n_users, start_date, end_date, seed, scale_factor
+    )
+    manifest_path(db_path).write_text(json.dumps(manifest, indent=2))
+    stats.seconds = time.perf_counter() - started
+    logger.info(
+        f"Loaded {db_path} in {stats.seconds:.1f}s "
+        f"({stats.events_per_second:,.0f} events/s)"
+    )
+    return stats
+
+
+def main(argv: list[str] | None = None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Generate the synthetic dataset into a SQLite database"
+    )
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--users", type=int, default=TOTAL_USERS)
+    size.add_argument(
+        "--scale-factor",
+        type=float,
+        default=None,
+        help=f"dataset size; SF1 = {TOTAL_USERS:,} users over 8 days",
+    )
+    parser.add_argument(
+        "--scenario", choices=sorted(SCENARIOS), default=DEFAULT_SCENARIO.name
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--db-path", default="data/analytics.db")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="processes generating events"
+    )
+    parser.add_argument(
+        "--csv-dir", default=None, help="also export the tables as CSV files here"
+    )
+    args = parser.parse_args(argv)
+
+    load_database(
+        args.db_path,
+        n_users=args.users,
+        seed=args.seed,
+        csv_dir=args.csv_dir,
+        scenario=get_scenario(args.scenario),
+        scale_factor=args.scale_factor,
+        workers=args.workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
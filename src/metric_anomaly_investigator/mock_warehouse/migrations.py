@@ -0,0 +1,200 @@
+import argparse
+import logging
+import sqlite3
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from metric_anomaly_investigator.mock_warehouse.partitions import (
+    event_index_statements,
+    partition_event_stream,
+)
+from metric_anomaly_investigator.mock_warehouse.sampling import assign_sample_buckets
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    statements: tuple[str, ...]
+    # data-dependent steps, run after the statements in the same transaction
+    function: Callable[[sqlite3.Connection], None] | None = None
+
+
+DIMENSION_TABLE_INDEXES: tuple[str, ...] = (
+    """
+    CREATE INDEX IF NOT EXISTS idx_user_profiles_signup_date
+    ON user_profiles (signup_date)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_deployments_date
+    ON deployments (deployment_date)
+    """,
+)
+
+# Created by migration 1; the bulk loader builds the same indexes per
+# event_stream partition after the data is in.
+READ_PATH_INDEXES: tuple[str, ...] = (
+    *event_index_statements("event_stream"),
+    *DIMENSION_TABLE_INDEXES,
+)
+
+# Applied in order; the database's PRAGMA user_version records the last one.
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(
+        version=1,
+        description="materialized event_date column and read-path indexes",
+        statements=(
+            "ALTER TABLE event_stream ADD COLUMN event_date TEXT",
+            "UPDATE event_stream SET event_date = DATE(event_timestamp)",
+            *READ_PATH_INDEXES,
+            "ANALYZE",
+        ),
+    ),
+    Migration(
+        version=2,
+        description="daily rollup cube with HyperLogLog user sketches",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS event_rollup (
+                event_date TEXT NOT NULL,
+                platform TEXT,
+                country TEXT,
+                device_type TEXT,
+                app_version TEXT,
+                event_type TEXT,
+                event_count INTEGER NOT NULL,
+                user_sketch BLOB NOT NULL
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_event_rollup_date
+            ON event_rollup (event_date)
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS rollup_metadata (
+                source_rows INTEGER NOT NULL,
+                hll_precision INTEGER NOT NULL,
+                built_at TEXT NOT NULL
+            )
+            """,
+        ),
+    ),
+    Migration(
+        version=3,
+        description="weekly event_stream partitions behind an event_stream view",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS event_partitions (
+                table_name TEXT PRIMARY KEY,
+                first_day TEXT NOT NULL,
+                last_day TEXT NOT NULL,
+                row_count INTEGER NOT NULL
+            )
+            """,
+        ),
+        function=partition_event_stream,
+    ),
+    Migration(
+        version=4,
+        description="stable hash-based user sample buckets for approximate queries",
+        statements=(
+            "ALTER TABLE user_profiles ADD COLUMN sample_bucket INTEGER",
+            """
+            CREATE INDEX IF NOT EXISTS idx_user_profiles_sample_bucket
+            ON user_profiles (sample_bucket, user_id)
+            """,
+        ),
+        function=assign_sample_buckets,
+    ),
+    Migration(
+        version=5,
+        description="rollup staleness check on the event tables' max rowid",
+        statements=("ALTER TABLE rollup_metadata ADD COLUMN source_max_rowid INTEGER",),
+    ),
+)
+
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def require_latest_schema(db_path: str) -> None:
+    """Raise SchemaVersionError unless `db_path` has every migration applied."""
+    conn = sqlite3.connect(db_path)
+    try:
+        version = get_schema_version(conn)
+    finally:
+        conn.close()
+    if version < LATEST_SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"Database {db_path} is at schema version {version}, expected "
+            f"{LATEST_SCHEMA_VERSION}. Run `python -m "
+            f"metric_anomaly_investigator.mock_warehouse.migrations "
+            f"--db-path {db_path}` to migrate it"
+        )
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Bring the analytics schema up to LATEST_SCHEMA_VERSION.
+
+    Each migration (DDL included) runs in one explicit transaction together with
+    the user_version bump, so an interrupted run is simply retried next time.
+    `conn` must be in autocommit mode (isolation_level=None).
+    Returns the number of migrations applied.
+    """
+    current = get_schema_version(conn)
+    applied = 0
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        logger.info(
+            f"Applying schema migration {migration.version}: {migration.description}"
+        )
+        conn.execute("BEGIN")
+        try:
+            for statement in migration.statements:
+                conn.execute(statement)
+            if migration.function is not None:
+                migration.function(conn)
+            conn.execute(f"PRAGMA user_version = {migration.version}")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        applied += 1
+    return applied
+
+
+def migrate(db_path: str) -> int:
+    """Open a writable connection to `db_path` and apply pending migrations."""
+    # autocommit mode: apply_migrations manages its own transactions
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        return apply_migrations(conn)
+    finally:
+        conn.close()
+
+
+def main(argv: list[str] | None = None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Apply pending schema migrations to a SQLite database"
+    )
+    parser.add_argument("--db-path", default="data/analytics.db")
+    args = parser.parse_args(argv)
+
+    applied = migrate(args.db_path)
+    logger.info(f"Applied {applied} migrations to {args.db_path}")
+
+
+if __name__ == "__main__":
+    main()
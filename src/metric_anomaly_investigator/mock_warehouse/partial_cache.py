@@ -0,0 +1,156 @@
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from metric_anomaly_investigator.mock_warehouse.query_cache import canonical_query_key
+
+logger = logging.getLogger(__name__)
+
+# (bucket label, first day, last day) - a day for dau/events_per_user, or the
+# part of a '%Y-%W' week that falls inside the requested range for wau.
+Chunk = tuple[str, str, str]
+
+
+def split_into_chunks(metric_name: str, start: date, end: date) -> list[Chunk]:
+    chunks: list[Chunk] = []
+    day = start
+    while day <= end:
+        label = day.strftime("%Y-%W") if metric_name == "wau" else day.isoformat()
+        if chunks and chunks[-1][0] == label:
+            chunks[-1] = (label, chunks[-1][1], day.isoformat())
+        else:
+            chunks.append((label, day.isoformat(), day.isoformat()))
+        day += timedelta(days=1)
+    return chunks
+
+
+@dataclass
+class PartialCacheStats:
+    chunks_hit: int = 0
+    chunks_scanned: int = 0
+    range_queries: int = 0
+    invalidations: int = 0
+
+
+class PartialAggregateCache:
+    """
+    Caches metric rows per time bucket for each query shape
+    (metric, dimensions, filters), so a new range is assembled from cached
+    buckets plus one query per run of missing buckets.
+
+    DAU and events_per_user group by day, so each day's rows are final and can
+    be reused by any range containing that day. WAU groups by '%Y-%W' week and
+    only counts days inside the range, so its buckets are keyed by the clipped
+    part of the week: extending a window re-scans just the edge week.
+    """
+
+    def __init__(
+        self,
+        max_shapes: int = 128,
+        data_fingerprint: Callable[[], Hashable] | None = None,
+    ):
+        self.max_shapes = max_shapes
+        self._data_fingerprint = data_fingerprint
+        self._fingerprint: Hashable = None
+        self._shapes: OrderedDict[tuple, dict[tuple[str, str], list[dict]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.stats = PartialCacheStats()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._shapes.clear()
+
+    def _chunks_for_shape(self, shape: tuple) -> dict[tuple[str, str], list[dict]]:
+        if self._data_fingerprint is not None:
+            fingerprint = self._data_fingerprint()
+            if fingerprint != self._fingerprint:
+                if self._shapes:
+                    self.stats.invalidations += 1
+                self._shapes.clear()
+                self._fingerprint = fingerprint
+        if shape not in self._shapes:
+            self._shapes[shape] = {}
+            while len(self._shapes) > self.max_shapes:
+                self._shapes.popitem(last=False)
+        self._shapes.move_to_end(shape)
+        return self._shapes[shape]
+
+    def assemble(
+        self,
+        metric_name: str,
+        time_range: tuple[str, str],
+        dimensions: list[str],
+        filters: dict[str, str],
+        fetch: Callable[[tuple[str, str]], list[dict]],
+    ) -> list[dict]:
+        """
+        Return the rows `fetch(time_range)` would return, querying only the
+        buckets not cached yet.
+        """
+        try:
+            start = date.fromisoformat(time_range[0])
+            end = date.fromisoformat(time_range[1])
+        except ValueError:
+            # not plain ISO dates: ranges can't be split by day, query directly
+            return fetch(time_range)
+
+        shape = canonical_query_key(
+            "query_metric",
+            metric_name=metric_name,
+            dimensions=dimensions,
+            filters=filters,
+        )
+        bucket_col = "week" if metric_name == "wau" else "date"
+        chunks = split_into_chunks(metric_name, start, end)
+
+        with self._lock:
+            cached = self._chunks_for_shape(shape)
+            fingerprint = self._fingerprint
+            found = {
+                (first, last): cached[(first, last)]
+                for _, first, last in chunks
+                if (first, last) in cached
+            }
+
+        # one range query per run of consecutive missing chunks
+        runs: list[list[Chunk]] = []
+        previous_missing = False
+        for chunk in chunks:
+            missing = (chunk[1], chunk[2]) not in found
+            if missing and previous_missing:
+                runs[-1].append(chunk)
+            elif missing:
+                runs.append([chunk])
+            previous_missing = missing
+
+        fetched: dict[tuple[str, str], list[dict]] = {}
+        for run in runs:
+            rows = fetch((run[0][1], run[-1][2]))
+            by_label: dict[str, list[dict]] = {label: [] for label, _, _ in run}
+            for row in rows:
+                by_label.setdefault(str(row[bucket_col]), []).append(row)
+            for label, first, last in run:
+                fetched[(first, last)] = by_label[label]
+        self.stats.range_queries += len(runs)
+        self.stats.chunks_scanned += len(fetched)
+        self.stats.chunks_hit += len(found)
+        logger.debug(
+            f"{metric_name} {time_range}: {len(found)} cached buckets, "
+            f"{len(fetched)} scanned in {len(runs)} range queries"
+        )
+
+        if fetched:
+            with self._lock:
+                if fingerprint == self._fingerprint:
+                    self._chunks_for_shape(shape).update(fetched)
+
+        results = []
+        for _, first, last in chunks:
+            key = (first, last)
+            results.extend(found[key] if key in found else fetched[key])
+        return results
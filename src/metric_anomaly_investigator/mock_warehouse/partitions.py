@@ -0,0 +1,159 @@
+import logging
+import sqlite3
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "event_stream_p"
+
+# event_stream columns, with the types DataFrame.to_sql used to produce
+EVENT_STREAM_COLUMNS: dict[str, str] = {
+    "event_id": "TEXT",
+    "user_id": "TEXT",
+    "event_type": "TEXT",
+    "event_timestamp": "TIMESTAMP",
+    "platform": "TEXT",
+    "country": "TEXT",
+    "device_type": "TEXT",
+    "app_version": "TEXT",
+    "session_id": "TEXT",
+    "properties": "TEXT",
+    "event_date": "TEXT",
+}
+
+EVENT_INDEXES: dict[str, str] = {
+    # Covers the date range scan plus the most common filter columns,
+    # so DAU-style COUNT(DISTINCT user_id) never touches the table rows.
+    "date_dims": "(event_date, platform, country, app_version, user_id)",
+    # Cohort retention probes events by user after selecting the cohort.
+    "user_date": "(user_id, event_date)",
+}
+
+
+def event_index_statements(table: str) -> tuple[str, ...]:
+    """The read-path indexes of an event table (event_stream or a partition)."""
+    return tuple(
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_{name} ON {table} {columns}"
+        for name, columns in EVENT_INDEXES.items()
+    )
+
+
+def partition_table(event_date: str) -> str:
+    """
+    Partition holding `event_date`: one per '%Y-%W' week, the WAU bucket, so
+    every day and week bucket of a metric lives in a single partition.
+    """
+    week = datetime.strptime(event_date[:10], "%Y-%m-%d").strftime("%Y_%W")
+    return f"{PARTITION_PREFIX}{week}"
+
+
+def create_partition(conn: sqlite3.Connection, table: str) -> None:
+    columns = ", ".join(
+        f"{name} {type_}" for name, type_ in EVENT_STREAM_COLUMNS.items()
+    )
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+
+
+def partition_tables(conn: sqlite3.Connection) -> list[str]:
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ? "
+        "ESCAPE '\\' ORDER BY name",
+        [PARTITION_PREFIX.replace("_", "\\_") + "%"],
+    ).fetchall()
+    return [name for (name,) in rows]
+
+
+def refresh_partitions(conn: sqlite3.Connection) -> int:
+    """
+    Rebuild the event_partitions catalog and the event_stream view over all
+    partition tables. Returns the number of partitions.
+    """
+    tables = partition_tables(conn)
+    conn.execute("DELETE FROM event_partitions")
+    for table in tables:
+        first_day, last_day, row_count = conn.execute(
+            f"SELECT MIN(event_date), MAX(event_date), COUNT(*) FROM {table}"
+        ).fetchone()
+        if row_count:
+            conn.execute(
+                "INSERT INTO event_partitions VALUES (?, ?, ?, ?)",
+                [table, first_day, last_day, row_count],
+            )
+
+    conn.execute("DROP VIEW IF EXISTS event_stream")
+    if tables:
+        body = " UNION ALL ".join(f"SELECT * FROM {table}" for table in tables)
+    else:
+        body = "SELECT " + ", ".join(
+            f"CAST(NULL AS {type_}) AS {name}"
+            for name, type_ in EVENT_STREAM_COLUMNS.items()
+        )
+        body += " WHERE 0"
+    conn.execute(f"CREATE VIEW event_stream AS {body}")
+    return len(tables)
+
+
+def partition_event_stream(conn: sqlite3.Connection) -> None:
+    """
+    Move the rows of an event_stream table into weekly partitions and replace
+    it with a UNION ALL view of them, so readers that don't prune partitions
+    keep working unchanged. Safe to run again: existing partitions are kept
+    and only the catalog and view are rebuilt.
+    """
+    kind = conn.execute(
+        "SELECT type FROM sqlite_master WHERE name = 'event_stream'"
+    ).fetchone()
+    if kind == ("table",):
+        columns = ", ".join(EVENT_STREAM_COLUMNS)
+        weeks = conn.execute(
+            "SELECT MIN(event_date), MAX(event_date) FROM event_stream "
+            "GROUP BY STRFTIME('%Y-%W', event_date)"
+        ).fetchall()
+        for first_day, last_day in weeks:
+            table = partition_table(first_day)
+            create_partition(conn, table)
+            conn.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM event_stream "
+                "WHERE event_date >= ? AND event_date <= ?",
+                [first_day, last_day],
+            )
+            for statement in event_index_statements(table):
+                conn.execute(statement)
+        conn.execute("DROP TABLE event_stream")
+        logger.info(f"Split event_stream into {len(weeks)} weekly partitions")
+    refresh_partitions(conn)
+
+
+class PartitionCatalog:
+    """Prunes event_stream partitions by date using the event_partitions table."""
+
+    def __init__(self, partitioned: bool):
+        self.partitioned = partitioned
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> "PartitionCatalog":
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+            "AND name = 'event_partitions'"
+        ).fetchone()
+        return cls(partitioned=exists is not None)
+
+    def tables_for(
+        self, conn: sqlite3.Connection, time_ranges: list[tuple[str, str]] | None
+    ) -> list[str]:
+        """
+        Partitions holding events in any of `time_ranges` (all of them for
+        None), oldest first. Unpartitioned databases just have event_stream.
+        """
+        if not self.partitioned:
+            return ["event_stream"]
+        query = "SELECT table_name FROM event_partitions"
+        params = []
+        if time_ranges is not None:
+            query += " WHERE " + " OR ".join(
+                "(first_day <= ? AND last_day >= ?)" for _ in time_ranges
+            )
+            for start, end in time_ranges:
+                params.extend([end, start])
+        query += " ORDER BY first_day"
+        return [name for (name,) in conn.execute(query, params).fetchall()]
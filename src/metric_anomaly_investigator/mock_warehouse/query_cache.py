@@ -0,0 +1,130 @@
+import logging
+import pickle
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def canonical_query_key(method: str, **params: Any) -> tuple:
+    """
+    Normalize call parameters so cosmetically different calls share a cache key:
+    None and empty containers are equivalent, dimension lists are sorted and
+    filter dicts become sorted item tuples.
+    """
+
+    def normalize(name: str, value: Any) -> Hashable:
+        if value is None:
+            return ()
+        if isinstance(value, dict):
+            return tuple(sorted((str(k), str(v)) for k, v in value.items()))
+        if name == "dimensions":
+            return tuple(sorted(value))
+        if isinstance(value, list | tuple):
+            return tuple(value)
+        return value
+
+    return (method, *sorted((name, normalize(name, v)) for name, v in params.items()))
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of warehouse query results, bounded by both entry
+    count and (pickled) byte size.
+
+    `data_fingerprint` is called on every lookup; when its value changes (e.g.
+    the database file's mtime or SQLite data_version moved) the whole cache is
+    dropped, since any entry may be stale.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        max_bytes: int = 64 * 2**20,
+        data_fingerprint: Callable[[], Hashable] | None = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data_fingerprint = data_fingerprint
+        self._fingerprint: Hashable = None
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def _check_fingerprint(self) -> None:
+        if self._data_fingerprint is None:
+            return
+        fingerprint = self._data_fingerprint()
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                logger.info("Warehouse data changed, invalidating query cache")
+                self.stats.invalidations += 1
+            self._clear_locked()
+            self._fingerprint = fingerprint
+
+    def _clear_locked(self) -> None:
+        self._entries.clear()
+        self.stats.entries = 0
+        self.stats.bytes = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear_locked()
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        with self._lock:
+            self._check_fingerprint()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return True, self._entries[key][0]
+            self.stats.misses += 1
+            return False, None
+
+    def put(self, key: Hashable, value: Any, fingerprint: Hashable = None) -> None:
+        size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            if fingerprint is not None and fingerprint != self._fingerprint:
+                return  # data changed while the value was being computed
+            if key in self._entries:
+                self.stats.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.stats.bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.stats.bytes > self.max_bytes
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.stats.bytes -= evicted_size
+                self.stats.evictions += 1
+            self.stats.entries = len(self._entries)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        hit, value = self.get(key)
+        if hit:
+            return value
+        fingerprint = self._fingerprint
+        value = compute()
+        self.put(key, value, fingerprint)
+        return value
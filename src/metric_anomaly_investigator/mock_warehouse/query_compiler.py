@@ -0,0 +1,182 @@
+import functools
+from collections.abc import Iterable
+from typing import Literal
+
+SUPPORTED_METRICS = Literal["dau", "wau", "events_per_user"]
+ALLOWED_COLUMNS = ["platform", "country", "device_type", "app_version", "event_type"]
+# user_profiles column behind each cohort filter key
+USER_PROFILE_FILTER_COLUMNS = {
+    "platform": "signup_platform",
+    "country": "signup_country",
+    "signup_platform": "signup_platform",
+    "signup_country": "signup_country",
+    "user_cohort": "user_cohort",
+    "acquisition_channel": "acquisition_channel",
+    "user_tier": "user_tier",
+}
+
+# Compiled SQL per query shape (metric, columns, table): a shape is validated
+# and formatted once, and repeats get the identical string back, which is
+# what sqlite3's per-connection prepared-statement cache is keyed on.
+COMPILED_QUERY_CACHE_SIZE = 512
+
+
+def validate_columns(columns: Iterable[str]) -> None:
+    for col in columns:
+        if col not in ALLOWED_COLUMNS:
+            raise ValueError(f"Unsupported column: {col}")
+
+
+def bucket_sql(metric_name: str) -> str:
+    match metric_name:
+        case "dau" | "events_per_user":
+            return "event_date"
+        case "wau":
+            return "STRFTIME('%Y-%W', event_date)"
+        case _:
+            raise ValueError(
+                f"Unsupported metric: {metric_name}. Supported: {SUPPORTED_METRICS}"
+            )
+
+
+def filter_params(filters: dict[str, str]) -> tuple[tuple[str, ...], list[str]]:
+    """Filter columns in canonical (sorted) order, and their values."""
+    columns = tuple(sorted(filters))
+    return columns, [filters[col] for col in columns]
+
+
+@functools.lru_cache(maxsize=COMPILED_QUERY_CACHE_SIZE)
+def metric_query(
+    metric_name: str,
+    dimensions: tuple[str, ...],
+    filter_columns: tuple[str, ...],
+    table: str = "event_stream",
+) -> str:
+    """
+    Per-bucket metric query. Params: start date, end date, then one value per
+    filter column.
+    """
+    validate_columns([*dimensions, *filter_columns])
+    dims_sql = "".join(f", {dim}" for dim in dimensions)
+    filter_clauses = "".join(f" AND {col} = ?" for col in filter_columns)
+    match metric_name:
+        case "dau":
+            select_sql = "event_date as date, COUNT(DISTINCT user_id) as value"
+            group_sql, order_sql = "event_date", "event_date"
+        case "wau":
+            select_sql = (
+                "STRFTIME('%Y-%W', event_date) as week, "
+                "COUNT(DISTINCT user_id) as value"
+            )
+            group_sql, order_sql = "week", "week"
+        case "events_per_user":
+            select_sql = (
+                "event_date as date, "
+                "CAST(COUNT(*) AS FLOAT) / NULLIF(COUNT(DISTINCT user_id), 0) as value"
+            )
+            group_sql, order_sql = "event_date", "event_date"
+        case _:
+            raise ValueError(
+                f"Unsupported metric: {metric_name}. Supported: {SUPPORTED_METRICS}"
+            )
+    return f"""
+        SELECT {select_sql}{dims_sql}
+        FROM {table}
+        WHERE event_date >= ? AND event_date <= ?{filter_clauses}
+        GROUP BY {group_sql}{dims_sql}
+        ORDER BY {order_sql}
+        """
+
+
+@functools.lru_cache(maxsize=COMPILED_QUERY_CACHE_SIZE)
+def sample_query(
+    metric_name: str,
+    dimensions: tuple[str, ...],
+    filter_columns: tuple[str, ...],
+    table: str = "event_stream",
+) -> str:
+    """
+    Events per (bucket, *dimensions, user_id) of the sampled users. Params:
+    start date, end date, sample bucket threshold, then the filter values.
+    """
+    validate_columns([*dimensions, *filter_columns])
+    dims_sql = "".join(f"{dim}, " for dim in dimensions)
+    filter_clauses = "".join(f" AND {col} = ?" for col in filter_columns)
+    return f"""
+        SELECT {bucket_sql(metric_name)} AS bucket, {dims_sql}user_id,
+        COUNT(*) AS events
+        FROM {table}
+        WHERE event_date >= ? AND event_date <= ?
+        AND user_id IN (
+            SELECT user_id FROM user_profiles WHERE sample_bucket < ?
+        ){filter_clauses}
+        GROUP BY bucket, {dims_sql}user_id
+        """
+
+
+def cohort_filter_params(
+    filters: dict[str, str] | None,
+) -> tuple[tuple[str, ...], list[str]]:
+    """user_profiles columns of cohort `filters` in canonical order, and values."""
+    filters = filters or {}
+    for key in filters:
+        if key not in USER_PROFILE_FILTER_COLUMNS:
+            raise ValueError(
+                f"Unsupported cohort filter: {key}. "
+                f"Supported: {sorted(USER_PROFILE_FILTER_COLUMNS)}"
+            )
+    keys = sorted(filters)
+    return tuple(USER_PROFILE_FILTER_COLUMNS[key] for key in keys), [
+        filters[key] for key in keys
+    ]
+
+
+@functools.lru_cache(maxsize=COMPILED_QUERY_CACHE_SIZE)
+def cohort_size_query(filter_columns: tuple[str, ...]) -> str:
+    """Params: cohort date twice, then the filter values."""
+    filter_clauses = "".join(f" AND {col} = ?" for col in filter_columns)
+    return f"""
+        SELECT COUNT(*)
+        FROM user_profiles
+        WHERE signup_date >= DATE(?) AND signup_date < DATE(?, '+1 day'){filter_clauses}
+        """
+
+
+@functools.lru_cache(maxsize=COMPILED_QUERY_CACHE_SIZE)
+def retention_query(
+    filter_columns: tuple[str, ...], n_offsets: int, table: str = "event_stream"
+) -> str:
+    """
+    Users of the cohort active per day offset from signup. Params: cohort
+    date x4, first offset ('+N'), cohort date, last offset, the filter
+    values, then the `n_offsets` offsets.
+    """
+    filter_clauses = "".join(f" AND user_profiles.{col} = ?" for col in filter_columns)
+    offset_placeholders = ", ".join("?" for _ in range(n_offsets))
+    return f"""
+        SELECT CAST(
+            julianday(events.event_date) - julianday(DATE(?)) AS INTEGER
+        ) AS day_offset,
+        COUNT(DISTINCT events.user_id) AS retained_users
+        FROM user_profiles
+        JOIN {table} AS events ON events.user_id = user_profiles.user_id
+        WHERE user_profiles.signup_date >= DATE(?)
+        AND user_profiles.signup_date < DATE(?, '+1 day')
+        AND events.event_date >= DATE(?, ? || ' days')
+        AND events.event_date <= DATE(?, ? || ' days'){filter_clauses}
+        GROUP BY day_offset
+        HAVING day_offset IN ({offset_placeholders})
+        """
+
+
+@functools.lru_cache(maxsize=COMPILED_QUERY_CACHE_SIZE)
+def deployments_query(by_platform: bool) -> str:
+    """Params: start date, end date, then the platform if `by_platform`."""
+    platform_clause = " AND platform = ?" if by_platform else ""
+    return f"""
+        SELECT deployment_id, deployment_date, app_version, platform, regions,
+        rollout_percentage
+        FROM deployments
+        WHERE deployment_date >= DATE(?) AND deployment_date < DATE(?, '+1 day')
+        {platform_clause}
+        """
@@ -0,0 +1,386 @@
+import logging
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from metric_anomaly_investigator.schemas import RootCauseAnalysis, RootCauseSegment
+
+logger = logging.getLogger(__name__)
+
+ROOT_CAUSE_DIMENSIONS = ["platform", "country", "device_type", "app_version"]
+# Dimensions users move between (upgrades). Combined with other dimensions,
+# a drop in one of their values may just be users who moved to a sibling
+# value, which the per-leaf aggregates can't tell apart from users who left.
+SHIFTING_DIMENSIONS = ["app_version"]
+MIN_SUPPORT = 0.01  # share of the baseline (or current) total
+MIN_SURPRISE = 1e-4  # Jensen-Shannon divergence of the segment's share
+BEAM_WIDTH = 100  # segments expanded per depth
+# A child only outranks its parents if the rest of each parent held steady:
+# its siblings' shift (actual/forecast vs. the rest of the table) is at most
+# this share of the child's own. Leaves room for sampling noise in small
+# siblings.
+MAX_SIBLING_SHIFT = 0.25
+
+# per-leaf measure columns, summed per candidate segment with np.bincount
+F, V, FF, VV, FV, USERS_B, EVENTS_B, USERS_C, EVENTS_C = range(9)
+
+
+def _js_divergence(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Adtributor's surprise: JS divergence between baseline and current share."""
+    m = (p + q) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        left = np.where(p > 0, p * np.log(p / m), 0.0)
+        right = np.where(q > 0, q * np.log(q / m), 0.0)
+    return (left + right) / 2
+
+
+def _siblings_moved(
+    totals: np.ndarray,
+    parent_forecast: float | np.ndarray,
+    parent_actual: float | np.ndarray,
+    forecast: np.ndarray,
+    actual: np.ndarray,
+    ratio: np.ndarray,
+) -> np.ndarray:
+    """Per child, whether the rest of its parent shifted along with it."""
+    # shifts relative to the rest of the table, so that seasonality
+    # doesn't count as one
+    outside_forecast = totals[F] - parent_forecast
+    sibling_forecast = parent_forecast - forecast
+    with np.errstate(divide="ignore", invalid="ignore"):
+        background = np.where(
+            outside_forecast > 0, (totals[V] - parent_actual) / outside_forecast, 1.0
+        )
+        sibling_ratio = np.where(
+            sibling_forecast > 0,
+            (parent_actual - actual) / sibling_forecast,
+            background,
+        )
+    return np.abs(sibling_ratio - background) > MAX_SIBLING_SHIFT * np.abs(
+        ratio - background
+    )
+
+
+@dataclass
+class _Cell:
+    segment: dict[str, str]
+    parent_mask: np.ndarray  # leaves of the parent segment
+    last_dim: int  # the dimension this cell added; children only add later ones
+    code: int  # its value code
+    n_leaves: int
+    score: float
+    forecast: float
+    actual: float
+
+
+class LeafTable:
+    """
+    The finest-grained segments (one per combination of dimension values) of
+    a metric, with an additive measure for the baseline forecast `f` and the
+    current actual `v`:
+
+    - dau / wau: average distinct users per bucket, in each period
+    - events_per_user: current events vs. the events the segment would have
+      had at its baseline rate (baseline events/user x current users)
+
+    Distinct users are summed across leaves, which is exact when each user
+    falls in a single leaf per bucket. That holds for daily buckets here
+    (app_version is picked per user-day, the other dimensions per user);
+    for weekly buckets a user who changed app_version is counted in each leaf.
+    """
+
+    def __init__(
+        self,
+        metric_name: str,
+        dimensions: list[str],
+        codes: np.ndarray,
+        values: list[list[str]],
+        measures: np.ndarray,
+    ):
+        self.metric_name = metric_name
+        self.dimensions = dimensions
+        self.codes = codes
+        self.values = values
+        self.measures = measures
+
+    @classmethod
+    def from_rows(
+        cls, metric_name: str, dimensions: list[str], rows: list[tuple]
+    ) -> "LeafTable":
+        """Build from (period, bucket, *dimensions, users, events) rows."""
+        frame = pd.DataFrame(
+            rows, columns=["period", "bucket", *dimensions, "users", "events"]
+        )
+        for dim in dimensions:
+            frame[dim] = frame[dim].astype(str)
+        n_buckets = frame.groupby("period")["bucket"].nunique()
+        leaves = (
+            frame.groupby([*dimensions, "period"])[["users", "events"]]
+            .sum()
+            .unstack("period", fill_value=0)
+        )
+
+        def per_bucket(column: str, period: str) -> np.ndarray:
+            if (column, period) not in leaves:
+                return np.zeros(len(leaves))
+            return leaves[(column, period)].to_numpy(float) / n_buckets[period]
+
+        users_b, events_b = (
+            per_bucket("users", "baseline"),
+            per_bucket("events", "baseline"),
+        )
+        users_c, events_c = (
+            per_bucket("users", "current"),
+            per_bucket("events", "current"),
+        )
+        if metric_name == "events_per_user":
+            overall_rate = events_b.sum() / users_b.sum() if users_b.sum() else 0.0
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rate_b = np.where(users_b > 0, events_b / users_b, overall_rate)
+            forecast, actual = rate_b * users_c, events_c
+        else:
+            forecast, actual = users_b, users_c
+
+        measures = np.column_stack(
+            [
+                forecast,
+                actual,
+                forecast * forecast,
+                actual * actual,
+                forecast * actual,
+                users_b,
+                events_b,
+                users_c,
+                events_c,
+            ]
+        )
+        codes, values = [], []
+        for level in range(len(dimensions)):
+            level_codes, level_values = pd.factorize(
+                leaves.index.get_level_values(level), sort=True
+            )
+            codes.append(level_codes)
+            values.append([str(v) for v in level_values])
+        return cls(metric_name, dimensions, np.column_stack(codes), values, measures)
+
+    def _metric_values(self, sums: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Baseline and current metric value of segments from their summed measures."""
+        if self.metric_name == "events_per_user":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                baseline = np.where(
+                    sums[:, USERS_B] > 0, sums[:, EVENTS_B] / sums[:, USERS_B], 0.0
+                )
+                current = np.where(
+                    sums[:, USERS_C] > 0, sums[:, EVENTS_C] / sums[:, USERS_C], 0.0
+                )
+            return baseline, current
+        return sums[:, USERS_B], sums[:, USERS_C]
+
+    def _matching(self, segment: dict[str, str]) -> np.ndarray:
+        """Mask of the leaves in `segment`."""
+        mask = np.ones(len(self.measures), dtype=bool)
+        for name, value in segment.items():
+            d = self.dimensions.index(name)
+            mask &= self.codes[:, d] == self.values[d].index(value)
+        return mask
+
+    def search(
+        self,
+        top_k: int = 5,
+        max_depth: int = 3,
+        min_support: float = MIN_SUPPORT,
+        min_surprise: float = MIN_SURPRISE,
+        time_budget: float = 2.0,
+        beam_width: int = BEAM_WIDTH,
+    ) -> RootCauseAnalysis:
+        """
+        Breadth-first search of the segment lattice (HotSpot style).
+
+        Every segment is scored with HotSpot's ripple-effect potential score:
+        assume only this segment changed, with each of its leaves scaled by the
+        segment's overall actual/forecast ratio, and measure how much of the
+        distance between the forecast and actual leaf vectors that explains.
+        A broad segment whose leaves didn't all move scores below the narrower
+        segment that did. Segments below `min_support` are pruned with their
+        whole subtree (support only shrinks when drilling down), and segments
+        below `min_surprise` (Adtributor's distribution-shift threshold) are
+        not reported. Neither are children whose siblings under any of their
+        parents moved as well (see MAX_SIBLING_SHIFT and SHIFTING_DIMENSIONS):
+        their drop is the parent's. Surprise isn't used to prune the subtree: with many
+        values per dimension, the one-dimensional parents of a sharp drop
+        barely shift their share. Instead each depth expands only the
+        `beam_width` best-scoring segments, best first, and the search stops
+        once `time_budget` seconds have passed.
+        """
+        started = time.perf_counter()
+        totals = self.measures.sum(axis=0)
+        total_change = totals[V] - totals[F]
+        # squared distance between the actual and forecast leaf vectors
+        deviation = totals[VV] - 2 * totals[FV] + totals[FF]
+        n_leaves = len(self.measures)
+        if n_leaves == 0 or total_change == 0 or deviation <= 0:
+            return RootCauseAnalysis(
+                segments=[],
+                cells_evaluated=0,
+                truncated=False,
+                elapsed_seconds=time.perf_counter() - started,
+            )
+
+        candidates: list[RootCauseSegment] = []
+        cells_evaluated = 0
+        truncated = False
+        everything = np.ones(n_leaves, dtype=bool)
+        frontier = [_Cell({}, everything, -1, -1, n_leaves, 0.0, totals[F], totals[V])]
+        for _ in range(min(max_depth, len(self.dimensions))):
+            children: list[_Cell] = []
+            for parent in frontier:
+                if time.perf_counter() - started > time_budget:
+                    truncated = True
+                    break
+                mask = parent.parent_mask
+                if parent.last_dim >= 0:
+                    mask = mask.copy()
+                    mask[mask] = self.codes[mask, parent.last_dim] == parent.code
+                leaf_measures = self.measures[mask]
+                for d in range(parent.last_dim + 1, len(self.dimensions)):
+                    codes = self.codes[mask, d]
+                    n_values = len(self.values[d])
+                    sums = np.column_stack(
+                        [
+                            np.bincount(codes, weights=column, minlength=n_values)
+                            for column in leaf_measures.T
+                        ]
+                    )
+                    leaf_counts = np.bincount(codes, minlength=n_values)
+                    cells_evaluated += int((leaf_counts > 0).sum())
+
+                    forecast, actual = sums[:, F], sums[:, V]
+                    p = forecast / totals[F] if totals[F] else np.zeros(n_values)
+                    q = actual / totals[V] if totals[V] else np.zeros(n_values)
+                    support = np.maximum(p, q)
+                    surprise = _js_divergence(p, q)
+                    explanatory_power = (actual - forecast) / total_change
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        ratio = np.where(forecast > 0, actual / forecast, 0.0)
+                    # distance left if only this segment changed, by its ratio
+                    inside_before = sums[:, VV] - 2 * sums[:, FV] + sums[:, FF]
+                    inside_after = (
+                        sums[:, VV] - 2 * ratio * sums[:, FV] + ratio**2 * sums[:, FF]
+                    )
+                    remaining = np.maximum(deviation - inside_before + inside_after, 0)
+                    score = np.where(
+                        forecast > 0,
+                        np.maximum(1 - np.sqrt(remaining / deviation), 0.0),
+                        0.0,
+                    )
+                    # Parent consistency: a child only outranks its parents
+                    # if the rest of each parent held steady. If the siblings
+                    # moved too, the change belongs to the parent, spread
+                    # over its children or shifted between them (users
+                    # moving from one app_version to another empty one cell
+                    # and fill the next). Such a child isn't reported and
+                    # keeps at most the parent's score. All of the cell's
+                    # parents are checked, not just the one the search came
+                    # from, so the outcome doesn't depend on dimension order.
+                    mixed = np.zeros(n_values, dtype=bool)
+                    # the same leaves as one of its parents: adds nothing
+                    redundant = leaf_counts == parent.n_leaves
+                    if parent.segment:
+                        mixed |= any(
+                            name in SHIFTING_DIMENSIONS
+                            for name in (*parent.segment, self.dimensions[d])
+                        )
+                        mixed |= _siblings_moved(
+                            totals,
+                            parent.forecast,
+                            parent.actual,
+                            forecast,
+                            actual,
+                            ratio,
+                        )
+                        # the other parents: drop one of this parent's values
+                        for name in parent.segment:
+                            other = self._matching(
+                                {k: v for k, v in parent.segment.items() if k != name}
+                            )
+                            other_codes = self.codes[other, d]
+                            redundant |= (
+                                np.bincount(other_codes, minlength=n_values)
+                                == leaf_counts
+                            )
+                            mixed |= _siblings_moved(
+                                totals,
+                                np.bincount(
+                                    other_codes,
+                                    weights=self.measures[other, F],
+                                    minlength=n_values,
+                                ),
+                                np.bincount(
+                                    other_codes,
+                                    weights=self.measures[other, V],
+                                    minlength=n_values,
+                                ),
+                                forecast,
+                                actual,
+                                ratio,
+                            )
+                        score = np.where(mixed, np.minimum(score, parent.score), score)
+                    baseline_value, current_value = self._metric_values(sums)
+
+                    keep = (leaf_counts > 0) & ~redundant & (support >= min_support)
+                    for value in np.flatnonzero(keep):
+                        segment = {
+                            **parent.segment,
+                            self.dimensions[d]: self.values[d][value],
+                        }
+                        if (
+                            not mixed[value]
+                            and explanatory_power[value] > 0
+                            and score[value] > 0
+                            and surprise[value] >= min_surprise
+                        ):
+                            base = baseline_value[value]
+                            candidates.append(
+                                RootCauseSegment(
+                                    segment=segment,
+                                    baseline_value=base,
+                                    current_value=current_value[value],
+                                    pct_change=(current_value[value] - base) / base
+                                    if base
+                                    else 0.0,
+                                    explanatory_power=explanatory_power[value],
+                                    surprise=surprise[value],
+                                    support=support[value],
+                                    score=score[value],
+                                )
+                            )
+                        children.append(
+                            _Cell(
+                                segment,
+                                mask,
+                                d,
+                                int(value),
+                                int(leaf_counts[value]),
+                                score[value],
+                                forecast[value],
+                                actual[value],
+                            )
+                        )
+            if truncated or not children:
+                break
+            frontier = sorted(children, key=lambda cell: -cell.score)[:beam_width]
+
+        candidates.sort(key=lambda c: (-c.score, -c.explanatory_power, len(c.segment)))
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Root-cause search evaluated {cells_evaluated} cells in {elapsed:.3f}s"
+            + (" (time budget exhausted)" if truncated else "")
+        )
+        return RootCauseAnalysis(
+            segments=candidates[:top_k],
+            cells_evaluated=cells_evaluated,
+            truncated=truncated,
+            elapsed_seconds=elapsed,
+        )
@@ -0,0 +1,129 @@
+import math
+import sqlite3
+from collections import Counter, defaultdict
+from collections.abc import Hashable, Iterable
+from dataclasses import dataclass
+
+from scipy import stats
+
+from metric_anomaly_investigator.mock_warehouse.hyperloglog import hash_user_ids
+
+# Users are hashed into SAMPLE_BUCKETS buckets once (user_profiles.sample_bucket);
+# a sampling rate r keeps the users in buckets [0, r * SAMPLE_BUCKETS), so the
+# sample is the same on every query and a 1% sample is contained in the 5% one.
+SAMPLE_BUCKETS = 10_000
+# user_profiles rows bucketed per batch, so the migration's memory doesn't
+# grow with the number of users
+ASSIGN_BATCH_SIZE = 50_000
+CONFIDENCE_LEVEL = 0.95
+Z_SCORE = float(stats.norm.ppf(0.5 + CONFIDENCE_LEVEL / 2))
+
+
+def sample_buckets(user_ids: Iterable[str]) -> list[int]:
+    """Stable sample bucket of each user id (independent of PYTHONHASHSEED)."""
+    return (hash_user_ids(user_ids) % SAMPLE_BUCKETS).tolist()
+
+
+def assign_sample_buckets(conn: sqlite3.Connection) -> None:
+    last_rowid = -1
+    while rows := conn.execute(
+        "SELECT rowid, user_id FROM user_profiles WHERE rowid > ? "
+        "ORDER BY rowid LIMIT ?",
+        (last_rowid, ASSIGN_BATCH_SIZE),
+    ).fetchall():
+        buckets = sample_buckets(user_id for _, user_id in rows)
+        conn.executemany(
+            "UPDATE user_profiles SET sample_bucket = ? WHERE rowid = ?",
+            zip(buckets, (rowid for rowid, _ in rows)),
+        )
+        last_rowid = rows[-1][0]
+
+
+def sample_threshold(sampling_rate: float) -> int:
+    """Users with sample_bucket below this are in the `sampling_rate` sample."""
+    if not 0.0 < sampling_rate <= 1.0:
+        raise ValueError(f"sampling_rate must be in (0, 1], got {sampling_rate}")
+    return max(1, round(sampling_rate * SAMPLE_BUCKETS))
+
+
+@dataclass
+class SampleEstimate:
+    """
+    Estimate from a Bernoulli user sample that kept a `fraction` of all users.
+
+    `influence` holds each sampled user's contribution to the (linearized)
+    estimate; the Horvitz-Thompson variance is (1 - f) / f^2 * sum(influence^2).
+    Estimates sharing users (e.g. two periods of one segment) combine exactly
+    through their influence values, covariance included.
+    """
+
+    value: float
+    fraction: float
+    influence: dict[str, float]
+    buckets: int = 0
+
+    @property
+    def stderr(self) -> float:
+        total = sum(v * v for v in self.influence.values())
+        return math.sqrt((1.0 - self.fraction) * total) / self.fraction
+
+    def interval(self, lower_bound: float | None = None) -> tuple[float, float]:
+        """CONFIDENCE_LEVEL normal-approximation interval around the estimate."""
+        margin = Z_SCORE * self.stderr
+        low = self.value - margin
+        if lower_bound is not None:
+            low = max(low, lower_bound)
+        return low, self.value + margin
+
+
+def estimate_mean(
+    metric_name: str, rows: list[tuple[Hashable, str, int]], fraction: float
+) -> SampleEstimate:
+    """
+    Average of the metric over the day (week) buckets present in `rows`,
+    (bucket, user_id, events) rows of the sampled users.
+
+    - dau / wau: the active users of a bucket scaled up by 1 / fraction
+    - events_per_user: the sample's events over users, which needs no scaling
+    """
+    users: Counter = Counter()
+    events: Counter = Counter()
+    for bucket, _, n in rows:
+        users[bucket] += 1
+        events[bucket] += n
+    buckets = len(users)
+    influence: dict[str, float] = defaultdict(float)
+    if buckets == 0:
+        return SampleEstimate(0.0, fraction, {}, 0)
+
+    if metric_name == "events_per_user":
+        ratios = {bucket: events[bucket] / users[bucket] for bucket in users}
+        value = sum(ratios.values()) / buckets
+        for bucket, user_id, n in rows:
+            # linearized ratio: (e - R * a) / (estimated active users)
+            influence[user_id] += (
+                (n - ratios[bucket]) * fraction / (users[bucket] * buckets)
+            )
+    else:
+        value = sum(users.values()) / (fraction * buckets)
+        for _, user_id, _ in rows:
+            influence[user_id] += 1.0 / buckets
+    return SampleEstimate(value, fraction, dict(influence), buckets)
+
+
+def relative_change(
+    current: SampleEstimate, baseline: SampleEstimate
+) -> SampleEstimate:
+    """(current - baseline) / baseline, with the influence of the ratio."""
+    if baseline.value == 0:
+        return SampleEstimate(0.0, current.fraction, {}, current.buckets)
+    ratio = current.value / baseline.value
+    influence = {
+        user_id: (
+            current.influence.get(user_id, 0.0)
+            - ratio * baseline.influence.get(user_id, 0.0)
+        )
+        / baseline.value
+        for user_id in current.influence.keys() | baseline.influence.keys()
+    }
+    return SampleEstimate(ratio - 1.0, current.fraction, influence, current.buckets)
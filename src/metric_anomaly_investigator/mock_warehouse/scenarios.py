@@ -0,0 +1,235 @@
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+
+# ANOMALY: Android users in India are all on v2.3.0 from Jan 28, and 60% of
+# them drop out each day (simulates crash/poor UX)
+ANOMALY_START = datetime(2026, 1, 28)
+ANOMALY_PLATFORM = "android"
+ANOMALY_COUNTRY = "IN"
+ANOMALY_VERSION = "2.3.0"
+ANOMALY_DROPOUT_RATE = 0.60
+
+# user_profiles column behind each segment key an incident can target
+SEGMENT_COLUMNS = {"platform": "signup_platform", "country": "signup_country"}
+
+
+@dataclass(frozen=True)
+class Incident:
+    """
+    One planted anomaly: from `start` (until `end`, if set) a share of the
+    users in `segment` drops out each day.
+
+    - ramp_days: 0 applies `dropout_rate` from day one (a step change);
+      otherwise the rate grows linearly and reaches it after `ramp_days`
+      days (a gradual decay)
+    - app_version: version the affected users are moved to
+    - rollout_percentage: share of the segment affected, picked per user
+    - deployment_id: when set, the incident ships as this release in the
+      deployments table, at `deployed_at` (default: `start`) to `regions`
+    """
+
+    name: str
+    start: datetime
+    segment: dict[str, str]
+    dropout_rate: float
+    ramp_days: int = 0
+    end: datetime | None = None
+    app_version: str | None = None
+    rollout_percentage: float = 1.0
+    deployment_id: str | None = None
+    deployed_at: datetime | None = None
+    regions: str = "all"
+
+    def __post_init__(self):
+        unknown = set(self.segment) - set(SEGMENT_COLUMNS)
+        if unknown:
+            raise ValueError(
+                f"Unsupported segment keys: {sorted(unknown)}. "
+                f"Supported: {sorted(SEGMENT_COLUMNS)}"
+            )
+        if not 0.0 < self.rollout_percentage <= 1.0:
+            raise ValueError(
+                f"rollout_percentage must be in (0, 1], got {self.rollout_percentage}"
+            )
+
+    @property
+    def kind(self) -> str:
+        return "gradual" if self.ramp_days else "step"
+
+    @property
+    def affected_metrics(self) -> list[str]:
+        """
+        Metrics the incident moves. A dropout removes whole user-days, so it
+        shows in dau and wau; events_per_user only averages over the users
+        still active, so it stays put.
+        """
+        return ["dau", "wau"] if self.dropout_rate > 0 else []
+
+    def dropout_rate_on(self, day: datetime) -> float:
+        """Dropout rate for affected users on `day` (0 when inactive)."""
+        if day < self.start or (self.end is not None and day > self.end):
+            return 0.0
+        if not self.ramp_days:
+            return self.dropout_rate
+        days_in = (day - self.start).days + 1
+        return self.dropout_rate * min(days_in / self.ramp_days, 1.0)
+
+    def affected_users(
+        self, users: dict[str, np.ndarray], rollout_draw: np.ndarray
+    ) -> np.ndarray:
+        """Mask of the users (in users_df order) this incident applies to."""
+        mask = rollout_draw < self.rollout_percentage
+        for key, value in self.segment.items():
+            mask &= users[key] == value
+        return mask
+
+    def deployment(self) -> dict | None:
+        if self.deployment_id is None:
+            return None
+        return {
+            "deployment_id": self.deployment_id,
+            "deployment_date": self.deployed_at or self.start,
+            "app_version": self.app_version,
+            "platform": self.segment.get("platform", "all"),
+            "rollout_percentage": self.rollout_percentage,
+            "regions": self.regions,
+            "deployment_type": "app_release",
+        }
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    description: str
+    incidents: tuple[Incident, ...] = field(default_factory=tuple)
+
+
+ANDROID_IN_DROPOUT = Incident(
+    name="android_in_crash",
+    start=ANOMALY_START,
+    segment={"platform": ANOMALY_PLATFORM, "country": ANOMALY_COUNTRY},
+    dropout_rate=ANOMALY_DROPOUT_RATE,
+    app_version=ANOMALY_VERSION,
+    deployment_id="deploy_003",
+    deployed_at=datetime(2026, 1, 28, 9, 0),
+    regions=json.dumps(["IN", "BR"]),  # Rolled out to India and Brazil
+)
+
+SCENARIOS: dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario(
+            name="android_in_dropout",
+            description="Android v2.3.0 crashes for users in India from Jan 28",
+            incidents=(ANDROID_IN_DROPOUT,),
+        ),
+        Scenario(
+            name="no_anomaly",
+            description="Control dataset: seasonality only, no incidents",
+        ),
+        Scenario(
+            name="gradual_decay",
+            description="iOS engagement in the US decays over five days, no release",
+            incidents=(
+                Incident(
+                    name="ios_us_decay",
+                    start=datetime(2026, 1, 27),
+                    segment={"platform": "ios", "country": "US"},
+                    dropout_rate=0.40,
+                    ramp_days=5,
+                ),
+            ),
+        ),
+        Scenario(
+            name="partial_rollout",
+            description="Android v2.4.0 reaches 30% of Brazil and breaks for them",
+            incidents=(
+                Incident(
+                    name="android_br_partial_rollout",
+                    start=datetime(2026, 1, 29),
+                    segment={"platform": "android", "country": "BR"},
+                    dropout_rate=0.70,
+                    app_version="2.4.0",
+                    rollout_percentage=0.30,
+                    deployment_id="deploy_005",
+                    deployed_at=datetime(2026, 1, 29, 9, 0),
+                    regions=json.dumps(["BR"]),
+                ),
+            ),
+        ),
+        Scenario(
+            name="overlapping_incidents",
+            description=(
+                "The Android/India crash, a web decay in Germany and an iOS "
+                "partial rollout in the UK, overlapping in time"
+            ),
+            incidents=(
+                ANDROID_IN_DROPOUT,
+                Incident(
+                    name="web_de_decay",
+                    start=datetime(2026, 1, 27),
+                    segment={"platform": "web", "country": "DE"},
+                    dropout_rate=0.50,
+                    ramp_days=4,
+                ),
+                Incident(
+                    name="ios_uk_partial_rollout",
+                    start=datetime(2026, 1, 30),
+                    segment={"platform": "ios", "country": "UK"},
+                    dropout_rate=0.50,
+                    app_version="2.4.0",
+                    rollout_percentage=0.50,
+                    deployment_id="deploy_005",
+                    deployed_at=datetime(2026, 1, 30, 11, 0),
+                    regions=json.dumps(["UK"]),
+                ),
+            ),
+        ),
+    ]
+}
+DEFAULT_SCENARIO = SCENARIOS["android_in_dropout"]
+
+
+def get_scenario(name: str) -> Scenario:
+    if name not in SCENARIOS:
+        raise ValueError(f"Unknown scenario: {name}. Available: {sorted(SCENARIOS)}")
+    return SCENARIOS[name]
+
+
+def build_manifest(
+    scenario: Scenario,
+    n_users: int,
+    start_date: datetime,
+    end_date: datetime,
+    seed: int | None,
+    scale_factor: float | None = None,
+) -> dict:
+    """Ground truth of a generated dataset: what was planted, where and when."""
+    return {
+        "scenario": scenario.name,
+        "description": scenario.description,
+        "seed": seed,
+        "scale_factor": scale_factor,
+        "n_users": n_users,
+        "start_date": start_date.date().isoformat(),
+        "end_date": end_date.date().isoformat(),
+        "incidents": [
+            {
+                "name": incident.name,
+                "kind": incident.kind,
+                "segment": incident.segment,
+                "start_date": incident.start.date().isoformat(),
+                "end_date": incident.end.date().isoformat() if incident.end else None,
+                "dropout_rate": incident.dropout_rate,
+                "ramp_days": incident.ramp_days,
+                "rollout_percentage": incident.rollout_percentage,
+                "app_version": incident.app_version,
+                "deployment_id": incident.deployment_id,
+                "affected_metrics": incident.affected_metrics,
+            }
+            for incident in scenario.incidents
+        ],
+    }
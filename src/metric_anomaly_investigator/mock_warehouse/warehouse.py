@@ -1,5 +1,13 @@
-from datetime import datetime
-from sqlite3 import connect
+import contextvars
+import copy
+import logging
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import Any, Tuple, Literal
 
 from scipy import stats
@@ -8,81 +16,252 @@ from metric_anomaly_investigator.schemas import (
     MetricDataPoint,
     DimensionalBreakdown,
     Deployment,
+    RootCauseAnalysis,
+)
+from metric_anomaly_investigator.mock_warehouse.bitmap_index import BitmapIndex
+from metric_anomaly_investigator.mock_warehouse.connection_pool import ConnectionPool
+from metric_anomaly_investigator.mock_warehouse.hot_copy import HotCopy, load_hot_copy
+from metric_anomaly_investigator.mock_warehouse.instrumentation import QueryProfiler
+from metric_anomaly_investigator.mock_warehouse.migrations import (
+    migrate,
+    require_latest_schema,
+)
+from metric_anomaly_investigator.mock_warehouse.partial_cache import (
+    PartialAggregateCache,
+)
+from metric_anomaly_investigator.mock_warehouse.partitions import PartitionCatalog
+from metric_anomaly_investigator.mock_warehouse.query_compiler import (
+    ALLOWED_COLUMNS,
+    SUPPORTED_METRICS,
+    bucket_sql,
+    cohort_filter_params,
+    cohort_size_query,
+    deployments_query,
+    filter_params,
+    metric_query,
+    retention_query,
+    sample_query,
+    validate_columns,
+)
+from metric_anomaly_investigator.mock_warehouse.query_cache import (
+    QueryCache,
+    canonical_query_key,
+)
+from metric_anomaly_investigator.mock_warehouse.root_cause import (
+    MIN_SUPPORT,
+    MIN_SURPRISE,
+    ROOT_CAUSE_DIMENSIONS,
+    LeafTable,
+)
+from metric_anomaly_investigator.mock_warehouse.rollup import RollupCube, ensure_rollup
+from metric_anomaly_investigator.mock_warehouse.sampling import (
+    SampleEstimate,
+    estimate_mean,
+    relative_change,
+    sample_threshold,
 )
 from metric_anomaly_investigator.settings import settings
 
-SUPPORTED_METRICS = Literal["dau", "wau", "events_per_user"]
-ALLOWED_COLUMNS = ["platform", "country", "device_type", "app_version", "event_type"]
+logger = logging.getLogger(__name__)
+
+# exact: COUNT(DISTINCT user_id) over event_stream
+# hll: merge HyperLogLog sketches from the event_rollup cube (approximate)
+# bitmap: popcount over an in-process bitmap index of daily active users (exact)
+DistinctCountMode = Literal["exact", "hll", "bitmap"]
 MIN_DROP_THRESHOLD = 0.10  # 10%
 
 
 class MockDataWarehouse:
-    def __init__(self, db_path: str = settings.DB_URL):
+    def __init__(
+        self,
+        db_path: str = settings.DB_URL,
+        pool_size: int = settings.DB_POOL_SIZE,
+        auto_migrate: bool = False,
+        distinct_mode: DistinctCountMode = settings.DISTINCT_COUNT_MODE,
+        cache_max_entries: int = settings.QUERY_CACHE_MAX_ENTRIES,
+        cache_max_bytes: int = settings.QUERY_CACHE_MAX_BYTES,
+        partial_cache_max_shapes: int = settings.PARTIAL_CACHE_MAX_SHAPES,
+        in_memory: bool = settings.DB_IN_MEMORY,
+    ):
         self.db_path = db_path
+        self.distinct_mode = distinct_mode
+        db_exists = os.path.exists(db_path)
+        # migrations rewrite the file (migration 3 drops the event_stream
+        # table), so they only run when asked for; otherwise an old schema
+        # is rejected here rather than failing on the first query
+        if not db_exists:
+            logger.warning(f"Database {db_path} not found, skipping migrations")
+        elif auto_migrate:
+            migrate(db_path)
+        else:
+            require_latest_schema(db_path)
+        # the rollup is written to the file, so build it before any hot copy
+        if distinct_mode == "hll" and db_exists:
+            ensure_rollup(db_path)
 
-    def _build_query(
-        self,
-        metric_name: str,
-        time_range: Tuple[str, str],
-        dimensions: list[str],
-        filters: dict[str, str],
-    ) -> str:
-        start_date, end_date = time_range
-        params = [start_date, end_date]
+        # in_memory: serve every read from a RAM copy of the file, taken once
+        self.hot_copy: HotCopy | None = None
+        if in_memory and db_exists:
+            self.hot_copy = load_hot_copy(db_path)
+            self._pool = ConnectionPool(
+                self.hot_copy.uri,
+                size=pool_size,
+                timeout=settings.DB_POOL_TIMEOUT,
+                uri=True,
+            )
+        else:
+            self._pool = ConnectionPool(
+                db_path, size=pool_size, timeout=settings.DB_POOL_TIMEOUT
+            )
+        self.profiler = QueryProfiler()
+        self._partitions = PartitionCatalog(partitioned=False)
+        if db_exists:
+            with self._pool.connection() as conn:
+                self._partitions = PartitionCatalog.load(conn)
+        # scans of several event_stream partitions run concurrently, each on
+        # its own pooled connection (sqlite3 releases the GIL while stepping)
+        self._scan_executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="partition-scan"
+        )
 
-        dims_for_select = ""
-        dims_for_groupby = ""
+        self._rollup: RollupCube | None = None
+        if distinct_mode == "hll":
+            self._rollup = RollupCube(self._pool, self.profiler)
 
-        if dimensions:
-            dims_for_select = ", " + ", ".join(dimensions)
-            dims_for_groupby = ", " + ", ".join(dimensions)
+        # Dedicated connection for PRAGMA data_version: the counter is per
+        # connection, so it has to be read from the same one every time.
+        self._version_conn: sqlite3.Connection | None = None
+        self._version_lock = threading.Lock()
 
-        filter_clauses = ""
-        if filters:
-            for col, val in filters.items():
-                filter_clauses += f" AND {col} = ?"
-                params.append(val)
+        self._bitmap_index: BitmapIndex | None = None
+        self._bitmap_lock = threading.Lock()
+        if distinct_mode == "bitmap" and db_exists:
+            self._bitmap_index = BitmapIndex.build(self._pool, self._data_fingerprint())
+        self.cache: QueryCache | None = None
+        if cache_max_entries > 0:
+            self.cache = QueryCache(
+                max_entries=cache_max_entries,
+                max_bytes=cache_max_bytes,
+                data_fingerprint=self._data_fingerprint,
+            )
+        self.partial_cache: PartialAggregateCache | None = None
+        if partial_cache_max_shapes > 0:
+            self.partial_cache = PartialAggregateCache(
+                max_shapes=partial_cache_max_shapes,
+                data_fingerprint=self._data_fingerprint,
+            )
 
-        match metric_name:
-            case "dau":
-                query = f"""
-                    SELECT DATE(event_timestamp) as date,
-                    COUNT(DISTINCT user_id) as value
-                    {dims_for_select}
-                    FROM event_stream
-                    WHERE DATE(event_timestamp) >= ? AND DATE(event_timestamp) <= ?
-                    {filter_clauses}
-                    GROUP BY DATE(event_timestamp) {dims_for_groupby}
-                    ORDER BY DATE(event_timestamp)
-                    """
-            case "wau":
-                query = f"""
-                    SELECT STRFTIME('%Y-%W', event_timestamp) as week,
-                    COUNT(DISTINCT user_id) as value
-                    {dims_for_select}
-                    FROM event_stream
-                    WHERE DATE(event_timestamp) >= ? AND DATE(event_timestamp) <= ?
-                    {filter_clauses}
-                    GROUP BY STRFTIME('%Y-%W', event_timestamp) {dims_for_groupby}
-                    ORDER BY week
-                    """
-            case "events_per_user":
-                query = f"""
-                    SELECT DATE(event_timestamp) as date,
-                    CAST(COUNT(*) AS FLOAT) / NULLIF(COUNT(DISTINCT user_id), 0) as value
-                    {dims_for_select}
-                    FROM event_stream
-                    WHERE DATE(event_timestamp) >= ? AND DATE(event_timestamp) <= ?
-                    {filter_clauses}
-                    GROUP BY DATE(event_timestamp) {dims_for_groupby}
-                    ORDER BY DATE(event_timestamp)
-                    """
-            case _:
-                raise ValueError(
-                    f"Unsupported metric: {metric_name}. Supported: {SUPPORTED_METRICS}"
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._scan_executor.shutdown()
+        self._pool.close()
+        if self.hot_copy is not None:
+            self.hot_copy.close()
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
+
+    def _data_fingerprint(self) -> tuple:
+        """Changes whenever the database file or its committed data changes."""
+        if self.hot_copy is not None:
+            # a snapshot: later writes to the file never reach it
+            return (self.hot_copy.uri,)
+        file_stats = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                file_stats.append(None)
+            else:
+                file_stats.append((stat.st_mtime_ns, stat.st_size))
+        if file_stats[0] is None:
+            return tuple(file_stats)
+
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = sqlite3.connect(
+                    self.db_path, check_same_thread=False
                 )
+            data_version = self._version_conn.execute("PRAGMA data_version").fetchone()[
+                0
+            ]
+        return (*file_stats, data_version)
 
-        return query, params
+    def _cached(self, key: tuple, compute):
+        if self.cache is None:
+            return compute()
+        # shallow copy so callers can't reorder or extend the cached container
+        return copy.copy(self.cache.get_or_compute(key, compute))
+
+    def __enter__(self) -> "MockDataWarehouse":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _fetchall(self, query: str, params: list) -> tuple[list[str], list[tuple]]:
+        with self._pool.connection() as conn:
+            return self.profiler.fetchall(conn, query, params)
+
+    def _fetchone(self, query: str, params: list) -> tuple | None:
+        _, rows = self._fetchall(query, params)
+        return rows[0] if rows else None
+
+    def _scan_partitions(
+        self,
+        time_ranges: list[Tuple[str, str]] | None,
+        build_query: Callable[[str], tuple[str, list]],
+    ) -> list[tuple[list[str], list[tuple]]]:
+        """
+        Run `build_query(table)` on every event_stream partition overlapping
+        `time_ranges` (all partitions for None) and return each partition's
+        (columns, rows), oldest partition first.
+        """
+        with self._pool.connection() as conn:
+            tables = self._partitions.tables_for(conn, time_ranges)
+        if len(tables) == 1:
+            return [self._fetchall(*build_query(tables[0]))]
+        # each scan runs in a copy of this context, so the profiler records
+        # its queries with the caller's
+        futures = [
+            self._scan_executor.submit(
+                contextvars.copy_context().run,
+                lambda table=table: self._fetchall(*build_query(table)),
+            )
+            for table in tables
+        ]
+        return [future.result() for future in futures]
+
+    def _scan_rows(
+        self,
+        time_ranges: list[Tuple[str, str]] | None,
+        build_query: Callable[[str], tuple[str, list]],
+    ) -> tuple[list[str], list[tuple]]:
+        """
+        _scan_partitions for queries whose groups never span partitions (day
+        or week buckets): the partitions' rows are simply concatenated.
+        """
+        cols: list[str] = []
+        rows: list[tuple] = []
+        for partition_cols, partition_rows in self._scan_partitions(
+            time_ranges, build_query
+        ):
+            cols = cols or partition_cols
+            rows.extend(partition_rows)
+        return cols, rows
+
+    def _build_query(
+        self,
+        metric_name: str,
+        time_range: Tuple[str, str],
+        dimensions: list[str],
+        filters: dict[str, str],
+        table: str = "event_stream",
+    ) -> tuple[str, list]:
+        filter_columns, filter_values = filter_params(filters)
+        query = metric_query(metric_name, tuple(dimensions), filter_columns, table)
+        return query, [*time_range, *filter_values]
 
     def _parse_timestamp(
         self, metric_name: SUPPORTED_METRICS, row_dict: dict
@@ -106,6 +285,8 @@ class MockDataWarehouse:
         time_range: Tuple[str, str],
         dimensions: list[str] | None = [],
         filters: dict[str, str] | None = {},
+        approximate: bool = False,
+        sampling_rate: float = settings.APPROXIMATE_SAMPLING_RATE,
     ) -> list[MetricDataPoint]:
         """
         Query aggregated metric over time
@@ -115,27 +296,67 @@ class MockDataWarehouse:
             time_range: ('2026-01-25', '2026-02-01')
             dimensions: ['platform', 'country'] - group by these
             filters: {'platform': 'android'} - filter rows
+            approximate: estimate from a stable `sampling_rate` user sample,
+                with confidence intervals, instead of reading every user
 
         Returns:
             list of MetricDataPoint with values over time
         """
         # strategy:
-        # TODO - validate inputs
-        # TODO - check for column validation
-        # build query + execute
+        # compile the query shape (validates metric and columns, cached)
+        # execute
         # parse results
 
-        query, params = self._build_query(metric_name, time_range, dimensions, filters)
+        dimensions = dimensions or []
+        filters = filters or {}
+        if approximate:
+            return self._to_metric_points(
+                metric_name,
+                dimensions,
+                self._sampled_metric_rows(
+                    metric_name, time_range, dimensions, filters, sampling_rate
+                ),
+            )
+        key = canonical_query_key(
+            "query_metric",
+            metric_name=metric_name,
+            time_range=tuple(time_range),
+            dimensions=dimensions,
+            filters=filters,
+        )
+        return self._cached(
+            key,
+            lambda: self._to_metric_points(
+                metric_name,
+                dimensions,
+                self._assemble_metric_rows(
+                    metric_name, time_range, dimensions, filters
+                ),
+            ),
+        )
 
-        with connect(self.db_path) as conn:
-            cursor = conn.execute(query, params)
-            cols = [d[0] for d in cursor.description]
-            rows = cursor.fetchall()
+    def _assemble_metric_rows(
+        self,
+        metric_name: str,
+        time_range: Tuple[str, str],
+        dimensions: list[str],
+        filters: dict[str, str],
+    ) -> list[dict]:
+        def fetch(sub_range: Tuple[str, str]) -> list[dict]:
+            return self._query_metric_rows(metric_name, sub_range, dimensions, filters)
+
+        if self.partial_cache is None:
+            return fetch(time_range)
+        return self.partial_cache.assemble(
+            metric_name, tuple(time_range), dimensions, filters, fetch
+        )
 
+    def _to_metric_points(
+        self, metric_name: str, dimensions: list[str], rows: list[dict]
+    ) -> list[MetricDataPoint]:
         # parse results into MetricDataPoint list
         results = []
-        for row in rows:
-            row_dict = dict(zip(cols, row))
+        for row_dict in rows:
             dim_values = {}
             if dimensions:
                 for dim in dimensions:
@@ -146,62 +367,385 @@ class MockDataWarehouse:
                     timestamp=self._parse_timestamp(metric_name, row_dict),
                     value=float(row_dict["value"]),
                     dimensions=dim_values,
+                    confidence_interval=row_dict.get("confidence_interval"),
                 )
             )
 
         return results
 
-    def _aggregate_metric_by_dimension(
+    def _query_metric_rows(
         self,
-        metric_data: list[MetricDataPoint],
-        dimension: str,
-    ) -> dict[str, list[float]]:
-        agg: dict[str, list[float]] = {}
-        for point in metric_data:
-            dim_value = point.dimensions.get(dimension, "unknown")
-            if dim_value not in agg:
-                agg[dim_value] = [0.0, 0]  # sum, count
-            agg[dim_value][0] += point.value
-            agg[dim_value][1] += 1
-        return agg
+        metric_name: str,
+        time_range: Tuple[str, str],
+        dimensions: list[str],
+        filters: dict[str, str],
+    ) -> list[dict]:
+        if self._rollup is not None and self._rollup.supports(dimensions, filters):
+            return self._rollup.query(metric_name, time_range, dimensions, filters)
+        bitmap_index = self._current_bitmap_index()
+        if (
+            bitmap_index is not None
+            and bitmap_index.supports(metric_name, dimensions, filters)
+            and bitmap_index.covers(time_range)
+        ):
+            return bitmap_index.query(metric_name, time_range, dimensions, filters)
 
-    def get_dimensional_breakdown(
+        # every day and week bucket lives in a single weekly partition
+        cols, rows = self._scan_rows(
+            [tuple(time_range)],
+            lambda table: self._build_query(
+                metric_name, time_range, dimensions, filters, table
+            ),
+        )
+        return [dict(zip(cols, row)) for row in rows]
+
+    def _current_bitmap_index(self) -> BitmapIndex | None:
+        """
+        The bitmap index, dropped once the data it was built from changes:
+        queries then go to SQL instead of answering from a stale snapshot.
+        """
+        with self._bitmap_lock:
+            index = self._bitmap_index
+            if index is not None and index.fingerprint != self._data_fingerprint():
+                logger.warning(
+                    "Data changed since the bitmap index was built, "
+                    "answering distinct counts from SQL"
+                )
+                self._bitmap_index = index = None
+            return index
+
+    def _build_sample_query(
+        self,
+        metric_name: str,
+        time_range: Tuple[str, str],
+        dimensions: list[str],
+        filters: dict[str, str],
+        threshold: int,
+        table: str = "event_stream",
+    ) -> tuple[str, list]:
+        filter_columns, filter_values = filter_params(filters)
+        query = sample_query(metric_name, tuple(dimensions), filter_columns, table)
+        return query, [*time_range, threshold, *filter_values]
+
+    def _sample_rows(
+        self,
+        metric_name: str,
+        time_range: Tuple[str, str],
+        dimensions: list[str],
+        filters: dict[str, str],
+        sampling_rate: float,
+    ) -> tuple[float, list[tuple]]:
+        """
+        Events per (bucket, *dimensions, user_id) of the users in the
+        `sampling_rate` sample, and the fraction of all users they are.
+        """
+        threshold = sample_threshold(sampling_rate)
+        # group_by, unlike dimensions, keeps its order in the key: it is the
+        # column order of the rows
+        key = canonical_query_key(
+            "sample_rows",
+            metric_name=metric_name,
+            time_range=tuple(time_range),
+            group_by=tuple(dimensions),
+            filters=filters,
+            threshold=threshold,
+        )
+        return self._cached(
+            key,
+            lambda: (
+                self._sample_fraction(threshold),
+                self._scan_rows(
+                    [tuple(time_range)],
+                    lambda table: self._build_sample_query(
+                        metric_name, time_range, dimensions, filters, threshold, table
+                    ),
+                )[1],
+            ),
+        )
+
+    def _sample_fraction(self, threshold: int) -> float:
+        sampled, total = self._fetchone(
+            "SELECT COUNT(*) FILTER (WHERE sample_bucket < ?), COUNT(*) "
+            "FROM user_profiles",
+            [threshold],
+        )
+        if not sampled:
+            raise ValueError(
+                "The sample holds no users, use a larger sampling_rate "
+                "or an exact query"
+            )
+        return sampled / total
+
+    def _sampled_metric_rows(
+        self,
+        metric_name: str,
+        time_range: Tuple[str, str],
+        dimensions: list[str],
+        filters: dict[str, str],
+        sampling_rate: float,
+    ) -> list[dict]:
+        fraction, rows = self._sample_rows(
+            metric_name, time_range, dimensions, filters, sampling_rate
+        )
+        groups: dict[tuple, list[tuple]] = defaultdict(list)
+        for bucket, *dim_values, user_id, events in rows:
+            groups[(bucket, *dim_values)].append((bucket, user_id, events))
+
+        bucket_col = "week" if metric_name == "wau" else "date"
+        results = []
+        for group in sorted(groups, key=lambda group: [str(v) for v in group]):
+            estimate = estimate_mean(metric_name, groups[group], fraction)
+            results.append(
+                {
+                    bucket_col: group[0],
+                    **dict(zip(dimensions, group[1:])),
+                    "value": estimate.value,
+                    "confidence_interval": estimate.interval(lower_bound=0.0),
+                }
+            )
+        return results
+
+    def _sampled_segment_estimates(
         self,
         metric_name: str,
         dimension: str,
         time_range: Tuple[str, str],
+        sampling_rate: float,
+    ) -> dict[str, SampleEstimate]:
+        fraction, rows = self._sample_rows(
+            metric_name, time_range, [dimension], {}, sampling_rate
+        )
+        by_segment: dict[str, list[tuple]] = defaultdict(list)
+        for bucket, segment, user_id, events in rows:
+            by_segment[str(segment)].append((bucket, user_id, events))
+        return {
+            segment: estimate_mean(metric_name, segment_rows, fraction)
+            for segment, segment_rows in by_segment.items()
+        }
+
+    def _sampled_breakdowns(
+        self,
+        metric_name: str,
+        dimensions: list[str],
+        time_range: Tuple[str, str],
         baseline_range: Tuple[str, str],
-        min_drop_threshold: float = MIN_DROP_THRESHOLD,
+        min_drop_threshold: float,
+        sampling_rate: float,
     ) -> list[DimensionalBreakdown]:
+        # _segment_breakdowns on the user sample: the same averages per
+        # segment, plus intervals. Both periods sample the same users, so the
+        # change's interval accounts for their correlation.
+        breakdowns = []
+        for dim in dimensions:
+            baseline = self._sampled_segment_estimates(
+                metric_name, dim, baseline_range, sampling_rate
+            )
+            current = self._sampled_segment_estimates(
+                metric_name, dim, time_range, sampling_rate
+            )
+            for segment, curr in current.items():
+                base = baseline.get(segment)
+                if base is None or base.value == 0:
+                    continue
+                change = relative_change(curr, base)
+                if change.value <= -min_drop_threshold:
+                    breakdowns.append(
+                        DimensionalBreakdown(
+                            dimension_name=dim,
+                            dimension_value=segment,
+                            before_value=base.value,
+                            after_value=curr.value,
+                            pct_change=change.value,
+                            sample_size=curr.buckets,
+                            before_interval=base.interval(lower_bound=0.0),
+                            after_interval=curr.interval(lower_bound=0.0),
+                            pct_change_interval=change.interval(lower_bound=-1.0),
+                        )
+                    )
+        return breakdowns
+
+    def _build_segment_query(
+        self,
+        metric_name: str,
+        dimensions: list[str],
+        periods: dict[str, Tuple[str, str]],
+        table: str = "event_stream",
+    ) -> tuple[str, list]:
+        validate_columns(dimensions)
+        bucket = bucket_sql(metric_name)
+        if metric_name == "events_per_user":
+            value_sql = "CAST(COUNT(*) AS FLOAT) / NULLIF(COUNT(DISTINCT user_id), 0)"
+        else:
+            value_sql = "COUNT(DISTINCT user_id)"
+
+        # Grouping sets emulated with one labelled branch per (period,
+        # dimension) in a single statement: each branch is the per-bucket
+        # query query_metric runs, and the outer query sums and counts the
+        # buckets per segment, which merge across partitions. Fanning each
+        # event out to every dimension (a CROSS JOIN with a CASE segment)
+        # reads event_stream once, but loses the index order and sorts every
+        # fanned-out row, which is slower in SQLite than the extra index
+        # range scans.
+        branches = []
+        params = []
+        for period, (start_date, end_date) in periods.items():
+            for dim in dimensions:
+                branches.append(
+                    f"""
+                    SELECT ? AS period,
+                    ? AS dimension,
+                    {bucket} AS bucket,
+                    {dim} AS segment,
+                    {value_sql} AS value
+                    FROM {table}
+                    WHERE event_date >= ? AND event_date <= ?
+                    GROUP BY bucket, segment
+                    """
+                )
+                params.extend([period, dim, start_date, end_date])
+        query = f"""
+            WITH buckets AS ({" UNION ALL ".join(branches)})
+            SELECT period, dimension, segment,
+            SUM(value) AS total_value,
+            COUNT(*) AS sample_size,
+            MIN(bucket) AS first_bucket
+            FROM buckets
+            GROUP BY period, dimension, segment
+            """
+        return query, params
+
+    def _segment_periods(
+        self,
+        metric_name: str,
+        dimensions: list[str],
+        periods: dict[str, Tuple[str, str]],
+    ) -> list[dict]:
         """
-        Compares two time periods baseline vs current across a dimension.
-        Useful guide: https://dashthis.com/blog/metrics-and-dimensions/#metrics-vs-dimensions
+        Per period, dimension and dimension value: the average of the metric
+        over its day (week for wau) buckets and the number of buckets averaged.
+
+        Within a period and dimension, rows are ordered by the first bucket
+        each segment appears in.
         """
+        engine_dims = [
+            dim
+            for dim in dimensions
+            if (self._rollup is not None and self._rollup.supports([dim], {}))
+            or (
+                self._bitmap_index is not None
+                and self._bitmap_index.supports(metric_name, [dim], {})
+            )
+        ]
+        sql_dims = [dim for dim in dimensions if dim not in engine_dims]
+
+        results = self._segment_periods_from_buckets(metric_name, engine_dims, periods)
+        if sql_dims:
+            # merge each segment's bucket sums and counts across partitions
+            merged: dict[tuple, list] = {}
+            for _, rows in self._scan_partitions(
+                list(periods.values()),
+                lambda table: self._build_segment_query(
+                    metric_name, sql_dims, periods, table
+                ),
+            ):
+                for period, dimension, segment, total, count, first_bucket in rows:
+                    key = (period, dimension, segment)
+                    if key not in merged:
+                        merged[key] = [total, count, first_bucket]
+                    else:
+                        merged[key][0] += total
+                        merged[key][1] += count
+                        merged[key][2] = min(merged[key][2], first_bucket)
+            ordered = sorted(
+                merged.items(),
+                key=lambda item: (
+                    item[0][0],
+                    item[0][1],
+                    item[1][2],
+                    item[0][2] is not None,  # NULL segments first, as in SQL
+                    str(item[0][2]),
+                ),
+            )
+            results.extend(
+                {
+                    "period": period,
+                    "dimension": dimension,
+                    "segment": str(segment),
+                    "avg_value": total / count,
+                    "sample_size": count,
+                }
+                for (period, dimension, segment), (total, count, _) in ordered
+            )
+        return results
+
+    def _segment_periods_from_buckets(
+        self,
+        metric_name: str,
+        dimensions: list[str],
+        periods: dict[str, Tuple[str, str]],
+    ) -> list[dict]:
+        # for engines that don't run SQL over event_stream: average the
+        # per-bucket rows they return
+        results = []
+        for period, time_range in periods.items():
+            for dim in dimensions:
+                rows = self._assemble_metric_rows(metric_name, time_range, [dim], {})
+                results.extend(self._average_buckets(period, dim, rows))
+        return results
+
+    @staticmethod
+    def _average_buckets(period: str, dimension: str, rows: list[dict]) -> list[dict]:
+        agg: dict[str, list[float]] = {}
+        for row_dict in rows:
+            totals = agg.setdefault(str(row_dict.get(dimension, "")), [0.0, 0])
+            totals[0] += float(row_dict["value"])
+            totals[1] += 1
+        return [
+            {
+                "period": period,
+                "dimension": dimension,
+                "segment": segment,
+                "avg_value": total / count,
+                "sample_size": count,
+            }
+            for segment, (total, count) in agg.items()
+        ]
+
+    def _segment_breakdowns(
+        self,
+        metric_name: str,
+        dimensions: list[str],
+        time_range: Tuple[str, str],
+        baseline_range: Tuple[str, str],
+        min_drop_threshold: float,
+    ) -> list[DimensionalBreakdown]:
         # strategy:
-        # get metric per dimension -> baseline
-        # get metric per dimension -> current period
+        # average metric per dimension value for both periods in one query
         # calculate percentage change
         # filter by min_drop_threshold
 
-        baseline = self.query_metric(
+        periods = {"baseline": tuple(baseline_range), "current": tuple(time_range)}
+        key = canonical_query_key(
+            "segment_periods",
             metric_name=metric_name,
-            time_range=baseline_range,
-            dimensions=[dimension],
+            dimensions=dimensions,
+            periods=tuple(periods.items()),
         )
-        current = self.query_metric(
-            metric_name=metric_name,
-            time_range=time_range,
-            dimensions=[dimension],
+        rows = self._cached(
+            key, lambda: self._segment_periods(metric_name, dimensions, periods)
         )
-
-        baseline_agg = self._aggregate_metric_by_dimension(baseline, dimension)
-        current_agg = self._aggregate_metric_by_dimension(current, dimension)
+        baseline_avg = {
+            (row["dimension"], row["segment"]): row["avg_value"]
+            for row in rows
+            if row["period"] == "baseline"
+        }
 
         breakdowns = []
-        for dim_value, (curr_sum, curr_count) in current_agg.items():
-            curr_avg = curr_sum / curr_count if curr_count > 0 else 0.0
-            base_sum, base_count = baseline_agg.get(dim_value, [0.0, 0])
-            base_avg = base_sum / base_count if base_count > 0 else 0.0
+        for row in rows:
+            if row["period"] != "current":
+                continue
+            curr_avg = row["avg_value"]
+            base_avg = baseline_avg.get((row["dimension"], row["segment"]), 0.0)
 
             if base_avg == 0:
                 pct_change = 0.0
@@ -211,41 +755,180 @@ class MockDataWarehouse:
             if pct_change <= -min_drop_threshold:
                 breakdowns.append(
                     DimensionalBreakdown(
-                        dimension_name=dimension,
-                        dimension_value=dim_value,
+                        dimension_name=row["dimension"],
+                        dimension_value=row["segment"],
                         before_value=base_avg,
                         after_value=curr_avg,
                         pct_change=pct_change,
-                        sample_size=curr_count,
+                        sample_size=row["sample_size"],
                     )
                 )
         return breakdowns
 
+    def get_dimensional_breakdown(
+        self,
+        metric_name: str,
+        dimension: str,
+        time_range: Tuple[str, str],
+        baseline_range: Tuple[str, str],
+        min_drop_threshold: float = MIN_DROP_THRESHOLD,
+        approximate: bool = False,
+        sampling_rate: float = settings.APPROXIMATE_SAMPLING_RATE,
+    ) -> list[DimensionalBreakdown]:
+        """
+        Compares two time periods baseline vs current across a dimension.
+        Useful guide: https://dashthis.com/blog/metrics-and-dimensions/#metrics-vs-dimensions
+
+        approximate: estimate from a stable `sampling_rate` user sample, with
+        confidence intervals on both periods and on the change
+        """
+        if approximate:
+            return self._sampled_breakdowns(
+                metric_name,
+                [dimension],
+                time_range,
+                baseline_range,
+                min_drop_threshold,
+                sampling_rate,
+            )
+        return self._segment_breakdowns(
+            metric_name, [dimension], time_range, baseline_range, min_drop_threshold
+        )
+
+    def segment_all_dimensions(
+        self,
+        metric_name: str,
+        time_range: Tuple[str, str],
+        baseline_range: Tuple[str, str],
+        min_drop_threshold: float = MIN_DROP_THRESHOLD,
+        dimensions: list[str] | None = None,
+        approximate: bool = False,
+        sampling_rate: float = settings.APPROXIMATE_SAMPLING_RATE,
+    ) -> list[DimensionalBreakdown]:
+        """
+        get_dimensional_breakdown for every column in ALLOWED_COLUMNS (or
+        `dimensions`) at once, with the drops of all dimensions ranked from
+        the largest relative drop down.
+        """
+        if approximate:
+            breakdowns = self._sampled_breakdowns(
+                metric_name,
+                dimensions or ALLOWED_COLUMNS,
+                time_range,
+                baseline_range,
+                min_drop_threshold,
+                sampling_rate,
+            )
+        else:
+            breakdowns = self._segment_breakdowns(
+                metric_name,
+                dimensions or ALLOWED_COLUMNS,
+                time_range,
+                baseline_range,
+                min_drop_threshold,
+            )
+        return sorted(
+            breakdowns,
+            key=lambda b: (b.pct_change, b.dimension_name, b.dimension_value),
+        )
+
+    def _build_leaf_query(
+        self,
+        metric_name: str,
+        dimensions: list[str],
+        periods: dict[str, Tuple[str, str]],
+        table: str = "event_stream",
+    ) -> tuple[str, list]:
+        validate_columns(dimensions)
+        dims_sql = ", ".join(dimensions)
+        branch = f"""
+            SELECT ? AS period,
+            {bucket_sql(metric_name)} AS bucket,
+            {dims_sql},
+            COUNT(DISTINCT user_id) AS users,
+            COUNT(*) AS events
+            FROM {table}
+            WHERE event_date >= ? AND event_date <= ?
+            GROUP BY bucket, {dims_sql}
+            """
+        params = []
+        for period, (start_date, end_date) in periods.items():
+            params.extend([period, start_date, end_date])
+        return " UNION ALL ".join(branch for _ in periods), params
+
+    def find_root_causes(
+        self,
+        metric_name: str,
+        time_range: Tuple[str, str],
+        baseline_range: Tuple[str, str],
+        dimensions: list[str] | None = None,
+        top_k: int = 5,
+        max_depth: int = 3,
+        min_support: float = MIN_SUPPORT,
+        min_surprise: float = MIN_SURPRISE,
+        time_budget: float = settings.ROOT_CAUSE_TIME_BUDGET,
+    ) -> RootCauseAnalysis:
+        """
+        Localizes the change between baseline and current to the top-k
+        combinations of dimension values (e.g. android x IN) that explain it.
+        See LeafTable.search for the scoring and pruning.
+        """
+        # strategy:
+        # one query for per-bucket users/events of every leaf in both periods
+        # aggregate leaves into baseline forecast vs current actual
+        # search the lattice of dimension combinations
+
+        dimensions = dimensions or ROOT_CAUSE_DIMENSIONS
+        periods = {"baseline": tuple(baseline_range), "current": tuple(time_range)}
+        # leaf rows hold their columns in `dimensions` order, so the key keeps
+        # that order (canonical_query_key sorts a "dimensions" param)
+        key = canonical_query_key(
+            "root_cause_leaves",
+            metric_name=metric_name,
+            leaf_columns=tuple(dimensions),
+            periods=tuple(periods.items()),
+        )
+        rows = self._cached(
+            key,
+            lambda: self._scan_rows(
+                list(periods.values()),
+                lambda table: self._build_leaf_query(
+                    metric_name, dimensions, periods, table
+                ),
+            )[1],
+        )
+        leaves = LeafTable.from_rows(metric_name, dimensions, rows)
+        return leaves.search(
+            top_k=top_k,
+            max_depth=max_depth,
+            min_support=min_support,
+            min_surprise=min_surprise,
+            time_budget=time_budget,
+        )
+
     def check_deployments(
         self, time_range: Tuple[str, str], platform: str | None = None
     ) -> list[Deployment]:
         """
         Gets deployemnts in time range and platform
         """
+        key = canonical_query_key(
+            "check_deployments", time_range=tuple(time_range), platform=platform
+        )
+        return self._cached(key, lambda: self._check_deployments(time_range, platform))
 
+    def _check_deployments(
+        self, time_range: Tuple[str, str], platform: str | None
+    ) -> list[Deployment]:
         # strategy:
         # build query + execute
         # parse results
 
-        query = """
-            SELECT deployment_id, deployment_date, app_version, platform, regions, rollout_percentage
-            FROM deployments
-            WHERE DATE(deployment_date) >= ? AND DATE(deployment_date) <= ?
-        """
         params = [time_range[0], time_range[1]]
         if platform:
-            query += " AND platform = ?"
             params.append(platform)
 
-        with connect(self.db_path) as conn:
-            cursor = conn.execute(query, params)
-            cols = [d[0] for d in cursor.description]
-            rows = cursor.fetchall()
+        cols, rows = self._fetchall(deployments_query(bool(platform)), params)
         results = []
         for row in rows:
             row_dict = dict(zip(cols, row))
@@ -275,60 +958,83 @@ class MockDataWarehouse:
         Returns: {'day_1': 0.65, 'day_7': 0.42, 'day_30': 0.28}
         Inspired by https://www.moesif.com/docs/user-analytics/cohort-retention-analysis/
         """
+        key = canonical_query_key(
+            "analyze_cohort_retention",
+            cohort_date=cohort_date,
+            retention_days=list(retention_days),
+            filters=filters,
+        )
+        return self._cached(
+            key,
+            lambda: self._analyze_cohort_retention(
+                cohort_date, retention_days, filters
+            ),
+        )
 
-        user_profiles_column_map = {
-            "platform": "signup_platform",
-            "country": "signup_country",
-        }
-
+    def _analyze_cohort_retention(
+        self,
+        cohort_date: str,
+        retention_days: list[int],
+        filters: dict[str, str] | None,
+    ) -> dict[str, float]:
         # find total pool of users
-        # for each retention day:
-        #   find users active on that day
-        #   calculate rate
-
-        cohort_size_query = """
-            SELECT COUNT(*)
-            FROM user_profiles
-            WHERE DATE(signup_date) = ?
-            """
-        params = [cohort_date]
-        if filters:
-            for col, val in filters.items():
-                mapped_col = user_profiles_column_map.get(col, col)
-                cohort_size_query += f" AND {mapped_col} = ?"
-                params.append(val)
+        # find users active on every requested day offset in a single scan
+        # calculate rates
 
-        with connect(self.db_path) as conn:
-            cohort_size = conn.execute(cohort_size_query, params).fetchone()[0]
+        if not retention_days:
+            # as the per-day loop did: no days requested, no rates
+            return {}
+        filter_columns, filter_values = cohort_filter_params(filters)
+        cohort_size = self._fetchone(
+            cohort_size_query(filter_columns),
+            [cohort_date, cohort_date, *filter_values],
+        )[0]
 
         if cohort_size == 0:
             return {f"day_{day}": 0.0 for day in retention_days}
 
-        retention_rates = {}
-        for day in retention_days:
-            retention_query = """
-                SELECT COUNT(DISTINCT event_stream.user_id)
-                FROM event_stream
-                JOIN user_profiles ON event_stream.user_id = user_profiles.user_id
-                WHERE DATE(user_profiles.signup_date) = ?
-                AND DATE(event_stream.event_timestamp) = DATE(?, '+' || ? || ' days')
-            """
-            retention_params = [cohort_date, cohort_date, day]
-
-            if filters:
-                for col, val in filters.items():
-                    mapped_col = user_profiles_column_map.get(col, col)
-                    retention_query += f" AND user_profiles.{mapped_col} = ?"
-                    retention_params.append(val)
+        # One join over the window spanned by the requested offsets, grouped by
+        # the day offset from signup, instead of one join per retention day.
+        # A day lives in a single partition, so per-partition counts add up.
+        offsets = sorted(set(retention_days))
+        retention_params = [
+            cohort_date,
+            cohort_date,
+            cohort_date,
+            cohort_date,
+            f"{offsets[0]:+d}",
+            cohort_date,
+            f"{offsets[-1]:+d}",
+            *filter_values,
+            *offsets,
+        ]
 
-            with connect(self.db_path) as conn:
-                retained_users = conn.execute(
-                    retention_query, retention_params
-                ).fetchone()[0]
+        def build_retention_query(table: str) -> tuple[str, list]:
+            query = retention_query(filter_columns, len(offsets), table)
+            return query, retention_params
 
-            retention_rates[f"day_{day}"] = retained_users / cohort_size
+        try:
+            cohort_day = datetime.strptime(cohort_date[:10], "%Y-%m-%d")
+        except ValueError:
+            window = None  # left to SQLite's DATE(): scan every partition
+        else:
+            window = [
+                tuple(
+                    (cohort_day + timedelta(days=offset)).strftime("%Y-%m-%d")
+                    for offset in (offsets[0], offsets[-1])
+                )
+            ]
+        retained_by_offset: dict[int, int] = {}
+        for _, rows in self._scan_partitions(window, build_retention_query):
+            for day_offset, retained_users in rows:
+                retained_by_offset[day_offset] = (
+                    retained_by_offset.get(day_offset, 0) + retained_users
+                )
 
-        return retention_rates
+        return {
+            f"day_{day}": retained_by_offset.get(day, 0) / cohort_size
+            for day in retention_days
+        }
 
     def run_statistical_test(
         self,
@@ -336,6 +1042,8 @@ class MockDataWarehouse:
         control_filters: dict[str, str],
         treatment_filters: dict[str, str],
         time_range: Tuple[str, str],
+        approximate: bool = False,
+        sampling_rate: float = settings.APPROXIMATE_SAMPLING_RATE,
     ) -> dict[str, Any]:
         """
         Compare two segments statistically
@@ -346,6 +1054,9 @@ class MockDataWarehouse:
             'p_value': 0.003,
             'significant': True
         }
+        With approximate=True the per-bucket values are estimated from a
+        `sampling_rate` user sample, and the result also has
+        'control_mean_interval', 'treatment_mean_interval' and 'sampling_rate'.
         """
 
         # strategy:
@@ -356,11 +1067,15 @@ class MockDataWarehouse:
             metric_name=metric_name,
             time_range=time_range,
             filters=control_filters,
+            approximate=approximate,
+            sampling_rate=sampling_rate,
         )
         treatment_data = self.query_metric(
             metric_name=metric_name,
             time_range=time_range,
             filters=treatment_filters,
+            approximate=approximate,
+            sampling_rate=sampling_rate,
         )
         control_values = [point.value for point in control_data]
         treatment_values = [point.value for point in treatment_data]
@@ -372,9 +1087,21 @@ class MockDataWarehouse:
             sum(treatment_values) / len(treatment_values) if treatment_values else 0.0
         )
         significant = p_value < 0.05
-        return {
+        result = {
             "control_mean": control_mean,
             "treatment_mean": treatment_mean,
             "p_value": p_value,
             "significant": significant,
         }
+        if approximate:
+            for arm, filters in (
+                ("control", control_filters),
+                ("treatment", treatment_filters),
+            ):
+                fraction, rows = self._sample_rows(
+                    metric_name, time_range, [], filters, sampling_rate
+                )
+                mean = estimate_mean(metric_name, rows, fraction)
+                result[f"{arm}_mean_interval"] = mean.interval(lower_bound=0.0)
+            result["sampling_rate"] = sampling_rate
+        return result
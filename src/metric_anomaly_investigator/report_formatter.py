@@ -99,6 +99,11 @@ def print_report(report: InsightReport, console: Console | None = None) -> None:
             ("Deployments Found", data.get("deployments_found")),
             ("Avg Confidence", data.get("average_confidence_score")),
             ("Requires Follow-up", data.get("requires_followup")),
+            ("Warehouse Time (s)", data.get("warehouse_seconds")),
+            ("Queries Executed", data.get("queries_executed")),
+            ("Step Prompt Tokens", sum(data.get("step_prompt_tokens", [])) or None),
+            ("Prefetch Hit Rate", data.get("prefetch_hit_rate")),
+            ("Prefetch Saved (s)", data.get("prefetch_saved_seconds")),
         ]
 
         for name, value in key_metrics:
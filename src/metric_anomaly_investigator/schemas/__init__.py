@@ -1,11 +1,17 @@
 from .investigation_actions import (
+    ActionStep,
     BaseStep,
     InvestigationPlan,
     InvestigationStep,
+    SamplingParams,
     QueryMetricParams,
     QueryMetricStep,
     SegmentByDimensionParams,
     SegmentByDimensionStep,
+    SegmentAllDimensionsParams,
+    SegmentAllDimensionsStep,
+    FindRootCausesParams,
+    FindRootCausesStep,
     CheckDeploymentsParams,
     CheckDeploymentsStep,
     AnalyzeRetentionParams,
@@ -14,8 +20,12 @@ from .investigation_actions import (
     StatisticalTestStep,
     GenerateInsightsParams,
     GenerateInsightsStep,
+    ParallelActionsParams,
+    ParallelActionsStep,
 )
 from .models import (
+    QueryStats,
+    StepPerf,
     StepResult,
     InsightReport,
     ConversationContext,
@@ -23,17 +33,25 @@ from .models import (
     MetricDataPoint,
     DimensionalBreakdown,
     Deployment,
+    RootCauseSegment,
+    RootCauseAnalysis,
 )
 
 __all__ = [
     # Investigation actions
+    "ActionStep",
     "BaseStep",
     "InvestigationPlan",
     "InvestigationStep",
+    "SamplingParams",
     "QueryMetricParams",
     "QueryMetricStep",
     "SegmentByDimensionParams",
     "SegmentByDimensionStep",
+    "SegmentAllDimensionsParams",
+    "SegmentAllDimensionsStep",
+    "FindRootCausesParams",
+    "FindRootCausesStep",
     "CheckDeploymentsParams",
     "CheckDeploymentsStep",
     "AnalyzeRetentionParams",
@@ -42,7 +60,11 @@ __all__ = [
     "StatisticalTestStep",
     "GenerateInsightsParams",
     "GenerateInsightsStep",
+    "ParallelActionsParams",
+    "ParallelActionsStep",
     # Result models
+    "QueryStats",
+    "StepPerf",
     "StepResult",
     "InsightReport",
     "ConversationContext",
@@ -51,4 +73,6 @@ __all__ = [
     "MetricDataPoint",
     "DimensionalBreakdown",
     "Deployment",
+    "RootCauseSegment",
+    "RootCauseAnalysis",
 ]
@@ -8,7 +8,23 @@ class BaseStep(BaseModel):
     reasoning: str
 
 
-class QueryMetricParams(BaseModel):
+class SamplingParams(BaseModel):
+    approximate: bool = Field(
+        default=False,
+        description=(
+            "Estimate from a stable user sample, with 95% confidence intervals: "
+            "cheap, for exploring. Confirm the final hypothesis with an exact query"
+        ),
+    )
+    sampling_rate: float | None = Field(
+        default=None,
+        gt=0.0,
+        le=1.0,
+        description="Share of users in the sample, e.g. 0.01-0.05 (default 0.05)",
+    )
+
+
+class QueryMetricParams(SamplingParams):
     metric_name: Literal["dau", "wau", "events_per_user"]
     time_range: tuple[str, str] = Field(
         description="Start and end date as ISO strings, e.g. ('2026-01-25', '2026-02-01')"
@@ -22,7 +38,7 @@ class QueryMetricParams(BaseModel):
     )
 
 
-class SegmentByDimensionParams(BaseModel):
+class SegmentByDimensionParams(SamplingParams):
     metric_name: Literal["dau", "wau", "events_per_user"]
     dimension: Literal["platform", "country", "device_type", "app_version"]
     time_range: tuple[str, str]
@@ -30,6 +46,23 @@ class SegmentByDimensionParams(BaseModel):
     min_drop_threshold: float = 0.10
 
 
+class SegmentAllDimensionsParams(SamplingParams):
+    metric_name: Literal["dau", "wau", "events_per_user"]
+    time_range: tuple[str, str]
+    baseline_range: tuple[str, str]
+    min_drop_threshold: float = 0.10
+
+
+class FindRootCausesParams(BaseModel):
+    metric_name: Literal["dau", "wau", "events_per_user"]
+    time_range: tuple[str, str]
+    baseline_range: tuple[str, str]
+    top_k: int = Field(default=5, description="Number of segments to return")
+    max_depth: int = Field(
+        default=3, description="Maximum number of dimensions combined in a segment"
+    )
+
+
 class CheckDeploymentsParams(BaseModel):
     time_range: tuple[str, str]
     platform: Literal["ios", "android", "web"] | None = None
@@ -41,7 +74,7 @@ class AnalyzeRetentionParams(BaseModel):
     filters: dict[str, str] | None = None
 
 
-class StatisticalTestParams(BaseModel):
+class StatisticalTestParams(SamplingParams):
     metric_name: Literal["dau", "wau", "events_per_user"]
     control_filters: dict[str, str]
     treatment_filters: dict[str, str]
@@ -64,6 +97,16 @@ class SegmentByDimensionStep(BaseStep):
     parameters: SegmentByDimensionParams
 
 
+class SegmentAllDimensionsStep(BaseStep):
+    action: Literal["segment_all_dimensions"] = "segment_all_dimensions"
+    parameters: SegmentAllDimensionsParams
+
+
+class FindRootCausesStep(BaseStep):
+    action: Literal["find_root_causes"] = "find_root_causes"
+    parameters: FindRootCausesParams
+
+
 class CheckDeploymentsStep(BaseStep):
     action: Literal["check_deployments"] = "check_deployments"
     parameters: CheckDeploymentsParams
@@ -84,13 +127,47 @@ class GenerateInsightsStep(BaseStep):
     parameters: GenerateInsightsParams
 
 
+# a single warehouse action, i.e. anything that can run in a parallel batch
+ActionStep = Annotated[
+    Union[
+        QueryMetricStep,
+        SegmentByDimensionStep,
+        SegmentAllDimensionsStep,
+        FindRootCausesStep,
+        CheckDeploymentsStep,
+        AnalyzeRetentionStep,
+        StatisticalTestStep,
+    ],
+    Field(discriminator="action"),
+]
+
+
+class ParallelActionsParams(BaseModel):
+    actions: list[ActionStep] = Field(
+        min_length=1,
+        description=(
+            "Independent actions to run concurrently, e.g. segment by platform, "
+            "segment by country and check deployments. None may depend on "
+            "another's result"
+        ),
+    )
+
+
+class ParallelActionsStep(BaseStep):
+    action: Literal["parallel_actions"] = "parallel_actions"
+    parameters: ParallelActionsParams
+
+
 InvestigationStep = Annotated[
     Union[
         QueryMetricStep,
         SegmentByDimensionStep,
+        SegmentAllDimensionsStep,
+        FindRootCausesStep,
         CheckDeploymentsStep,
         AnalyzeRetentionStep,
         StatisticalTestStep,
+        ParallelActionsStep,
         GenerateInsightsStep,
     ],
     Field(discriminator="action"),
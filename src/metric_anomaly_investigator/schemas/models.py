@@ -7,6 +7,24 @@ from metric_anomaly_investigator.schemas.investigation_actions import (
 
 
 # Result Models
+class QueryStats(BaseModel):
+    sql: str
+    param_types: list[str]
+    seconds: float
+    rows: int  # rows returned
+    vm_steps: int | None = None  # SQLite VM instructions, when counted
+    plan: list[str] | None = None  # EXPLAIN QUERY PLAN details, when captured
+
+
+class StepPerf(BaseModel):
+    wall_seconds: float
+    # summed over queries: concurrent partition scans can exceed wall_seconds
+    query_seconds: float
+    rows_returned: int
+    vm_steps: int | None = None
+    queries: list[QueryStats] = []
+
+
 class StepResult(BaseModel):
     step_id: int
     success: bool
@@ -14,6 +32,7 @@ class StepResult(BaseModel):
     error_message: str | None = None
     key_findings: list[str] = []
     confidence_score: float = Field(ge=0.0, le=1.0)
+    perf: StepPerf | None = None
 
 
 class InsightReport(BaseModel):
@@ -41,10 +60,12 @@ class UserQuery(BaseModel):
 
 
 # Warehouse Models
+# Approximate (sampled) results carry 95% confidence intervals; exact ones None.
 class MetricDataPoint(BaseModel):
     timestamp: datetime
     value: float
     dimensions: Dict[str, str] = {}
+    confidence_interval: tuple[float, float] | None = None
 
 
 class DimensionalBreakdown(BaseModel):
@@ -54,6 +75,27 @@ class DimensionalBreakdown(BaseModel):
     after_value: float
     pct_change: float
     sample_size: int
+    before_interval: tuple[float, float] | None = None
+    after_interval: tuple[float, float] | None = None
+    pct_change_interval: tuple[float, float] | None = None
+
+
+class RootCauseSegment(BaseModel):
+    segment: Dict[str, str]
+    baseline_value: float
+    current_value: float
+    pct_change: float
+    explanatory_power: float  # share of the overall change this segment accounts for
+    surprise: float
+    support: float
+    score: float
+
+
+class RootCauseAnalysis(BaseModel):
+    segments: list[RootCauseSegment]
+    cells_evaluated: int
+    truncated: bool  # the time budget ran out before the lattice was exhausted
+    elapsed_seconds: float
 
 
 class Deployment(BaseModel):
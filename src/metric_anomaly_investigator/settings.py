@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -6,7 +8,35 @@ class Settings(BaseSettings):
     DB_URL: str = "data/analytics.db"
     DEFAULT_MODEL_CONFIDENCE: float | None = 0.5
     MODEL_NAME: str = "claude-sonnet-4-5"
+    # live, record (store every response by prompt hash) or replay (offline)
+    LLM_MODE: Literal["live", "record", "replay"] = "live"
+    LLM_RECORDINGS_PATH: str = "data/llm_recordings.jsonl"
     MAX_INVESTIGATION_STEPS: int = 10
+    # step-agent input tokens that trigger compacting older exchanges into a
+    # summary; the latest STEP_HISTORY_KEEP_RECENT exchanges stay verbatim
+    STEP_HISTORY_TOKEN_BUDGET: int = 8_000
+    STEP_HISTORY_KEEP_RECENT: int = 3
+    MAX_PARALLEL_ACTIONS: int = 4  # workers running one parallel_actions batch
+    SPECULATIVE_PREFETCH: bool = False  # run likely next steps while the LLM thinks
+    PREFETCH_MAX_STEPS: int = 6  # speculative steps started per decision
+    PREFETCH_WORKERS: int = 2
+    # pool running steps off the event loop; process workers each open their
+    # own warehouse (built from these settings)
+    ASYNC_EXECUTOR: Literal["thread", "process"] = "thread"
+    ASYNC_EXECUTOR_WORKERS: int = 4
+    DB_POOL_SIZE: int = 4
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_IN_MEMORY: bool = False  # copy the database into RAM at startup
+    QUERY_CACHE_MAX_ENTRIES: int = 256  # 0 disables the result cache
+    QUERY_CACHE_MAX_BYTES: int = 64 * 2**20
+    PARTIAL_CACHE_MAX_SHAPES: int = 128  # 0 disables per-day partial aggregates
+    WAREHOUSE_BACKEND: Literal["sqlite", "columnar"] = "sqlite"
+    DISTINCT_COUNT_MODE: Literal["exact", "hll", "bitmap"] = "exact"
+    ROOT_CAUSE_TIME_BUDGET: float = 2.0  # seconds per root-cause search
+    APPROXIMATE_SAMPLING_RATE: float = 0.05  # share of users approximate queries read
+    SLOW_QUERY_SECONDS: float = 1.0  # queries at least this slow are logged
+    QUERY_EXPLAIN: bool = False  # capture EXPLAIN QUERY PLAN for every query
+    QUERY_COUNT_VM_STEPS: bool = False  # count SQLite VM steps per query
 
 
 settings = Settings()
@@ -0,0 +1,39 @@
+import os
+import sqlite3
+
+import pytest
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
+
+from metric_anomaly_investigator.mock_warehouse import (  # noqa: E402
+    MockDataWarehouse,
+    generate_deployments,
+    generate_events,
+    generate_user_profiles,
+)
+from metric_anomaly_investigator.mock_warehouse.migrations import migrate  # noqa: E402
+
+TEST_USERS = 400
+
+
+@pytest.fixture(scope="session")
+def db_path(tmp_path_factory) -> str:
+    """Small generated analytics database shared by the whole test session."""
+    users_df = generate_user_profiles(TEST_USERS, seed=9)
+    events_df = generate_events(users_df, seed=9)
+    deployments_df = generate_deployments()
+
+    path = str(tmp_path_factory.mktemp("data") / "analytics.db")
+    connection = sqlite3.connect(path)
+    users_df.to_sql("user_profiles", connection, if_exists="replace", index=False)
+    events_df.to_sql("event_stream", connection, if_exists="replace", index=False)
+    deployments_df.to_sql("deployments", connection, if_exists="replace", index=False)
+    connection.close()
+    migrate(path)
+    return path
+
+
+@pytest.fixture
+def warehouse(db_path):
+    with MockDataWarehouse(db_path=db_path) as wh:
+        yield wh
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from metric_anomaly_investigator.agent.tool_executor import ToolExecutor
+from metric_anomaly_investigator.mock_warehouse import AsyncWarehouse
+from metric_anomaly_investigator.mock_warehouse.async_warehouse import run_off_loop
+from metric_anomaly_investigator.schemas import CheckDeploymentsStep, QueryMetricStep
+
+FULL_RANGE = ("2026-01-25", "2026-02-01")
+ENDLESS_QUERY = """
+    WITH RECURSIVE numbers(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM numbers)
+    SELECT COUNT(*) FROM numbers
+    """
+
+
+def test_async_warehouse_matches_sync(warehouse):
+    async def main():
+        async with AsyncWarehouse(warehouse) as async_warehouse:
+            return await asyncio.gather(
+                async_warehouse.query_metric("dau", FULL_RANGE, ["platform"]),
+                async_warehouse.check_deployments(FULL_RANGE),
+            )
+
+    points, deployments = asyncio.run(main())
+    assert points == warehouse.query_metric("dau", FULL_RANGE, ["platform"])
+    assert deployments == warehouse.check_deployments(FULL_RANGE)
+
+
+def test_cancellation_aborts_running_query(warehouse):
+    executor = ThreadPoolExecutor(max_workers=1)
+    ticks = []
+
+    async def main():
+        scan = asyncio.create_task(
+            run_off_loop(executor, warehouse._fetchall, ENDLESS_QUERY, [])
+        )
+        # the event loop keeps running while the scan occupies its thread
+        for _ in range(5):
+            await asyncio.sleep(0.02)
+            ticks.append(time.perf_counter())
+        scan.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await scan
+
+    asyncio.run(main())
+    assert len(ticks) == 5
+    # the endless query was interrupted, which frees the worker thread
+    shutdown = threading.Thread(target=executor.shutdown)
+    shutdown.start()
+    shutdown.join(timeout=5)
+    assert not shutdown.is_alive()
+
+
+@pytest.mark.parametrize("async_executor", ["thread", "process"])
+def test_execute_steps_async(warehouse, async_executor):
+    steps = [
+        QueryMetricStep(
+            step_id=1,
+            reasoning="magnitude",
+            parameters={"metric_name": "dau", "time_range": FULL_RANGE},
+        ),
+        CheckDeploymentsStep(
+            step_id=2, reasoning="deployments", parameters={"time_range": FULL_RANGE}
+        ),
+    ]
+    # one worker: each spawned process imports the whole package
+    executor = ToolExecutor(
+        warehouse, prefetch=False, async_executor=async_executor, async_workers=1
+    )
+    try:
+        results = asyncio.run(executor.execute_steps_async(steps))
+    finally:
+        executor.close()
+
+    assert [r.step_id for r in results] == [1, 2]
+    for step, result in zip(steps, results):
+        assert result.success, result.error_message
+        assert result.data == executor.execute_step(step).data
@@ -0,0 +1,122 @@
+import shutil
+import sqlite3
+
+import numpy as np
+import pytest
+
+from metric_anomaly_investigator.mock_warehouse import MockDataWarehouse
+from metric_anomaly_investigator.mock_warehouse.bitmap_index import UserBitmap
+from metric_anomaly_investigator.mock_warehouse.partitions import partition_tables
+
+
+@pytest.fixture(scope="module")
+def bitmap_warehouse(db_path):
+    with MockDataWarehouse(db_path=db_path, distinct_mode="bitmap") as wh:
+        yield wh
+
+
+def test_user_bitmap_containers():
+    n_users = 10_000
+    rng = np.random.default_rng(0)
+    sparse_ids = rng.choice(n_users, 100, replace=False)
+    dense_ids = rng.choice(n_users, 6_000, replace=False)
+    sparse = UserBitmap.from_ids(sparse_ids, n_users)
+    dense = UserBitmap.from_ids(dense_ids, n_users)
+    assert sparse.ids is not None and dense.bits is not None
+    assert sparse.nbytes < dense.nbytes
+
+    for a, b in [(sparse, dense), (dense, sparse), (sparse, sparse), (dense, dense)]:
+        a_ids = set(sparse_ids) if a is sparse else set(dense_ids)
+        b_ids = set(sparse_ids) if b is sparse else set(dense_ids)
+        assert len(a & b) == len(a_ids & b_ids)
+        assert len(a | b) == len(a_ids | b_ids)
+    assert not UserBitmap.from_ids(np.array([], dtype=np.int32), n_users)
+
+
+def _as_dicts(points):
+    return [(p.timestamp, p.value, p.dimensions) for p in points]
+
+
+@pytest.mark.parametrize(
+    "metric_name, dimensions, filters",
+    [
+        ("dau", [], {}),
+        ("dau", ["platform"], {"country": "IN"}),
+        ("dau", ["country", "app_version"], {"platform": "android"}),
+        ("dau", ["event_type"], {"platform": "ios"}),
+        ("wau", [], {}),
+        ("wau", ["platform", "country"], {}),
+        ("wau", [], {"event_type": "search", "country": "US"}),
+    ],
+)
+def test_bitmap_answers_match_sql_exactly(
+    warehouse, bitmap_warehouse, metric_name, dimensions, filters
+):
+    assert bitmap_warehouse._bitmap_index.supports(metric_name, dimensions, filters)
+    time_range = ("2026-01-26", "2026-01-31")
+    exact = warehouse.query_metric(metric_name, time_range, dimensions, filters)
+    bitmap = bitmap_warehouse.query_metric(metric_name, time_range, dimensions, filters)
+    assert sorted(_as_dicts(bitmap), key=str) == sorted(_as_dicts(exact), key=str)
+
+
+def test_unsupported_queries_fall_back_to_sql(warehouse, bitmap_warehouse):
+    index = bitmap_warehouse._bitmap_index
+    assert "event_type" not in index.single_valued
+    assert not index.supports("events_per_user", [], {})
+
+    time_range = ("2026-01-25", "2026-02-01")
+    exact = warehouse.query_metric("events_per_user", time_range, ["platform"])
+    fallback = bitmap_warehouse.query_metric(
+        "events_per_user", time_range, ["platform"]
+    )
+    assert _as_dicts(fallback) == _as_dicts(exact)
+
+
+def test_statistical_test_through_bitmaps(warehouse, bitmap_warehouse):
+    kwargs = dict(
+        metric_name="dau",
+        control_filters={"platform": "ios"},
+        treatment_filters={"platform": "android"},
+        time_range=("2026-01-25", "2026-02-01"),
+    )
+    assert bitmap_warehouse.run_statistical_test(**kwargs) == pytest.approx(
+        warehouse.run_statistical_test(**kwargs)
+    )
+
+
+def test_days_missing_from_the_index_fall_back_to_sql(warehouse, bitmap_warehouse):
+    index = bitmap_warehouse._bitmap_index
+    time_range = (index.days[-1], "2026-03-31")
+    assert not index.covers(time_range)
+    assert index.covers((index.days[0], index.days[-1]))
+    exact = warehouse.query_metric("dau", time_range)
+    assert _as_dicts(bitmap_warehouse.query_metric("dau", time_range)) == _as_dicts(
+        exact
+    )
+
+
+def test_index_is_dropped_when_the_data_changes(db_path, tmp_path):
+    path = str(tmp_path / "analytics.db")
+    shutil.copy(db_path, path)
+    with MockDataWarehouse(
+        db_path=path, distinct_mode="bitmap", cache_max_entries=0
+    ) as wh:
+        day = wh._bitmap_index.days[0]
+        before = wh.query_metric("dau", (day, day))[0].value
+        assert wh._bitmap_index is not None
+
+        conn = sqlite3.connect(path)
+        table = partition_tables(conn)[0]
+        conn.execute(
+            f"INSERT INTO {table} SELECT * FROM {table} WHERE event_date = ? LIMIT 1",
+            [day],
+        )
+        conn.execute(
+            f"UPDATE {table} SET user_id = 'new-user' WHERE rowid = "
+            f"(SELECT MAX(rowid) FROM {table})"
+        )
+        conn.commit()
+        conn.close()
+
+        assert wh.query_metric("dau", (day, day))[0].value == before + 1
+        assert wh._bitmap_index is None
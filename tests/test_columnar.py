@@ -0,0 +1,126 @@
+import shutil
+import sqlite3
+
+import pytest
+
+from metric_anomaly_investigator.mock_warehouse import (
+    ColumnarWarehouse,
+    MockDataWarehouse,
+    create_warehouse,
+)
+from metric_anomaly_investigator.mock_warehouse.partitions import partition_tables
+
+
+@pytest.fixture(scope="module")
+def columnar_warehouse(db_path):
+    with ColumnarWarehouse(db_path=db_path) as wh:
+        yield wh
+
+
+def _as_tuples(points):
+    return sorted(
+        ((p.timestamp, tuple(sorted(p.dimensions.items())), p.value) for p in points),
+        key=str,
+    )
+
+
+@pytest.mark.parametrize(
+    "metric_name, dimensions, filters",
+    [
+        ("dau", [], {}),
+        ("dau", ["platform", "country"], {}),
+        ("wau", ["app_version"], {"platform": "android"}),
+        ("events_per_user", ["event_type"], {"country": "IN"}),
+        ("dau", [], {"country": "XX"}),
+    ],
+)
+def test_columnar_matches_sqlite(
+    warehouse, columnar_warehouse, metric_name, dimensions, filters
+):
+    time_range = ("2026-01-26", "2026-01-31")
+    expected = warehouse.query_metric(metric_name, time_range, dimensions, filters)
+    actual = columnar_warehouse.query_metric(
+        metric_name, time_range, dimensions, filters
+    )
+    assert _as_tuples(actual) == pytest.approx(_as_tuples(expected))
+
+
+def test_columnar_breakdown_and_statistical_test(warehouse, columnar_warehouse):
+    breakdown_kwargs = dict(
+        metric_name="dau",
+        dimension="country",
+        time_range=("2026-01-28", "2026-02-01"),
+        baseline_range=("2026-01-25", "2026-01-27"),
+    )
+    assert sorted(
+        columnar_warehouse.get_dimensional_breakdown(**breakdown_kwargs),
+        key=lambda b: b.dimension_value,
+    ) == sorted(
+        warehouse.get_dimensional_breakdown(**breakdown_kwargs),
+        key=lambda b: b.dimension_value,
+    )
+
+    test_kwargs = dict(
+        metric_name="events_per_user",
+        control_filters={"country": "US"},
+        treatment_filters={"country": "IN"},
+        time_range=("2026-01-25", "2026-02-01"),
+    )
+    assert columnar_warehouse.run_statistical_test(**test_kwargs) == pytest.approx(
+        warehouse.run_statistical_test(**test_kwargs)
+    )
+
+
+def test_columnar_segment_all_dimensions(warehouse, columnar_warehouse):
+    kwargs = dict(
+        metric_name="wau",
+        time_range=("2026-01-28", "2026-02-01"),
+        baseline_range=("2026-01-25", "2026-01-27"),
+        min_drop_threshold=-10.0,
+    )
+    expected = warehouse.segment_all_dimensions(**kwargs)
+    actual = columnar_warehouse.segment_all_dimensions(**kwargs)
+    assert [(b.dimension_name, b.dimension_value) for b in actual] == [
+        (b.dimension_name, b.dimension_value) for b in expected
+    ]
+    assert [b.pct_change for b in actual] == pytest.approx(
+        [b.pct_change for b in expected]
+    )
+
+
+def test_columnar_rejects_unknown_columns(columnar_warehouse):
+    with pytest.raises(ValueError):
+        columnar_warehouse.query_metric(
+            "dau", ("2026-01-25", "2026-02-01"), ["user_tier"]
+        )
+
+
+def test_create_warehouse_selects_backend(db_path):
+    with create_warehouse("columnar", db_path=db_path) as wh:
+        assert isinstance(wh, ColumnarWarehouse)
+    with create_warehouse("sqlite", db_path=db_path) as wh:
+        assert type(wh) is MockDataWarehouse
+    with pytest.raises(ValueError):
+        create_warehouse("duckdb", db_path=db_path)
+
+
+def test_columnar_reloads_changed_data_and_labels_nulls_like_sql(db_path, tmp_path):
+    path = str(tmp_path / "analytics.db")
+    shutil.copy(db_path, path)
+    time_range = ("2026-01-25", "2026-02-01")
+    with ColumnarWarehouse(db_path=path, cache_max_entries=0) as columnar:
+        columnar.query_metric("dau", time_range, ["app_version"])
+
+        conn = sqlite3.connect(path)
+        for table in partition_tables(conn):
+            conn.execute(
+                f"UPDATE {table} SET app_version = NULL WHERE platform = 'web'"
+            )
+        conn.commit()
+        conn.close()
+
+        actual = columnar.query_metric("dau", time_range, ["app_version"])
+        with MockDataWarehouse(db_path=path, cache_max_entries=0) as sqlite_wh:
+            expected = sqlite_wh.query_metric("dau", time_range, ["app_version"])
+    assert "None" in {p.dimensions["app_version"] for p in expected}
+    assert _as_tuples(actual) == pytest.approx(_as_tuples(expected))
@@ -0,0 +1,56 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from metric_anomaly_investigator.mock_warehouse.connection_pool import (
+    ConnectionPool,
+    PoolClosedError,
+)
+
+
+def test_pool_reuses_connections(db_path):
+    pool = ConnectionPool(db_path, size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    pool.close()
+
+
+def test_pool_connections_are_read_only(db_path):
+    pool = ConnectionPool(db_path, size=1)
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM deployments")
+    pool.close()
+
+
+def test_pool_never_exceeds_size_under_concurrency(db_path):
+    pool = ConnectionPool(db_path, size=3)
+
+    def count_events(_):
+        with pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM event_stream").fetchone()[0]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        counts = list(executor.map(count_events, range(32)))
+
+    assert len(set(counts)) == 1
+    assert len(pool._all) <= 3
+    pool.close()
+
+
+def test_closed_pool_rejects_new_borrowers(db_path):
+    pool = ConnectionPool(db_path, size=1)
+    pool.close()
+    with pytest.raises(PoolClosedError):
+        with pool.connection():
+            pass
+
+
+def test_warehouse_queries_through_pool(warehouse):
+    points = warehouse.query_metric("dau", ("2026-01-25", "2026-02-01"))
+    assert len(points) == 8
+    assert all(p.value > 0 for p in points)
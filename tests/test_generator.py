@@ -0,0 +1,71 @@
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+from metric_anomaly_investigator.mock_warehouse import generator
+from metric_anomaly_investigator.mock_warehouse.generator import (
+    generate_events,
+    generate_user_profiles,
+    iter_events,
+)
+from metric_anomaly_investigator.mock_warehouse.scenarios import ANOMALY_START
+
+
+def test_same_seed_reproduces_users_and_events():
+    users = generate_user_profiles(300, seed=3)
+    pd.testing.assert_frame_equal(users, generate_user_profiles(300, seed=3))
+    pd.testing.assert_frame_equal(
+        generate_events(users, seed=3), generate_events(users, seed=3)
+    )
+    assert not users["user_id"].equals(generate_user_profiles(300, seed=4)["user_id"])
+
+
+def test_each_day_is_independent_of_the_range():
+    users = generate_user_profiles(200, seed=1)
+    day = datetime(2026, 1, 29)
+    full_range = [
+        df for df in iter_events(users, seed=1) if df["event_timestamp"].min() >= day
+    ][0]
+    single_day = generate_events(users, day, day, seed=1)
+    pd.testing.assert_frame_equal(full_range.reset_index(drop=True), single_day)
+
+
+def test_output_does_not_depend_on_worker_count(monkeypatch):
+    # small blocks, so a few hundred users span several partitions per day
+    monkeypatch.setattr(generator, "USER_BLOCK_SIZE", 64)
+    users = generate_user_profiles(300, seed=8)
+    end = datetime(2026, 1, 29)
+    serial = list(iter_events(users, end_date=end, seed=8))
+    parallel = list(iter_events(users, end_date=end, seed=8, workers=2))
+
+    assert len(serial) == 5 * 5
+    assert len(parallel) == len(serial)
+    for expected, chunk in zip(serial, parallel):
+        pd.testing.assert_frame_equal(chunk, expected)
+
+
+def test_events_keep_shape_and_planted_anomaly():
+    users = generate_user_profiles(2000, seed=5)
+    events = generate_events(users, seed=5)
+
+    assert events["event_id"].is_unique
+    assert uuid.UUID(events["event_id"].iloc[0]).version == 4
+    assert set(events["device_type"]) == {"mobile", "desktop"}
+    assert (events.loc[events["platform"] == "web", "device_type"] == "desktop").all()
+
+    events["day"] = events["event_timestamp"].dt.normalize()
+    dau = events.groupby("day")["user_id"].nunique()
+    assert dau.between(0.45 * len(users), 0.85 * len(users)).all()
+
+    android_in = events[(events["platform"] == "android") & (events["country"] == "IN")]
+    after = android_in[android_in["day"] >= ANOMALY_START]
+    assert (after["app_version"] == "2.3.0").all()
+    before_dau = (
+        android_in[android_in["day"] < ANOMALY_START]
+        .groupby("day")["user_id"]
+        .nunique()
+    )
+    after_dau = after.groupby("day")["user_id"].nunique()
+    # ~60% of the segment drops out every day after the bad release
+    assert after_dau.mean() < 0.6 * before_dau.mean()
@@ -0,0 +1,43 @@
+import logging
+import sqlite3
+
+import pytest
+
+from metric_anomaly_investigator.mock_warehouse import MockDataWarehouse
+from metric_anomaly_investigator.mock_warehouse.hot_copy import load_hot_copy
+
+FULL_RANGE = ("2026-01-25", "2026-02-01")
+
+
+def test_hot_copy_reports_progress_and_size(warehouse, caplog):
+    with caplog.at_level(logging.DEBUG, logger=load_hot_copy.__module__):
+        hot_copy = load_hot_copy(warehouse.db_path, pages_per_step=8)
+    try:
+        progress = [r for r in caplog.records if "pages" in r.getMessage()]
+        # one record per backup step, then the summary
+        assert len(progress) == -(-hot_copy.pages // 8) + 1
+        assert hot_copy.load_seconds > 0
+        with sqlite3.connect(warehouse.db_path) as disk:
+            page_size = disk.execute("PRAGMA page_size").fetchone()[0]
+            pages = disk.execute("PRAGMA page_count").fetchone()[0]
+        assert hot_copy.memory_bytes == pages * page_size
+    finally:
+        hot_copy.close()
+
+
+def test_in_memory_warehouse_matches_disk(warehouse):
+    with MockDataWarehouse(db_path=warehouse.db_path, in_memory=True) as in_memory:
+        assert in_memory.hot_copy is not None
+        assert in_memory.query_metric(
+            "dau", FULL_RANGE, ["platform"]
+        ) == warehouse.query_metric("dau", FULL_RANGE, ["platform"])
+        assert in_memory.check_deployments(FULL_RANGE) == warehouse.check_deployments(
+            FULL_RANGE
+        )
+        uri = in_memory.hot_copy.uri
+
+    # the copy is freed with its last connection
+    conn = sqlite3.connect(uri, uri=True)
+    with pytest.raises(sqlite3.OperationalError, match="no such table"):
+        conn.execute("SELECT COUNT(*) FROM event_stream")
+    conn.close()
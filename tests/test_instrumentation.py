@@ -0,0 +1,65 @@
+import logging
+
+import pytest
+
+from metric_anomaly_investigator.agent.tool_executor import ToolExecutor
+from metric_anomaly_investigator.mock_warehouse import MockDataWarehouse
+from metric_anomaly_investigator.schemas import QueryMetricStep
+
+FULL_RANGE = ("2026-01-25", "2026-02-01")
+
+
+@pytest.fixture
+def uncached_warehouse(db_path):
+    with MockDataWarehouse(
+        db_path=db_path, cache_max_entries=0, partial_cache_max_shapes=0
+    ) as wh:
+        yield wh
+
+
+def test_profiler_records_every_partition_scan(uncached_warehouse):
+    profiler = uncached_warehouse.profiler
+    profiler.explain = True
+    profiler.count_vm_steps = True
+    with profiler.record() as queries:
+        points = uncached_warehouse.query_metric(
+            "dau", FULL_RANGE, filters={"platform": "ios"}
+        )
+
+    # one query per weekly partition, scanned on worker threads
+    assert len(queries) == 2
+    assert sum(q.rows for q in queries) == len(points)
+    for query in queries:
+        assert query.sql.startswith("SELECT event_date as date")
+        assert query.param_types == ["str", "str", "str"]
+        assert query.seconds > 0 and query.vm_steps > 0
+        assert any("idx_event_stream_p" in detail for detail in query.plan)
+
+    with profiler.record() as outside:
+        pass
+    uncached_warehouse.query_metric("dau", FULL_RANGE)
+    assert outside == []
+
+
+def test_slow_query_log(uncached_warehouse, caplog):
+    uncached_warehouse.profiler.slow_query_seconds = 0.0
+    with caplog.at_level(logging.WARNING):
+        uncached_warehouse.check_deployments(FULL_RANGE)
+    slow = [r for r in caplog.records if r.name.endswith("slow_queries")]
+    assert len(slow) == 1
+    assert "FROM deployments" in slow[0].getMessage()
+    assert "plan=" in slow[0].getMessage()
+
+
+def test_step_result_carries_perf(uncached_warehouse):
+    step = QueryMetricStep(
+        step_id=1,
+        reasoning="magnitude",
+        parameters={"metric_name": "wau", "time_range": FULL_RANGE},
+    )
+    result = ToolExecutor(uncached_warehouse).execute_step(step)
+
+    assert result.success, result.error_message
+    assert result.perf.wall_seconds >= result.perf.queries[0].seconds
+    assert result.perf.rows_returned == len(result.data["metric_data"])
+    assert result.perf.vm_steps is None
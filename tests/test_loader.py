@@ -0,0 +1,110 @@
+import sqlite3
+import subprocess
+import sys
+import textwrap
+
+import pandas as pd
+import pytest
+
+from metric_anomaly_investigator.mock_warehouse import (
+    MockDataWarehouse,
+    generate_events,
+    generate_user_profiles,
+)
+from metric_anomaly_investigator.mock_warehouse.loader import load_database
+from metric_anomaly_investigator.mock_warehouse.migrations import (
+    LATEST_SCHEMA_VERSION,
+    get_schema_version,
+)
+
+
+def test_loaded_events_match_the_generator(tmp_path):
+    db_path = str(tmp_path / "analytics.db")
+    stats = load_database(db_path, n_users=150, seed=11)
+
+    expected = generate_events(generate_user_profiles(150, seed=11), seed=11)
+    conn = sqlite3.connect(db_path)
+    try:
+        # partitions are unioned oldest first, each in insertion order
+        loaded = pd.read_sql_query("SELECT * FROM event_stream", conn)
+        assert get_schema_version(conn) == LATEST_SCHEMA_VERSION
+        indexes = {
+            row[0]
+            for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")
+        }
+        user_count = conn.execute("SELECT COUNT(*) FROM user_profiles").fetchone()[0]
+    finally:
+        conn.close()
+
+    event_dates = loaded.pop("event_date")
+    assert stats.events == len(expected) and stats.users == user_count == 150
+    expected["event_timestamp"] = expected["event_timestamp"].astype(str)
+    pd.testing.assert_frame_equal(loaded, expected, check_dtype=False)
+    assert (event_dates == loaded["event_timestamp"].str[:10]).all()
+    assert {
+        "idx_event_stream_p2026_04_date_dims",
+        "idx_event_stream_p2026_04_user_date",
+    } <= indexes
+    assert not list(tmp_path.glob("*.csv"))
+
+
+def test_csv_export_and_warehouse_reads_loaded_db(tmp_path):
+    db_path = str(tmp_path / "analytics.db")
+    stats = load_database(db_path, n_users=100, seed=2, csv_dir=str(tmp_path / "csv"))
+
+    events_csv = pd.read_csv(tmp_path / "csv" / "event_stream.csv")
+    assert len(events_csv) == stats.events
+    assert len(pd.read_csv(tmp_path / "csv" / "user_profiles.csv")) == 100
+    assert len(pd.read_csv(tmp_path / "csv" / "deployments.csv")) == 4
+
+    with MockDataWarehouse(db_path=db_path) as wh:
+        rows = wh.query_metric("dau", ("2026-01-25", "2026-02-01"))
+    assert len(rows) == 8
+    assert sum(row.value for row in rows) == (
+        events_csv.assign(day=events_csv["event_timestamp"].str[:10])
+        .groupby("day")["user_id"]
+        .nunique()
+        .sum()
+    )
+
+
+# loads one day of `n_users` (argv[1]) into argv[2] in small blocks, with a
+# small page cache, and prints the peak RSS in KiB
+_PEAK_RSS_LOAD = textwrap.dedent(
+    """
+    import resource
+    import sys
+    from datetime import datetime
+
+    from metric_anomaly_investigator.mock_warehouse import generator, loader, sampling
+
+    generator.USER_BLOCK_SIZE = 1_000
+    sampling.ASSIGN_BATCH_SIZE = 1_000
+    loader.LOAD_PRAGMAS["cache_size"] = -2_048
+    day = datetime(2026, 1, 28)
+    loader.load_database(
+        sys.argv[2], n_users=int(sys.argv[1]), seed=4, start_date=day, end_date=day
+    )
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    """
+)
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="ru_maxrss is in KiB on Linux")
+def test_peak_memory_does_not_grow_with_users(tmp_path):
+    peaks = [
+        int(
+            subprocess.run(
+                [sys.executable, "-c", _PEAK_RSS_LOAD, str(n_users), str(db_path)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+        )
+        for n_users, db_path in (
+            (2_000, tmp_path / "small.db"),
+            (40_000, tmp_path / "large.db"),
+        )
+    ]
+    # 20x the users; holding every profile for the whole load peaks ~14 MB higher
+    assert peaks[1] - peaks[0] < 8 * 1024
@@ -0,0 +1,59 @@
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelRequest, SystemPromptPart, UserPromptPart
+from pydantic_ai.models.test import TestModel
+
+from metric_anomaly_investigator.agent.message_history import StepHistory
+from metric_anomaly_investigator.schemas import InvestigationStep, StepResult
+
+QUERY = "Why did DAU drop on 2026-01-28?"
+
+
+def step_result(step_id: int) -> StepResult:
+    return StepResult(
+        step_id=step_id,
+        success=True,
+        key_findings=[f"finding {step_id} " + "detail " * 40],
+        confidence_score=0.7,
+    )
+
+
+def run_investigation(history: StepHistory, n_decisions: int) -> list[str]:
+    agent = Agent(TestModel(), output_type=InvestigationStep, system_prompt="SYSTEM")
+    executed: list[StepResult] = []
+    prompts = []
+    for step_id in range(1, n_decisions + 1):
+        prompt = history.prompt(executed)
+        prompts.append(prompt)
+        result = agent.run_sync(prompt, message_history=history.messages())
+        history.record(result, executed)
+        executed.append(step_result(step_id))
+    return prompts
+
+
+def test_prompts_only_carry_new_results():
+    history = StepHistory(QUERY, token_budget=10**9)
+    prompts = run_investigation(history, 4)
+
+    assert prompts[0] == f"User query: {QUERY}\n"
+    assert prompts[2].startswith("New step results:\n- Step 2:")
+    assert "Step 1:" not in prompts[2]
+    # the whole transcript is still in the history, sent once
+    assert len(history.messages()) == 4 * 3
+    assert len(history.prompt_tokens) == len(history.cached_prompt_tokens) == 4
+
+
+def test_older_exchanges_compact_into_a_summary():
+    unbounded = StepHistory(QUERY, token_budget=10**9)
+    run_investigation(unbounded, 8)
+    compacted = StepHistory(QUERY, token_budget=150, keep_recent=2)
+    run_investigation(compacted, 8)
+
+    head, *rest = compacted.messages()
+    assert isinstance(head, ModelRequest)
+    assert isinstance(head.parts[0], SystemPromptPart)
+    summary = head.parts[1]
+    assert isinstance(summary, UserPromptPart)
+    assert QUERY in summary.content and "- Step 1: finding 1" in summary.content
+    assert len(rest) == 2 * 3
+    assert compacted.prompt_tokens[-1] < unbounded.prompt_tokens[-1]
+    assert sum(compacted.prompt_tokens) < sum(unbounded.prompt_tokens)
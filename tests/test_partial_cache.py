@@ -0,0 +1,66 @@
+from datetime import date
+
+import pytest
+
+from metric_anomaly_investigator.mock_warehouse import MockDataWarehouse
+from metric_anomaly_investigator.mock_warehouse.partial_cache import (
+    PartialAggregateCache,
+    split_into_chunks,
+)
+
+
+def test_split_into_chunks_clips_weeks_to_range():
+    # 2026-01-25 is a Sunday, so it closes week 03; 01-26..02-01 is week 04
+    chunks = split_into_chunks("wau", date(2026, 1, 25), date(2026, 1, 28))
+    assert chunks == [
+        ("2026-03", "2026-01-25", "2026-01-25"),
+        ("2026-04", "2026-01-26", "2026-01-28"),
+    ]
+    days = split_into_chunks("dau", date(2026, 1, 25), date(2026, 1, 27))
+    assert [label for label, _, _ in days] == ["2026-01-25", "2026-01-26", "2026-01-27"]
+
+
+@pytest.mark.parametrize("metric", ["dau", "wau", "events_per_user"])
+def test_overlapping_ranges_match_uncached_warehouse(db_path, metric):
+    ranges = [
+        ("2026-01-25", "2026-01-28"),
+        ("2026-01-27", "2026-02-01"),
+        ("2026-01-25", "2026-02-01"),
+        ("2026-01-29", "2026-01-30"),
+    ]
+    with (
+        MockDataWarehouse(
+            db_path=db_path, cache_max_entries=0, partial_cache_max_shapes=0
+        ) as plain,
+        MockDataWarehouse(db_path=db_path, cache_max_entries=0) as cached,
+    ):
+        for time_range in ranges:
+            for dims, filters in [([], {}), (["platform"], {"country": "US"})]:
+                expected = plain.query_metric(metric, time_range, dims, filters)
+                actual = cached.query_metric(metric, time_range, dims, filters)
+                assert actual == expected
+
+
+def test_extending_window_scans_only_new_day(db_path):
+    with MockDataWarehouse(db_path=db_path, cache_max_entries=0) as wh:
+        stats = wh.partial_cache.stats
+        wh.query_metric("dau", ("2026-01-25", "2026-01-31"), ["platform"])
+        assert (stats.range_queries, stats.chunks_scanned) == (1, 7)
+
+        wh.query_metric("dau", ("2026-01-25", "2026-02-01"), ["platform"])
+        assert (stats.range_queries, stats.chunks_scanned) == (2, 8)
+        assert stats.chunks_hit == 7
+
+
+def test_non_iso_range_falls_back_to_direct_fetch():
+    cache = PartialAggregateCache()
+    calls = []
+
+    def fetch(time_range):
+        calls.append(time_range)
+        return [{"date": "2026-01-25", "value": 1}]
+
+    rows = cache.assemble("dau", ("2026-01-25 00:00", "2026-01-26"), [], {}, fetch)
+    assert rows == [{"date": "2026-01-25", "value": 1}]
+    assert calls == [("2026-01-25 00:00", "2026-01-26")]
+    assert cache.stats.range_queries == 0
@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from metric_anomaly_investigator.mock_warehouse.partitions import (
+    PartitionCatalog,
+    partition_event_stream,
+    partition_table,
+)
+
+PERIODS = {
+    "baseline": ("2026-01-25", "2026-01-27"),
+    "current": ("2026-01-28", "2026-02-01"),
+}
+
+
+def test_migration_splits_event_stream_into_weekly_partitions(warehouse):
+    kind = warehouse._fetchone(
+        "SELECT type FROM sqlite_master WHERE name = 'event_stream'", []
+    )
+    assert kind == ("view",)
+    _, catalog = warehouse._fetchall(
+        "SELECT table_name, first_day, last_day, row_count FROM event_partitions "
+        "ORDER BY first_day",
+        [],
+    )
+    # Sunday Jan 25 closes week 03, Jan 26 - Feb 1 is week 04
+    assert [row[:3] for row in catalog] == [
+        ("event_stream_p2026_03", "2026-01-25", "2026-01-25"),
+        ("event_stream_p2026_04", "2026-01-26", "2026-02-01"),
+    ]
+    total = warehouse._fetchone("SELECT COUNT(*) FROM event_stream", [])[0]
+    assert sum(row[3] for row in catalog) == total
+
+
+def test_partition_pruning(warehouse):
+    with warehouse._pool.connection() as conn:
+        catalog = PartitionCatalog.load(conn)
+        assert catalog.tables_for(conn, [("2026-01-28", "2026-01-30")]) == [
+            partition_table("2026-01-28")
+        ]
+        assert catalog.tables_for(conn, [("2026-01-25", "2026-01-25")]) == [
+            "event_stream_p2026_03"
+        ]
+        assert catalog.tables_for(conn, list(PERIODS.values())) == [
+            "event_stream_p2026_03",
+            "event_stream_p2026_04",
+        ]
+        assert catalog.tables_for(conn, [("2026-03-01", "2026-03-07")]) == []
+        assert len(catalog.tables_for(conn, None)) == 2
+        assert PartitionCatalog(partitioned=False).tables_for(conn, None) == [
+            "event_stream"
+        ]
+
+
+@pytest.mark.parametrize("metric_name", ["dau", "wau", "events_per_user"])
+def test_partition_scans_match_the_event_stream_view(warehouse, metric_name):
+    time_range = ("2026-01-25", "2026-02-01")
+    args = (metric_name, time_range, ["platform"], {"country": "IN"})
+
+    cols, rows = warehouse._scan_rows(
+        [time_range], lambda table: warehouse._build_query(*args, table=table)
+    )
+    assert (cols, rows) == warehouse._fetchall(*warehouse._build_query(*args))
+    assert rows
+
+
+def test_segment_averages_merge_across_partitions(warehouse):
+    merged = warehouse._segment_periods("dau", ["platform", "country"], PERIODS)
+
+    _, rows = warehouse._fetchall(
+        *warehouse._build_segment_query("dau", ["platform", "country"], PERIODS)
+    )
+    expected = {
+        (period, dimension, str(segment)): (total / count, count)
+        for period, dimension, segment, total, count, _ in rows
+    }
+    assert {
+        (row["period"], row["dimension"], row["segment"]): (
+            row["avg_value"],
+            row["sample_size"],
+        )
+        for row in merged
+    } == pytest.approx(expected)
+    assert len(merged) == len(expected)
+
+
+def test_repartitioning_is_a_no_op(warehouse, db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        before = conn.execute("SELECT * FROM event_partitions ORDER BY 1").fetchall()
+        with conn:
+            partition_event_stream(conn)
+        after = conn.execute("SELECT * FROM event_partitions ORDER BY 1").fetchall()
+    finally:
+        conn.close()
+    assert after == before
@@ -0,0 +1,115 @@
+import threading
+
+from metric_anomaly_investigator.agent.prefetch import (
+    SpeculativePrefetcher,
+    predict_next_steps,
+)
+from metric_anomaly_investigator.agent.tool_executor import ToolExecutor
+from metric_anomaly_investigator.schemas import (
+    CheckDeploymentsStep,
+    SegmentAllDimensionsStep,
+    SegmentByDimensionStep,
+    StepResult,
+)
+
+TIME_RANGE = ("2026-01-28", "2026-02-01")
+BASELINE_RANGE = ("2026-01-25", "2026-01-27")
+QUERY = "Why did DAU drop between 2026-01-28 and 2026-02-01?"
+
+
+def test_predictions_follow_the_investigation():
+    first = predict_next_steps(QUERY, [])
+    assert [s.action for s in first] == ["query_metric", "check_deployments"]
+    assert first[0].parameters.metric_name == "dau"
+    assert tuple(first[1].parameters.time_range) == TIME_RANGE
+
+    segmented = SegmentAllDimensionsStep(
+        step_id=2,
+        reasoning="find the segments that dropped",
+        parameters={
+            "metric_name": "dau",
+            "time_range": TIME_RANGE,
+            "baseline_range": BASELINE_RANGE,
+        },
+    )
+    predicted = predict_next_steps(QUERY, [segmented], max_steps=4)
+    # already executed steps are never predicted again
+    assert [s.action for s in predicted] == [
+        "check_deployments",
+        "segment_by_dimension",
+        "segment_by_dimension",
+        "segment_by_dimension",
+    ]
+    assert [s.parameters.dimension for s in predicted[1:3]] == ["platform", "country"]
+    assert predict_next_steps("why did it drop?", []) == []
+
+
+def test_prefetched_step_is_served(warehouse):
+    executor = ToolExecutor(warehouse, prefetch=True)
+    prefetcher = executor.create_prefetcher()
+    prefetcher.speculate(predict_next_steps(QUERY, []))
+
+    chosen = CheckDeploymentsStep(
+        step_id=7, reasoning="deployments", parameters={"time_range": TIME_RANGE}
+    )
+    prefetcher.resolve([chosen])
+    result = executor.execute_step(chosen, prefetcher)
+
+    assert result.step_id == 7
+    assert result.data == executor._run_step(chosen).data
+    assert prefetcher.stats.hits == 1
+    assert prefetcher.stats.saved_seconds >= 0
+
+    other = SegmentByDimensionStep(
+        step_id=8,
+        reasoning="by platform",
+        parameters={
+            "metric_name": "dau",
+            "dimension": "platform",
+            "time_range": TIME_RANGE,
+            "baseline_range": BASELINE_RANGE,
+        },
+    )
+    assert executor.execute_step(other, prefetcher).success
+    assert prefetcher.stats.misses == 1
+    assert prefetcher.stats.hit_rate == 0.5
+    prefetcher.close()
+
+
+def test_prefetchers_are_scoped_to_one_investigation(warehouse):
+    executor = ToolExecutor(warehouse, prefetch=True)
+    first, second = executor.create_prefetcher(), executor.create_prefetcher()
+    predicted = predict_next_steps(QUERY, [])
+    first.speculate(predicted)
+    second.speculate(predicted)
+    # one investigation choosing nothing must not drop the other's speculations
+    first.resolve([])
+
+    assert second.take(predicted[1]) is not None
+    assert second.stats.hits == 1
+    assert first.stats.hits == 0
+    first.close()
+    second.close()
+    assert ToolExecutor(warehouse, prefetch=False).create_prefetcher() is None
+
+
+def test_unused_speculations_are_cancelled():
+    started, release = threading.Event(), threading.Event()
+
+    def run_step(step):
+        started.set()
+        release.wait()
+        return StepResult(step_id=step.step_id, success=True, confidence_score=0.5)
+
+    prefetcher = SpeculativePrefetcher(run_step, max_workers=1)
+    predicted = predict_next_steps(QUERY, [])
+    prefetcher.speculate(predicted)
+    started.wait()
+    # the first speculation is running, the second is still queued
+    prefetcher.resolve([])
+    release.set()
+    prefetcher.close()
+
+    assert prefetcher.stats.speculated == 2
+    assert prefetcher.stats.cancelled == 1
+    assert prefetcher.take(predicted[0]) is None
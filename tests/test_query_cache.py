@@ -0,0 +1,87 @@
+import shutil
+import sqlite3
+
+from metric_anomaly_investigator.mock_warehouse import MockDataWarehouse
+from metric_anomaly_investigator.mock_warehouse.query_cache import (
+    QueryCache,
+    canonical_query_key,
+)
+
+
+def test_canonical_key_ignores_cosmetic_differences():
+    a = canonical_query_key(
+        "query_metric",
+        metric_name="dau",
+        time_range=("2026-01-25", "2026-02-01"),
+        dimensions=["country", "platform"],
+        filters={"platform": "android", "country": "IN"},
+    )
+    b = canonical_query_key(
+        "query_metric",
+        filters={"country": "IN", "platform": "android"},
+        dimensions=["platform", "country"],
+        time_range=["2026-01-25", "2026-02-01"],
+        metric_name="dau",
+    )
+    assert a == b
+    assert canonical_query_key("m", filters=None) == canonical_query_key(
+        "m", filters={}
+    )
+    assert canonical_query_key("m", dimensions=None) == canonical_query_key(
+        "m", dimensions=[]
+    )
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = QueryCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")  # "b" is now least recently used
+    cache.put("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.stats.evictions == 1
+
+    small = QueryCache(max_entries=100, max_bytes=200)
+    small.put("x", "x" * 120)
+    small.put("y", "y" * 120)
+    assert small.stats.entries == 1
+    assert small.stats.bytes <= 200
+    assert small.get("y")[0]
+
+
+def test_warehouse_cache_hits_for_equivalent_calls(warehouse):
+    warehouse.cache.clear()
+    hits = warehouse.cache.stats.hits
+    first = warehouse.query_metric(
+        "dau", ("2026-01-25", "2026-02-01"), None, {"platform": "android"}
+    )
+    second = warehouse.query_metric(
+        "dau", ("2026-01-25", "2026-02-01"), [], {"platform": "android"}
+    )
+    assert second == first
+    assert second is not first
+    assert warehouse.cache.stats.hits == hits + 1
+
+
+def test_cache_invalidated_when_database_changes(db_path, tmp_path):
+    path = str(tmp_path / "copy.db")
+    shutil.copy(db_path, path)
+    with MockDataWarehouse(db_path=path) as wh:
+        before = wh.check_deployments(("2026-01-01", "2026-02-01"))
+        assert wh.check_deployments(("2026-01-01", "2026-02-01")) == before
+
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.execute("DELETE FROM deployments WHERE deployment_id = 'deploy_003'")
+        conn.close()
+
+        after = wh.check_deployments(("2026-01-01", "2026-02-01"))
+        assert len(after) == len(before) - 1
+        assert wh.cache.stats.invalidations == 1
+
+
+def test_cache_can_be_disabled(db_path):
+    with MockDataWarehouse(db_path=db_path, cache_max_entries=0) as wh:
+        assert wh.cache is None
+        assert wh.check_deployments(("2026-01-28", "2026-01-28"))
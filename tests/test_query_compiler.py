@@ -0,0 +1,43 @@
+import pytest
+
+from metric_anomaly_investigator.mock_warehouse.query_compiler import (
+    cohort_filter_params,
+    metric_query,
+)
+
+TIME_RANGE = ("2026-01-28", "2026-01-30")
+
+
+def test_query_shapes_compile_once(warehouse):
+    metric_query.cache_clear()
+    first, params = warehouse._build_query(
+        "dau", TIME_RANGE, ["platform"], {"country": "IN", "device_type": "mobile"}
+    )
+    second, reordered = warehouse._build_query(
+        "dau", TIME_RANGE, ["platform"], {"device_type": "mobile", "country": "IN"}
+    )
+
+    # filter order is canonical: same SQL text, same parameter order
+    assert first is second
+    assert params == reordered == [*TIME_RANGE, "IN", "mobile"]
+    assert metric_query.cache_info().misses == 1
+
+
+@pytest.mark.parametrize(
+    "dimensions, filters",
+    [(["platform; DROP TABLE deployments"], {}), ([], {"user_id": "u1"})],
+)
+def test_columns_are_validated(warehouse, dimensions, filters):
+    with pytest.raises(ValueError, match="Unsupported column"):
+        warehouse.query_metric("dau", TIME_RANGE, dimensions, filters)
+    with pytest.raises(ValueError, match="Unsupported column"):
+        warehouse.query_metric("dau", TIME_RANGE, dimensions, filters, approximate=True)
+
+
+def test_cohort_filters_map_to_user_profiles(warehouse):
+    assert cohort_filter_params({"platform": "ios", "user_tier": "pro"}) == (
+        ("signup_platform", "user_tier"),
+        ["ios", "pro"],
+    )
+    with pytest.raises(ValueError, match="Unsupported cohort filter"):
+        warehouse.analyze_cohort_retention("2026-01-25", [1], {"event_type": "x"})
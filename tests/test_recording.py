@@ -0,0 +1,55 @@
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelRequest, UserPromptPart
+from pydantic_ai.models.test import TestModel
+
+from metric_anomaly_investigator.agent.recording import (
+    LLMRecordings,
+    RecordingModel,
+    RecordingNotFoundError,
+    prompt_key,
+    replay_model,
+)
+from metric_anomaly_investigator.schemas import InvestigationStep
+
+PROMPTS = ["User query: DAU dropped on 2026-01-28", "New step results: ..."]
+
+
+def test_prompt_key_ignores_timestamps():
+    first = [ModelRequest(parts=[UserPromptPart("DAU dropped")])]
+    again = [ModelRequest(parts=[UserPromptPart("DAU dropped")])]
+    assert prompt_key(first) == prompt_key(again)
+    assert prompt_key(first) != prompt_key(
+        [ModelRequest(parts=[UserPromptPart("WAU dropped")])]
+    )
+
+
+def test_replay_serves_recorded_responses(tmp_path):
+    path = str(tmp_path / "recordings.jsonl")
+    recorder = Agent(
+        RecordingModel(TestModel(seed=3), LLMRecordings(path), "step"),
+        output_type=InvestigationStep,
+        system_prompt="SYSTEM",
+    )
+    recorded = []
+    history = []
+    for prompt in PROMPTS:
+        result = recorder.run_sync(prompt, message_history=history)
+        recorded.append(result.output)
+        history = result.all_messages()
+
+    recordings = LLMRecordings(path)
+    assert len(recordings) == len(PROMPTS)
+    replayer = Agent(
+        replay_model(recordings, "step"),
+        output_type=InvestigationStep,
+        system_prompt="SYSTEM",
+    )
+    history = []
+    for prompt, expected in zip(PROMPTS, recorded):
+        result = replayer.run_sync(prompt, message_history=history)
+        assert result.output == expected
+        history = result.all_messages()
+
+    with pytest.raises(RecordingNotFoundError, match="LLM_MODE=record"):
+        replayer.run_sync("a prompt that was never recorded")
@@ -0,0 +1,142 @@
+import shutil
+import sqlite3
+
+import numpy as np
+import pytest
+
+from metric_anomaly_investigator.mock_warehouse import MockDataWarehouse
+from metric_anomaly_investigator.mock_warehouse.hyperloglog import (
+    HLL_PRECISION,
+    HyperLogLog,
+    encode_sketch,
+    hash_user_ids,
+    merge_sketches,
+)
+from metric_anomaly_investigator.mock_warehouse.partitions import partition_tables
+from metric_anomaly_investigator.mock_warehouse.rollup import ensure_rollup
+
+
+def _sketch(user_ids) -> HyperLogLog:
+    sketch = HyperLogLog()
+    sketch.add_hashes(hash_user_ids(user_ids))
+    return sketch
+
+
+@pytest.mark.parametrize("n", [1, 50, 5_000, 100_000])
+def test_hll_estimate_within_error_bound(n):
+    estimate = _sketch(f"user-{i}" for i in range(n)).count()
+    assert estimate == pytest.approx(n, rel=0.05)
+
+
+def test_hll_union_counts_overlap_once():
+    a = _sketch(f"user-{i}" for i in range(0, 6_000))
+    b = _sketch(f"user-{i}" for i in range(3_000, 9_000))
+    assert HyperLogLog.union([a, b]).count() == pytest.approx(9_000, rel=0.05)
+    assert HyperLogLog.from_bytes(a.to_bytes()).count() == a.count()
+
+
+def test_small_sketches_are_stored_sparse():
+    sketches, expected = [], []
+    for n in [3, 400, 50_000]:
+        sketch = _sketch(f"user-{i}" for i in range(n))
+        [index] = np.nonzero(sketch.registers)
+        sketches.append(encode_sketch(index, sketch.registers[index], HLL_PRECISION))
+        expected.append(sketch)
+    m = 1 << HLL_PRECISION
+    assert len(sketches[0]) < 20 and len(sketches[1]) < m
+    assert len(sketches[2]) == m
+
+    merged = merge_sketches(sketches, np.array([0, 1, 1]), 2, HLL_PRECISION)
+    np.testing.assert_array_equal(merged[0], expected[0].registers)
+    np.testing.assert_array_equal(merged[1], HyperLogLog.union(expected[1:]).registers)
+
+
+@pytest.fixture(scope="module")
+def hll_warehouse(db_path):
+    with MockDataWarehouse(db_path=db_path, distinct_mode="hll") as wh:
+        yield wh
+
+
+@pytest.mark.parametrize(
+    "metric_name, dimensions, filters",
+    [
+        ("dau", [], {}),
+        ("dau", ["platform"], {"country": "IN"}),
+        ("wau", ["country"], {}),
+        ("events_per_user", ["platform", "app_version"], {}),
+    ],
+)
+def test_rollup_matches_exact_queries(
+    warehouse, hll_warehouse, metric_name, dimensions, filters
+):
+    time_range = ("2026-01-25", "2026-02-01")
+    exact = warehouse.query_metric(metric_name, time_range, dimensions, filters)
+    approx = hll_warehouse.query_metric(metric_name, time_range, dimensions, filters)
+
+    exact_by_key = {(p.timestamp, tuple(p.dimensions.items())): p.value for p in exact}
+    approx_by_key = {
+        (p.timestamp, tuple(p.dimensions.items())): p.value for p in approx
+    }
+    assert exact_by_key.keys() == approx_by_key.keys()
+    for key, value in exact_by_key.items():
+        # small segments are dominated by HLL linear counting, which is near exact
+        assert approx_by_key[key] == pytest.approx(value, rel=0.05, abs=2)
+
+
+def test_rollup_cells_cover_every_event(hll_warehouse):
+    rolled_up, raw = hll_warehouse._fetchone(
+        "SELECT (SELECT SUM(event_count) FROM event_rollup), "
+        "(SELECT COUNT(*) FROM event_stream)",
+        [],
+    )
+    assert rolled_up == raw
+
+
+def test_breakdown_uses_rollup(hll_warehouse, warehouse):
+    kwargs = dict(
+        metric_name="dau",
+        dimension="platform",
+        time_range=("2026-01-28", "2026-02-01"),
+        baseline_range=("2026-01-25", "2026-01-27"),
+        min_drop_threshold=-np.inf,
+    )
+    exact = {
+        b.dimension_value: b for b in warehouse.get_dimensional_breakdown(**kwargs)
+    }
+    approx = {
+        b.dimension_value: b for b in hll_warehouse.get_dimensional_breakdown(**kwargs)
+    }
+    assert exact.keys() == approx.keys()
+    for value, breakdown in exact.items():
+        assert approx[value].after_value == pytest.approx(
+            breakdown.after_value, rel=0.05
+        )
+
+
+def test_rollup_is_rebuilt_when_events_change_at_equal_count(db_path, tmp_path):
+    path = str(tmp_path / "analytics.db")
+    shutil.copy(db_path, path)
+    ensure_rollup(path)
+    assert not ensure_rollup(path)
+
+    conn = sqlite3.connect(path)
+    table = partition_tables(conn)[-1]
+    # replace one event: the row count stays the same, the max rowid moves
+    conn.execute(
+        f"INSERT INTO {table} SELECT * FROM {table} WHERE rowid = "
+        f"(SELECT MIN(rowid) FROM {table})"
+    )
+    conn.execute(f"DELETE FROM {table} WHERE rowid = (SELECT MIN(rowid) FROM {table})")
+    conn.commit()
+    conn.close()
+    assert ensure_rollup(path)
+    assert not ensure_rollup(path)
+
+
+def test_rollup_queries_are_profiled(db_path):
+    with MockDataWarehouse(
+        db_path=db_path, distinct_mode="hll", cache_max_entries=0
+    ) as wh:
+        with wh.profiler.record() as queries:
+            wh.query_metric("dau", ("2026-01-25", "2026-02-01"))
+    assert [q.sql for q in queries if "event_rollup" in q.sql]
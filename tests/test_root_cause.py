@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from metric_anomaly_investigator.mock_warehouse.root_cause import (
+    F,
+    FV,
+    ROOT_CAUSE_DIMENSIONS,
+    USERS_C,
+    V,
+    VV,
+    LeafTable,
+)
+
+TIME_RANGE = ("2026-01-28", "2026-02-01")
+BASELINE_RANGE = ("2026-01-25", "2026-01-27")
+
+
+def test_finds_planted_android_india_drop(warehouse):
+    result = warehouse.find_root_causes("dau", TIME_RANGE, BASELINE_RANGE)
+
+    assert not result.truncated
+    top = result.segments[0]
+    assert top.segment == {"platform": "android", "country": "IN"}
+    assert top.pct_change < -0.5
+    scores = [s.score for s in result.segments]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_cached_leaves_follow_the_callers_dimension_order(warehouse):
+    by_platform = warehouse.find_root_causes(
+        "dau", TIME_RANGE, BASELINE_RANGE, dimensions=["platform", "country"]
+    )
+    by_country = warehouse.find_root_causes(
+        "dau", TIME_RANGE, BASELINE_RANGE, dimensions=["country", "platform"]
+    )
+
+    platforms = {"ios", "android", "web"}
+    for result in (by_platform, by_country):
+        for segment in result.segments:
+            assert segment.segment.get("platform", "android") in platforms
+            assert segment.segment.get("country", "IN") not in platforms
+    assert [s.segment for s in by_country.segments] == [
+        s.segment for s in by_platform.segments
+    ]
+
+
+def test_segments_do_not_depend_on_dimension_order(warehouse):
+    forward = warehouse.find_root_causes("dau", TIME_RANGE, BASELINE_RANGE)
+    backward = warehouse.find_root_causes(
+        "dau", TIME_RANGE, BASELINE_RANGE, dimensions=ROOT_CAUSE_DIMENSIONS[::-1]
+    )
+    assert [s.segment for s in backward.segments] == [
+        s.segment for s in forward.segments
+    ]
+    assert [s.score for s in backward.segments] == pytest.approx(
+        [s.score for s in forward.segments]
+    )
+
+
+def _synthetic_leaves(cardinality: int, seed: int = 0) -> LeafTable:
+    """Every combination of 3 dimensions; leaf (1, 2, *) drops by 80%."""
+    rng = np.random.default_rng(seed)
+    grid = np.stack(
+        np.meshgrid(*[np.arange(cardinality)] * 3, indexing="ij"), axis=-1
+    ).reshape(-1, 3)
+    baseline = rng.uniform(50, 150, len(grid))
+    current = baseline * rng.normal(1.0, 0.01, len(grid))
+    planted = (grid[:, 0] == 1) & (grid[:, 1] == 2)
+    current[planted] *= 0.2
+    rows = [
+        (period, "2026-01-25", *(f"v{c}" for c in cell), users, 0)
+        for period, values in (("baseline", baseline), ("current", current))
+        for cell, users in zip(grid, values)
+    ]
+    return LeafTable.from_rows("dau", ["a", "b", "c"], rows)
+
+
+def test_planted_segment_ranks_first_at_high_cardinality():
+    result = _synthetic_leaves(cardinality=30).search(top_k=3, min_support=0.0005)
+
+    assert result.segments[0].segment == {"a": "v1", "b": "v2"}
+    assert result.segments[0].score > 0.5
+    assert result.segments[0].pct_change < -0.75
+
+
+def test_mix_shift_between_children_is_credited_to_the_parent():
+    """
+    Segment (a=v1, b=v2) drops 60% while its users all move from c=v0 to
+    c=v1, as the planted incident's users move to the broken app_version:
+    c=v0 empties, c=v1 only drops a little. v0 is not the cause.
+    """
+    leaves = _synthetic_leaves(cardinality=4)
+    planted = (leaves.codes[:, 0] == 1) & (leaves.codes[:, 1] == 2)
+    forecast, actual = leaves.measures[:, F], leaves.measures[:, V]
+    moved_from, moved_to = (
+        planted & (leaves.codes[:, 2] == 0),
+        planted & (leaves.codes[:, 2] == 1),
+    )
+    segment_forecast = forecast[moved_from].sum() + forecast[moved_to].sum()
+    actual[planted] = 0.0
+    actual[moved_to] = 0.4 * segment_forecast
+    leaves.measures[:, VV] = actual * actual
+    leaves.measures[:, FV] = forecast * actual
+    leaves.measures[:, USERS_C] = actual
+
+    result = leaves.search(top_k=3, min_support=0.0005)
+
+    assert result.segments[0].segment == {"a": "v1", "b": "v2"}
+    assert all(len(s.segment) < 3 for s in result.segments)
+
+
+def test_search_stops_at_time_budget():
+    leaves = _synthetic_leaves(cardinality=40)
+    result = leaves.search(min_support=0.0, min_surprise=0.0, time_budget=0.05)
+
+    assert result.truncated
+    assert result.elapsed_seconds < 1.0
+    assert result.segments
+
+
+def test_no_change_returns_no_segments():
+    rows = [
+        (period, "2026-01-25", "android", 10, 40) for period in ("baseline", "current")
+    ]
+    result = LeafTable.from_rows("dau", ["platform"], rows).search()
+    assert result.segments == []
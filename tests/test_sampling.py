@@ -0,0 +1,116 @@
+import pytest
+
+from metric_anomaly_investigator.agent.tool_executor import ToolExecutor
+from metric_anomaly_investigator.mock_warehouse.sampling import (
+    sample_buckets,
+    sample_threshold,
+)
+from metric_anomaly_investigator.schemas import SegmentByDimensionStep
+
+FULL_RANGE = ("2026-01-25", "2026-02-01")
+TIME_RANGE = ("2026-01-28", "2026-02-01")
+BASELINE_RANGE = ("2026-01-25", "2026-01-27")
+
+
+def test_sample_buckets_are_stable():
+    assert sample_buckets(["user_000001", "user_000002"]) == sample_buckets(
+        ["user_000001", "user_000002"]
+    )
+    assert sample_threshold(0.05) == 500
+    with pytest.raises(ValueError, match="sampling_rate"):
+        sample_threshold(0.0)
+
+
+@pytest.mark.parametrize("metric_name", ["dau", "wau", "events_per_user"])
+def test_full_sample_is_exact(warehouse, metric_name):
+    exact = warehouse.query_metric(metric_name, FULL_RANGE, ["platform"])
+    sampled = warehouse.query_metric(
+        metric_name, FULL_RANGE, ["platform"], approximate=True, sampling_rate=1.0
+    )
+
+    def by_key(points):
+        return {(p.timestamp, p.dimensions["platform"]): p for p in points}
+
+    assert by_key(sampled).keys() == by_key(exact).keys()
+    for key, point in by_key(sampled).items():
+        assert point.value == pytest.approx(by_key(exact)[key].value)
+        assert point.confidence_interval == pytest.approx((point.value, point.value))
+        assert by_key(exact)[key].confidence_interval is None
+
+
+@pytest.mark.parametrize("metric_name", ["dau", "events_per_user"])
+def test_intervals_cover_the_exact_values(warehouse, metric_name):
+    exact = warehouse.query_metric(metric_name, FULL_RANGE)
+    sampled = warehouse.query_metric(
+        metric_name, FULL_RANGE, approximate=True, sampling_rate=0.5
+    )
+
+    assert [p.timestamp for p in sampled] == [p.timestamp for p in exact]
+    covered = [
+        p.confidence_interval[0] <= e.value <= p.confidence_interval[1]
+        for p, e in zip(sampled, exact)
+    ]
+    assert sum(covered) >= len(covered) - 1
+    # half the users: the estimate is noisy, but not wildly off
+    for p, e in zip(sampled, exact):
+        assert p.value == pytest.approx(e.value, rel=0.25)
+
+
+def test_approximate_breakdown_and_statistical_test(warehouse):
+    exact = warehouse.get_dimensional_breakdown(
+        "dau", "country", TIME_RANGE, BASELINE_RANGE
+    )
+    full_sample = warehouse.get_dimensional_breakdown(
+        "dau", "country", TIME_RANGE, BASELINE_RANGE, approximate=True, sampling_rate=1
+    )
+    assert [(b.dimension_value, b.pct_change) for b in full_sample] == [
+        (b.dimension_value, pytest.approx(b.pct_change)) for b in exact
+    ]
+
+    sampled = {
+        b.dimension_value: b
+        for b in warehouse.get_dimensional_breakdown(
+            "dau",
+            "country",
+            TIME_RANGE,
+            BASELINE_RANGE,
+            approximate=True,
+            sampling_rate=0.5,
+        )
+    }
+    low, high = sampled["IN"].pct_change_interval
+    assert low <= sampled["IN"].pct_change <= high < 0
+
+    result = warehouse.run_statistical_test(
+        "dau",
+        {"country": "US"},
+        {"country": "IN"},
+        FULL_RANGE,
+        approximate=True,
+        sampling_rate=0.5,
+    )
+    assert result["sampling_rate"] == 0.5
+    assert result["control_mean_interval"][0] > result["treatment_mean_interval"][1]
+
+
+def test_sampling_error_lowers_step_confidence(warehouse):
+    def run(**sampling):
+        step = SegmentByDimensionStep(
+            step_id=1,
+            reasoning="compare countries",
+            parameters={
+                "metric_name": "dau",
+                "dimension": "country",
+                "time_range": TIME_RANGE,
+                "baseline_range": BASELINE_RANGE,
+                **sampling,
+            },
+        )
+        result = ToolExecutor(warehouse).execute_step(step)
+        assert result.success, result.error_message
+        return result
+
+    exact = run()
+    sampled = run(approximate=True, sampling_rate=0.5)
+    assert sampled.confidence_score < exact.confidence_score
+    assert "95% CI" in sampled.key_findings[1]
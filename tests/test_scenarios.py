@@ -0,0 +1,149 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from metric_anomaly_investigator.mock_warehouse import (
+    generate_deployments,
+    generate_events,
+    generate_user_profiles,
+)
+from metric_anomaly_investigator.mock_warehouse.generator import users_for_scale_factor
+from metric_anomaly_investigator.mock_warehouse.loader import (
+    load_database,
+    manifest_path,
+)
+from metric_anomaly_investigator.mock_warehouse.scenarios import (
+    SCENARIOS,
+    Incident,
+    get_scenario,
+)
+
+
+def segment_dau(events, platform, country):
+    segment = events[(events["platform"] == platform) & (events["country"] == country)]
+    return segment.groupby(segment["event_timestamp"].dt.normalize())[
+        "user_id"
+    ].nunique()
+
+
+def test_scale_factor_sets_users():
+    assert users_for_scale_factor(1) == 50_000
+    assert users_for_scale_factor(0.1) == 5_000
+    with pytest.raises(ValueError, match="Scale factor"):
+        users_for_scale_factor(101)
+
+
+def test_incident_validation_and_ramp():
+    with pytest.raises(ValueError, match="Unsupported segment keys"):
+        Incident("bad", datetime(2026, 1, 27), {"user_tier": "pro"}, 0.5)
+    decay = get_scenario("gradual_decay").incidents[0]
+    days = [datetime(2026, 1, 26) + timedelta(days=i) for i in range(7)]
+    rates = [decay.dropout_rate_on(day) for day in days]
+    assert rates[0] == 0.0
+    assert rates[1:] == pytest.approx([0.08, 0.16, 0.24, 0.32, 0.40, 0.40])
+    with pytest.raises(ValueError, match="Unknown scenario"):
+        get_scenario("nope")
+
+
+def test_partial_rollout_affects_only_part_of_the_segment():
+    users = generate_user_profiles(4000, seed=9)
+    scenario = get_scenario("partial_rollout")
+    events = generate_events(users, seed=9, scenario=scenario)
+
+    android_br = events[(events["platform"] == "android") & (events["country"] == "BR")]
+    after = android_br[android_br["event_timestamp"] >= datetime(2026, 1, 29)]
+    upgraded = after.loc[after["app_version"] == "2.4.0", "user_id"].nunique()
+    # 30% of the segment gets the release, and most of them then drop out
+    assert 0.1 < upgraded / after["user_id"].nunique() < 0.3
+    assert (android_br["event_timestamp"] >= datetime(2026, 1, 29))[
+        android_br["app_version"] == "2.4.0"
+    ].all()
+    dau = segment_dau(events, "android", "BR")
+    assert (
+        dau[dau.index >= "2026-01-29"].mean()
+        < 0.9 * dau[dau.index < "2026-01-29"].mean()
+    )
+
+    deployments = generate_deployments(scenario)
+    release = deployments.set_index("deployment_id").loc["deploy_005"]
+    assert release["rollout_percentage"] == 0.30
+    assert deployments["deployment_date"].is_monotonic_increasing
+
+
+def test_no_anomaly_and_overlapping_incidents():
+    users = generate_user_profiles(4000, seed=2)
+    control = generate_events(users, seed=2, scenario=SCENARIOS["no_anomaly"])
+    overlapping = generate_events(
+        users, seed=2, scenario=SCENARIOS["overlapping_incidents"]
+    )
+
+    assert "2.4.0" not in set(control["app_version"])
+    assert "2.4.0" in set(overlapping["app_version"])
+    for platform, country in [("android", "IN"), ("web", "DE")]:
+        assert (
+            segment_dau(overlapping, platform, country).iloc[-1]
+            < 0.8 * segment_dau(control, platform, country).iloc[-1]
+        )
+    # untouched segments see the same days, users and draws
+    ios_us = (control["platform"] == "ios") & (control["country"] == "US")
+    assert segment_dau(control, "ios", "US").equals(
+        segment_dau(overlapping, "ios", "US")
+    )
+    assert ios_us.any()
+
+
+def test_loader_writes_ground_truth_manifest(tmp_path):
+    db_path = str(tmp_path / "analytics.db")
+    load_database(
+        db_path,
+        seed=1,
+        scale_factor=0.002,
+        scenario=get_scenario("overlapping_incidents"),
+    )
+
+    manifest = json.loads(manifest_path(db_path).read_text())
+    assert manifest["scenario"] == "overlapping_incidents"
+    assert manifest["n_users"] == 100 and manifest["scale_factor"] == 0.002
+    assert [incident["name"] for incident in manifest["incidents"]] == [
+        "android_in_crash",
+        "web_de_decay",
+        "ios_uk_partial_rollout",
+    ]
+    assert manifest["incidents"][1] == {
+        "name": "web_de_decay",
+        "kind": "gradual",
+        "segment": {"platform": "web", "country": "DE"},
+        "start_date": "2026-01-27",
+        "end_date": None,
+        "dropout_rate": 0.5,
+        "ramp_days": 4,
+        "rollout_percentage": 1.0,
+        "app_version": None,
+        "deployment_id": None,
+        "affected_metrics": ["dau", "wau"],
+    }
+    release = generate_deployments(get_scenario("overlapping_incidents"))
+    release = release.set_index("deployment_id").loc["deploy_005"]
+    assert json.loads(release["regions"]) == ["UK"]
+
+
+def _events(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT * FROM event_stream ORDER BY event_id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_unseeded_load_records_its_seed(tmp_path):
+    db_path = str(tmp_path / "analytics.db")
+    replay_path = str(tmp_path / "replay.db")
+    scenario = get_scenario("no_anomaly")
+    load_database(db_path, n_users=60, scenario=scenario)
+    seed = json.loads(manifest_path(db_path).read_text())["seed"]
+
+    assert isinstance(seed, int)
+    load_database(replay_path, n_users=60, seed=seed, scenario=scenario)
+    assert _events(replay_path) == _events(db_path)
@@ -0,0 +1,107 @@
+from pydantic import TypeAdapter
+
+from metric_anomaly_investigator.agent.tool_executor import ToolExecutor
+from metric_anomaly_investigator.schemas import (
+    FindRootCausesStep,
+    InvestigationStep,
+    SegmentAllDimensionsStep,
+)
+
+TIME_RANGE = ("2026-01-28", "2026-02-01")
+BASELINE_RANGE = ("2026-01-25", "2026-01-27")
+
+
+def test_segment_all_dimensions_step(warehouse):
+    step = SegmentAllDimensionsStep(
+        step_id=1,
+        reasoning="find the segments that dropped",
+        parameters={
+            "metric_name": "dau",
+            "time_range": TIME_RANGE,
+            "baseline_range": BASELINE_RANGE,
+            "min_drop_threshold": 0.0,
+        },
+    )
+    result = ToolExecutor(warehouse).execute_step(step)
+
+    assert result.success, result.error_message
+    segments = result.data["segmented_data"]
+    assert segments
+    assert [s["pct_change"] for s in segments] == sorted(
+        s["pct_change"] for s in segments
+    )
+    assert result.key_findings[0] == "Largest drops across all dimensions:"
+    assert len(result.key_findings) == len(segments) + 1
+
+
+def test_find_root_causes_step(warehouse):
+    step = FindRootCausesStep(
+        step_id=2,
+        reasoning="localize the drop",
+        parameters={
+            "metric_name": "dau",
+            "time_range": TIME_RANGE,
+            "baseline_range": BASELINE_RANGE,
+            "top_k": 3,
+        },
+    )
+    result = ToolExecutor(warehouse).execute_step(step)
+
+    assert result.success, result.error_message
+    assert len(result.data["root_causes"]["segments"]) == 3
+    assert result.key_findings[0].startswith("Top root-cause segments")
+    assert result.confidence_score >= 0.7
+
+
+def test_parallel_actions_step(warehouse):
+    segment = {
+        "metric_name": "dau",
+        "time_range": TIME_RANGE,
+        "baseline_range": BASELINE_RANGE,
+    }
+    step = TypeAdapter(InvestigationStep).validate_python(
+        {
+            "step_id": 3,
+            "reasoning": "segment and check deployments at once",
+            "action": "parallel_actions",
+            "parameters": {
+                "actions": [
+                    {
+                        "step_id": 3,
+                        "reasoning": "by platform",
+                        "action": "segment_by_dimension",
+                        "parameters": {**segment, "dimension": "platform"},
+                    },
+                    {
+                        "step_id": 4,
+                        "reasoning": "by country",
+                        "action": "segment_by_dimension",
+                        "parameters": {**segment, "dimension": "country"},
+                    },
+                    {
+                        "step_id": 5,
+                        "reasoning": "deployments",
+                        "action": "check_deployments",
+                        "parameters": {"time_range": TIME_RANGE, "platform": None},
+                    },
+                    {
+                        "step_id": 6,
+                        "reasoning": "bad cohort filter",
+                        "action": "analyze_retention",
+                        "parameters": {
+                            "cohort_date": "2026-01-25",
+                            "filters": {"event_type": "login"},
+                        },
+                    },
+                ]
+            },
+        }
+    )
+    executor = ToolExecutor(warehouse, max_parallel_actions=2)
+    results = executor.execute_steps(step.parameters.actions)
+
+    # results in proposal order; a failing action doesn't sink the batch
+    assert [r.step_id for r in results] == [3, 4, 5, 6]
+    assert [r.success for r in results] == [True, True, True, False]
+    for action, result in zip(step.parameters.actions[:3], results):
+        assert result.data == executor.execute_step(action).data
@@ -0,0 +1,280 @@
+import sqlite3
+
+import pytest
+
+from metric_anomaly_investigator.mock_warehouse import (
+    MockDataWarehouse,
+    generate_deployments,
+    generate_events,
+    generate_user_profiles,
+)
+from metric_anomaly_investigator.mock_warehouse.migrations import (
+    LATEST_SCHEMA_VERSION,
+    SchemaVersionError,
+    get_schema_version,
+)
+from metric_anomaly_investigator.mock_warehouse.partitions import partition_table
+from metric_anomaly_investigator.mock_warehouse.warehouse import ALLOWED_COLUMNS
+
+USER_PROFILES_COLUMN_MAP = {"platform": "signup_platform", "country": "signup_country"}
+
+
+def _per_day_retention(warehouse, cohort_date, retention_days, filters):
+    """The original one-query-per-day retention, used as the reference."""
+    size_query = "SELECT COUNT(*) FROM user_profiles WHERE DATE(signup_date) = ?"
+    params = [cohort_date]
+    for col, val in filters.items():
+        size_query += f" AND {USER_PROFILES_COLUMN_MAP.get(col, col)} = ?"
+        params.append(val)
+    cohort_size = warehouse._fetchone(size_query, params)[0]
+    if cohort_size == 0:
+        return {f"day_{day}": 0.0 for day in retention_days}
+
+    rates = {}
+    for day in retention_days:
+        query = """
+            SELECT COUNT(DISTINCT event_stream.user_id)
+            FROM event_stream
+            JOIN user_profiles ON event_stream.user_id = user_profiles.user_id
+            WHERE DATE(user_profiles.signup_date) = ?
+            AND DATE(event_stream.event_timestamp) = DATE(?, '+' || ? || ' days')
+        """
+        query_params = [cohort_date, cohort_date, day]
+        for col, val in filters.items():
+            query += f" AND user_profiles.{USER_PROFILES_COLUMN_MAP.get(col, col)} = ?"
+            query_params.append(val)
+        rates[f"day_{day}"] = warehouse._fetchone(query, query_params)[0] / cohort_size
+    return rates
+
+
+@pytest.fixture
+def busiest_recent_cohort(warehouse) -> str:
+    return warehouse._fetchone(
+        """
+        SELECT DATE(signup_date) AS d FROM user_profiles
+        WHERE DATE(signup_date) >= '2026-01-01'
+        GROUP BY d ORDER BY COUNT(*) DESC, d LIMIT 1
+        """,
+        [],
+    )[0]
+
+
+@pytest.mark.parametrize(
+    "retention_days, filters",
+    [
+        (list(range(1, 31)), {}),
+        ([30, 7, 1], {}),
+        ([3, 3, 10], {"platform": "android"}),
+        ([5, 6, 7], {"country": "US", "platform": "ios"}),
+    ],
+)
+def test_single_scan_retention_matches_per_day_loop(
+    warehouse, busiest_recent_cohort, retention_days, filters
+):
+    expected = _per_day_retention(
+        warehouse, busiest_recent_cohort, retention_days, filters
+    )
+    actual = warehouse.analyze_cohort_retention(
+        busiest_recent_cohort, retention_days, filters
+    )
+    assert actual == expected
+    assert list(actual) == list(expected)
+
+
+def test_retention_without_days_matches_per_day_loop(warehouse, busiest_recent_cohort):
+    expected = _per_day_retention(warehouse, busiest_recent_cohort, [], {})
+    assert warehouse.analyze_cohort_retention(busiest_recent_cohort, []) == expected
+    assert expected == {}
+
+
+def test_retention_for_empty_cohort(warehouse):
+    assert warehouse.analyze_cohort_retention("1999-01-01", [1, 7]) == {
+        "day_1": 0.0,
+        "day_7": 0.0,
+    }
+
+
+# the weekly event_stream partition holding the anomaly days
+PARTITION = partition_table("2026-01-28")
+
+
+def _query_plan(warehouse, query, params) -> str:
+    with warehouse._pool.connection() as conn:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+    return "\n".join(row[3] for row in rows)
+
+
+def test_migrations_materialize_event_date(warehouse):
+    mismatches = warehouse._fetchone(
+        "SELECT COUNT(*) FROM event_stream WHERE event_date != DATE(event_timestamp)",
+        [],
+    )[0]
+    assert mismatches == 0
+
+
+def test_old_schema_is_only_migrated_on_request(tmp_path):
+    path = str(tmp_path / "old.db")
+    users_df = generate_user_profiles(50, seed=3)
+    conn = sqlite3.connect(path)
+    users_df.to_sql("user_profiles", conn, index=False)
+    generate_events(users_df, seed=3).to_sql("event_stream", conn, index=False)
+    generate_deployments().to_sql("deployments", conn, index=False)
+    conn.close()
+
+    with pytest.raises(SchemaVersionError, match="schema version 0"):
+        MockDataWarehouse(db_path=path)
+    conn = sqlite3.connect(path)
+    assert get_schema_version(conn) == 0
+    conn.close()
+
+    with MockDataWarehouse(db_path=path, auto_migrate=True) as wh:
+        assert wh.query_metric("dau", ("2026-01-25", "2026-01-27"))
+    conn = sqlite3.connect(path)
+    assert get_schema_version(conn) == LATEST_SCHEMA_VERSION
+    conn.close()
+
+
+@pytest.mark.parametrize("metric_name", ["dau", "wau", "events_per_user"])
+def test_metric_queries_use_event_date_index(warehouse, metric_name):
+    query, params = warehouse._build_query(
+        metric_name,
+        ("2026-01-28", "2026-01-30"),
+        ["platform"],
+        {"country": "IN"},
+        table=PARTITION,
+    )
+    plan = _query_plan(warehouse, query, params)
+    assert f"idx_{PARTITION}_date_dims" in plan
+    assert f"SCAN {PARTITION}" not in plan
+
+
+def test_filtered_dau_is_answered_from_covering_index(warehouse):
+    query, params = warehouse._build_query(
+        "dau",
+        ("2026-01-28", "2026-01-30"),
+        [],
+        {"platform": "android"},
+        table=PARTITION,
+    )
+    plan = _query_plan(warehouse, query, params)
+    assert f"USING COVERING INDEX idx_{PARTITION}_date_dims" in plan
+
+
+def test_cohort_and_deployment_queries_use_indexes(warehouse):
+    cohort_plan = _query_plan(
+        warehouse,
+        "SELECT COUNT(*) FROM user_profiles "
+        "WHERE signup_date >= DATE(?) AND signup_date < DATE(?, '+1 day')",
+        ["2026-01-20", "2026-01-20"],
+    )
+    assert "idx_user_profiles_signup_date" in cohort_plan
+
+    deployment_plan = _query_plan(
+        warehouse,
+        "SELECT * FROM deployments "
+        "WHERE deployment_date >= DATE(?) AND deployment_date < DATE(?, '+1 day')",
+        ["2026-01-25", "2026-02-01"],
+    )
+    assert "idx_deployments_date" in deployment_plan
+
+
+def test_check_deployments_includes_end_date(warehouse):
+    deployments = warehouse.check_deployments(("2026-01-28", "2026-01-28"))
+    assert [d.deployment_id for d in deployments] == ["deploy_003"]
+
+
+def _two_query_breakdown(
+    warehouse, metric_name, dimension, time_range, baseline_range, min_drop_threshold
+):
+    """The original query_metric-twice breakdown, used as the reference."""
+
+    def aggregate(points):
+        agg = {}
+        for point in points:
+            totals = agg.setdefault(
+                point.dimensions.get(dimension, "unknown"), [0.0, 0]
+            )
+            totals[0] += point.value
+            totals[1] += 1
+        return agg
+
+    baseline = aggregate(
+        warehouse.query_metric(metric_name, baseline_range, [dimension])
+    )
+    current = aggregate(warehouse.query_metric(metric_name, time_range, [dimension]))
+    expected = []
+    for dim_value, (curr_sum, curr_count) in current.items():
+        curr_avg = curr_sum / curr_count
+        base_sum, base_count = baseline.get(dim_value, [0.0, 0])
+        base_avg = base_sum / base_count if base_count else 0.0
+        pct_change = (curr_avg - base_avg) / base_avg if base_avg else 0.0
+        if pct_change <= -min_drop_threshold:
+            expected.append((dim_value, base_avg, curr_avg, pct_change, curr_count))
+    return expected
+
+
+@pytest.mark.parametrize("metric_name", ["dau", "wau", "events_per_user"])
+@pytest.mark.parametrize("dimension", ["platform", "country", "event_type"])
+@pytest.mark.parametrize(
+    "time_range, baseline_range",
+    [
+        (("2026-01-28", "2026-02-01"), ("2026-01-25", "2026-01-27")),
+        (("2026-01-27", "2026-02-01"), ("2026-01-25", "2026-01-29")),  # overlap
+    ],
+)
+def test_one_pass_breakdown_matches_two_queries(
+    warehouse, metric_name, dimension, time_range, baseline_range
+):
+    # a negative threshold keeps every segment, so the whole list is compared
+    expected = _two_query_breakdown(
+        warehouse, metric_name, dimension, time_range, baseline_range, -10.0
+    )
+    warehouse.cache.clear()
+    actual = warehouse.get_dimensional_breakdown(
+        metric_name, dimension, time_range, baseline_range, min_drop_threshold=-10.0
+    )
+    assert [b.dimension_value for b in actual] == [e[0] for e in expected]
+    assert [b.sample_size for b in actual] == [e[4] for e in expected]
+    assert all(b.dimension_name == dimension for b in actual)
+    actual_values = [
+        value for b in actual for value in (b.before_value, b.after_value, b.pct_change)
+    ]
+    expected_values = [value for e in expected for value in e[1:4]]
+    assert actual_values == pytest.approx(expected_values, rel=1e-12)
+
+
+def test_breakdown_is_a_single_query(warehouse):
+    query, params = warehouse._build_segment_query(
+        "dau",
+        ["platform"],
+        {
+            "baseline": ("2026-01-25", "2026-01-27"),
+            "current": ("2026-01-28", "2026-02-01"),
+        },
+        table=PARTITION,
+    )
+    plan = _query_plan(warehouse, query, params)
+    assert f"idx_{PARTITION}_date_dims" in plan
+    assert f"SCAN {PARTITION}" not in plan
+
+
+def test_segment_all_dimensions_matches_per_dimension_breakdowns(warehouse):
+    kwargs = dict(
+        metric_name="events_per_user",
+        time_range=("2026-01-28", "2026-02-01"),
+        baseline_range=("2026-01-25", "2026-01-27"),
+        min_drop_threshold=-10.0,
+    )
+    per_dimension = [
+        b
+        for dim in ALLOWED_COLUMNS
+        for b in warehouse.get_dimensional_breakdown(dimension=dim, **kwargs)
+    ]
+    all_dimensions = warehouse.segment_all_dimensions(**kwargs)
+
+    assert sorted(all_dimensions, key=lambda b: b.model_dump_json()) == sorted(
+        per_dimension, key=lambda b: b.model_dump_json()
+    )
+    assert {b.dimension_name for b in all_dimensions} == set(ALLOWED_COLUMNS)
+    changes = [b.pct_change for b in all_dimensions]
+    assert changes == sorted(changes)